@@ -8,6 +8,7 @@ from .bones.actions import BONE_ACTION_KEY, BoneAction
 from .bones.image import ImageBone, ImageBoneRelSkel
 from .config import CONFIG
 from .modules.assistant import Assistant
+from .modules.file import DescribeImageOnUploadMixin
 from .skeletons.assistant import AssistantSkel
 
 __all__ = [
@@ -15,6 +16,7 @@ __all__ = [
     "BONE_ACTION_KEY",
     "BoneAction",
     "CONFIG",
+    "DescribeImageOnUploadMixin",
     "ImageBone",
     "ImageBoneRelSkel",
 ]
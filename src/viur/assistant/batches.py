@@ -0,0 +1,245 @@
+"""
+Batches
+
+Backend for the asynchronous batch API of OpenAI, for non-interactive workloads.
+
+Requests which don't need an answer in seconds (like bulk translations or eager image descriptions)
+are queued as entities of the kind ``viur-assistant-batch-request``, together with the *target*
+their result belongs to. A periodic task collects queued requests into a batch file and submits it,
+another one polls submitted batches (entities of the kind ``viur-assistant-batch``) and hands
+the results over to ``Assistant.apply_batch_result``, which writes them to their targets.
+
+Batch requests are cheaper and have separate rate-limits, but can take up to
+``CONFIG.batch_completion_window`` to complete. With ``CONFIG.batch_base_url``, an OpenAI-compatible
+stand-in server (like ``tests/batch_server.py``) can be used for offline testing.
+"""
+
+import datetime
+import io
+import json
+import typing as t
+
+from viur.core import db, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant import jobs, scheduler
+from viur.assistant.clients import get_openai_client
+from viur.assistant.concurrency import run_sync
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG, get_assistant
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "BATCH_KIND",
+    "BATCH_REQUEST_KIND",
+    "BatchStatus",
+    "enqueue",
+    "submit_batch",
+    "poll_batches",
+]
+
+BATCH_KIND: t.Final[str] = "viur-assistant-batch"
+"""The datastore kind of the submitted batches"""
+
+BATCH_REQUEST_KIND: t.Final[str] = "viur-assistant-batch-request"
+"""The datastore kind of the queued requests"""
+
+_CLAIM_CHUNK: t.Final[int] = 25  # requests claimed within a single transaction
+
+_PENDING_PROVIDER_STATUS: t.Final[frozenset[str]] = frozenset({
+    "validating", "in_progress", "finalizing", "cancelling",
+})
+
+
+class BatchStatus:
+    QUEUED: t.Final[str] = "queued"
+    """Request is waiting to be submitted"""
+
+    SUBMITTED: t.Final[str] = "submitted"
+    """Request or batch has been submitted to the provider"""
+
+    DONE: t.Final[str] = "done"
+    """Request or batch is completed and its results are applied"""
+
+    FAILED: t.Final[str] = "failed"
+    """Request or batch has failed"""
+
+
+def enqueue(operation: str, params: dict[str, t.Any], target: dict[str, t.Any]) -> db.Key:
+    """
+    Queue a chat completion for the next batch.
+
+    :param operation: Name of the assistant operation, which created the request.
+    :param params: The parameters of the chat completion.
+    :param target: The (JSON-serializable) target of the result, passed to ``apply_batch_result``.
+    :return: The key of the queued request.
+    """
+    entity = db.Entity(db.Key(BATCH_REQUEST_KIND, utils.string.random(32)))
+    entity["operation"] = operation
+    entity["params"] = jobs.compress(json.dumps(params))
+    entity["target"] = json.dumps(target)
+    entity["status"] = BatchStatus.QUEUED
+    entity["batch"] = None
+    entity["attempts"] = 0
+    entity["creationdate"] = utils.utcNow()
+    entity.exclude_from_indexes = {"params", "target"}
+    db.Put(entity)
+    return entity.key
+
+
+async def _submit(requests: list[db.Entity]) -> str:
+    """Upload the requests as a batch file and create the batch, returns the ID of the batch"""
+    client = get_openai_client(CONFIG.batch_base_url)
+    lines = (
+        json.dumps({
+            "custom_id": request.key.id_or_name,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": json.loads(jobs.decompress(request["params"])),
+        })
+        for request in requests
+    )
+    batch_file = await client.files.create(
+        file=("viur-assistant-batch.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))),
+        purpose="batch",
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=CONFIG.batch_completion_window,
+    )
+    return batch.id
+
+
+async def _retrieve(batch_id: str) -> tuple[str, dict[str, str | None]]:
+    """
+    Retrieve the status of a batch and, once it's completed, its results.
+
+    :return: The status of the batch and a dictionary mapping the request IDs to
+        the message content of their completion (or None, if the request failed).
+    """
+    client = get_openai_client(CONFIG.batch_base_url)
+    batch = await client.batches.retrieve(batch_id)
+    results = {}
+    if batch.status != "completed":
+        return batch.status, results
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            line = json.loads(line)
+            response = line.get("response") or {}
+            if response.get("status_code") == 200 and not line.get("error"):
+                results[line["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+            else:
+                results[line["custom_id"]] = None
+
+    return batch.status, results
+
+
+def _claim(keys: list[db.Key]) -> list[db.Entity]:
+    """Mark the requests, which are still queued, as submitted (within a transaction), returns them"""
+    claimed = [entity for entity in db.Get(keys) if entity and entity["status"] == BatchStatus.QUEUED]
+    for request in claimed:
+        request["status"] = BatchStatus.SUBMITTED
+        request["attempts"] += 1
+    if claimed:
+        db.Put(claimed)
+    return claimed
+
+
+@PeriodicTask(interval=datetime.timedelta(minutes=10))
+def submit_batch() -> None:
+    """
+    Submit all queued requests (up to ``CONFIG.batch_max_requests``) as a new batch.
+
+    The requests are claimed in transactions first, so overlapping runs never submit a request twice.
+    """
+    query = db.Query(BATCH_REQUEST_KIND).filter("status =", BatchStatus.QUEUED)
+    keys = [request.key for request in query.run(CONFIG.batch_max_requests)]
+    requests = [
+        request
+        for chunk in range(0, len(keys), _CLAIM_CHUNK)
+        for request in db.RunInTransaction(_claim, keys[chunk:chunk + _CLAIM_CHUNK])
+    ]
+    if not requests:
+        return
+
+    try:
+        batch_id = run_sync(_submit(requests))
+    except Exception:
+        for request in requests:
+            request["status"] = BatchStatus.QUEUED
+            request["attempts"] -= 1
+        for chunk in range(0, len(requests), 300):  # db.Put handles at most 300 entities at once
+            db.Put(requests[chunk:chunk + 300])
+        raise
+
+    batch = db.Entity(db.Key(BATCH_KIND, batch_id))
+    batch["status"] = BatchStatus.SUBMITTED
+    batch["requests"] = len(requests)
+    batch["creationdate"] = utils.utcNow()
+    batch["changedate"] = utils.utcNow()
+    db.Put(batch)
+
+    for request in requests:
+        request["batch"] = batch.key
+    for chunk in range(0, len(requests), 300):
+        db.Put(requests[chunk:chunk + 300])
+
+    logger.info(f"Submitted batch {batch_id=} with {len(requests)} requests")
+
+
+@PeriodicTask(interval=datetime.timedelta(minutes=10))
+def poll_batches() -> None:
+    """Poll all submitted batches and apply the results of completed ones"""
+    if (assistant := get_assistant()) is None:
+        logger.error(f"The assistant module is not registered at {CONFIG.module_path=}, can't apply batch results")
+        return
+
+    for batch in db.Query(BATCH_KIND).filter("status =", BatchStatus.SUBMITTED).iter():
+        status, results = run_sync(_retrieve(batch.key.id_or_name))
+        if status in _PENDING_PROVIDER_STATUS:
+            continue
+
+        succeeded = failed = 0
+        for request in db.Query(BATCH_REQUEST_KIND).filter("batch =", batch.key).iter():
+            if request["status"] != BatchStatus.SUBMITTED:
+                continue
+
+            if (content := results.get(request.key.id_or_name)) is not None:
+                try:
+                    with scheduler.lane(scheduler.Priority.BULK):
+                        assistant.apply_batch_result(
+                            request["operation"],
+                            json.loads(request["target"]),
+                            content,
+                        )
+                except Exception as e:
+                    logger.exception(f"Failed to apply result of {request.key!r}: {e}")
+                else:
+                    request["status"] = BatchStatus.DONE
+                    db.Put(request)
+                    succeeded += 1
+                    continue
+
+            # Requeue failed requests for the next batch, until they run out of attempts
+            failed += 1
+            if request["attempts"] < CONFIG.job_max_attempts:
+                request["status"] = BatchStatus.QUEUED
+                request["batch"] = None
+            else:
+                request["status"] = BatchStatus.FAILED
+            db.Put(request)
+
+        batch["status"] = BatchStatus.DONE if status == "completed" else BatchStatus.FAILED
+        batch["provider_status"] = status
+        batch["succeeded"] = succeeded
+        batch["failed"] = failed
+        batch["changedate"] = utils.utcNow()
+        db.Put(batch)
+        logger.info(f"Batch {batch.key.id_or_name!r} is {status}: {succeeded=}, {failed=}")
@@ -1,10 +1,12 @@
 import typing as t
 
-from viur.core import conf, i18n
+from viur.core import conf, db, i18n
 from viur.core.bones import FileBone, StringBone
 from viur.core.skeleton import RelSkel
 
 from .actions import *
+from ..config import CONFIG, get_assistant
+from ..descriptions import get_descriptions
 
 __all__ = [
     "ImageBone",
@@ -35,6 +37,7 @@ class ImageBone(FileBone):
     - Has a using skel with an alt ``StringBone``.
     - Optionally enabling the *Describe Image* bone action, which allows AI to generate an alt-text or caption
       for the uploaded image via an admin-triggerable action.
+    - Optionally pre-filling the alt-text with precomputed descriptions, generated when the image was uploaded.
     """
 
     type = FileBone.type + ".image"
@@ -45,6 +48,7 @@ class ImageBone(FileBone):
         using: t.Type[RelSkel] = ImageBoneRelSkel,
         validMimeTypes: None | t.Iterable[str] = ("image/*",),
         enable_describe_image: bool = True,
+        eager_describe_image: bool = False,
         **kwargs,
     ):
         """
@@ -58,6 +62,10 @@ class ImageBone(FileBone):
         :param validMimeTypes: A list of accepted MIME types. Defaults to only allow image types (``("image/*",)``).
         :param enable_describe_image: If ``True``, the bone will include the ``DESCRIBE_IMAGE`` bone action,
             allowing AI-assisted image description via the vi-admin UI.
+        :param eager_describe_image: If ``True``, an empty alt-text of an ``ImageBoneRelSkel``, which is set
+            from the client (e.g. in the admin) or created from a key, is pre-filled with the precomputed
+            descriptions of the image. Descriptions which don't exist yet are generated in a deferred task,
+            which is queued once per image (see also ``DescribeImageOnUploadMixin``).
         :param kwargs: Additional keyword arguments passed to the base ``FileBone``.
         """
         if enable_describe_image:
@@ -68,3 +76,43 @@ class ImageBone(FileBone):
             validMimeTypes=validMimeTypes,
             **kwargs,
         )
+        self.eager_describe_image = eager_describe_image
+
+    def singleValueFromClient(self, value, skel, bone_name, client_data):
+        res, errors = super().singleValueFromClient(value, skel, bone_name, client_data)
+        if self.eager_describe_image and res:
+            self._prefill_alt(res)
+        return res, errors
+
+    def relskels_from_keys(self, key_rel_list: list[tuple[db.Key, dict | None]]) -> list[dict]:
+        res = super().relskels_from_keys(key_rel_list)
+        if self.eager_describe_image:
+            for value in res:
+                self._prefill_alt(value)
+        return res
+
+    def _prefill_alt(self, value: dict) -> None:
+        """
+        Pre-fill the empty alt-texts of a value with the precomputed descriptions of its image,
+        and queue the preparation of missing descriptions.
+        """
+        if (rel := value["rel"]) is None:
+            rel = value["rel"] = self.using()
+        if "alt" not in rel:
+            return
+
+        filekey = value["dest"]["key"]
+        precomputed = get_descriptions(filekey)
+        alt = rel["alt"] or {}
+
+        for language in conf.i18n.available_languages:
+            if not alt.get(language) and precomputed.get(language):
+                alt[language] = precomputed[language]
+
+        rel["alt"] = alt
+
+        # prepare_image_descriptions generates only the eager languages
+        eager_languages = CONFIG.describe_image_eager_languages or conf.i18n.available_languages
+        if any(language not in precomputed for language in eager_languages):
+            if assistant := get_assistant():
+                assistant.queue_image_descriptions(filekey)
@@ -0,0 +1,50 @@
+"""
+Clients
+
+Asyncio-native clients for the upstream providers.
+
+Clients are created once per API key and reused, so their connection pools
+are shared by all requests of an instance. They must only be used within
+the event loop of the assistant (see :mod:`viur.assistant.concurrency`).
+
+The provider SDKs are imported on first use, as importing them takes
+a noticeable amount of time on the cold start of an instance.
+"""
+
+import typing as t
+
+from viur.assistant.config import CONFIG
+
+if t.TYPE_CHECKING:
+    import anthropic
+    import openai
+
+__all__ = [
+    "get_openai_client",
+    "get_anthropic_client",
+]
+
+_openai_clients: dict[tuple[str, str | None], "openai.AsyncOpenAI"] = {}
+_anthropic_clients: dict[str, "anthropic.AsyncAnthropic"] = {}
+
+
+def get_openai_client(base_url: str | None = None) -> "openai.AsyncOpenAI":
+    """
+    Returns the OpenAI client for the configured API key.
+
+    :param base_url: Optional URL of an OpenAI-compatible API, instead of the official one.
+    """
+    api_key = CONFIG.api_openai_key
+    if not (client := _openai_clients.get((api_key, base_url))):
+        import openai
+        client = _openai_clients[(api_key, base_url)] = openai.AsyncOpenAI(api_key=api_key, base_url=base_url)
+    return client
+
+
+def get_anthropic_client() -> "anthropic.AsyncAnthropic":
+    """Returns the Anthropic client for the configured API key"""
+    api_key = CONFIG.api_anthropic_key
+    if not (client := _anthropic_clients.get(api_key)):
+        import anthropic
+        client = _anthropic_clients[api_key] = anthropic.AsyncAnthropic(api_key=api_key)
+    return client
@@ -0,0 +1,122 @@
+"""
+Concurrency
+
+The assistant performs all upstream I/O with asyncio-native clients.
+
+As ViUR handles requests in threads, a single event loop is run in a background thread
+per instance. Synchronous code submits coroutines to this loop with :func:`run_sync`,
+which copies the context of the caller, so context variables like ``current.request``
+or ``current.user`` remain available within the coroutine.
+
+Sharing one loop allows to keep clients (and their connection pools) alive between
+requests and to fan out many concurrent upstream calls from a single worker thread.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import typing as t
+
+from viur.assistant import tokens
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "get_loop",
+    "run_sync",
+    "gather_bounded",
+]
+
+T = t.TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_thread: threading.Thread | None = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop of the assistant, starts it on first use.
+    """
+    global _loop, _loop_thread
+
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever,
+                name="viur-assistant-loop",
+                daemon=True,
+            )
+            _loop_thread.start()
+            logger.debug(f"Started event loop {_loop!r}")
+
+    return _loop
+
+
+def run_sync(coro: t.Coroutine[t.Any, t.Any, T]) -> T:
+    """
+    Run a coroutine on the event loop of the assistant and wait for its result.
+
+    The coroutine is executed within a copy of the current context.
+
+    :param coro: The coroutine to execute.
+    :return: The result of the coroutine.
+
+    :raises RuntimeError: If called from within the event loop of the assistant,
+        which would result in a deadlock. Await the coroutine directly instead.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from within the assistant event loop")
+
+    context = contextvars.copy_context()
+    future = concurrent.futures.Future()
+
+    def on_done(task: asyncio.Task) -> None:
+        if task.cancelled():
+            future.cancel()
+        elif (exc := task.exception()) is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(task.result())
+
+    def start() -> None:
+        task = loop.create_task(coro, context=context)
+        task.add_done_callback(on_done)
+
+    loop.call_soon_threadsafe(start)
+    return future.result()
+
+
+async def gather_bounded(
+    aws: t.Iterable[t.Awaitable[T]],
+    limit: int | None = None,
+    return_exceptions: bool = False,
+) -> list[T]:
+    """
+    Like :func:`asyncio.gather`, but with a bounded number of concurrently running awaitables.
+
+    :param aws: The awaitables to run.
+    :param limit: The maximum number of awaitables running at once.
+        Defaults to ``CONFIG.async_max_concurrency``.
+    :param return_exceptions: If True, exceptions are returned as results instead of being raised.
+    :return: The results in the order of the awaitables.
+    """
+    semaphore = asyncio.Semaphore(limit or CONFIG.async_max_concurrency)
+
+    async def bounded(aw: t.Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    if return_exceptions or not tokens.is_dry_run():
+        return await asyncio.gather(*(bounded(aw) for aw in aws), return_exceptions=return_exceptions)
+
+    # In a dry-run, let all awaitables reach their upstream call, so that all of them are estimated
+    results = await asyncio.gather(*(bounded(aw) for aw in aws), return_exceptions=True)
+    if exception := next((result for result in results if isinstance(result, BaseException)), None):
+        raise exception
+    return results
@@ -1,7 +1,8 @@
+import datetime
 import logging
 import typing as t
 
-from viur.core.config import ConfigType
+from viur.core.config import ConfigType, conf
 
 ASSISTANT_LOGGER: logging.Logger = logging.getLogger("viur.assistant")
 
@@ -15,6 +16,12 @@ class AssistantConfig(ConfigType):
     api_anthropic_key: str = None
     """API Key for Anthropic"""
 
+    module_path: str = "vi/assistant"
+    """
+    Path of the ``Assistant`` module within ``conf.main_app``, which is used by deferred and periodic tasks,
+    bones and the file module mixin, see :func:`get_assistant`.
+    """
+
     language_map: t.Dict[str, str] = {
         "de": "German",
         "de-DE-x-simple-language": "Deutsch, einfache Sprache",
@@ -66,6 +73,95 @@ class AssistantConfig(ConfigType):
     This structure allows combining a base set of rules with additional style-specific ones.
     """
 
+    translate_segmented: bool = True
+    """
+    Translate HTML texts segment by segment, see :mod:`viur.assistant.segments`.
+
+    Only the translatable text nodes and attribute values are sent to the model, instead of the raw HTML,
+    and the translations are re-inserted into the original markup.
+    """
+
+    translate_chunk_tokens: int = 1_000
+    """
+    Token budget of the chunks, into which long texts are split for translation.
+
+    The chunks are split at paragraph and block boundaries and are translated concurrently,
+    so that the time of a translation is about the time of its largest chunk.
+    Plain texts up to this size are translated in a single request.
+    """
+
+    translate_chunk_overlap: int = 2
+    """
+    Number of segments of the preceding chunk, which are given as context when translating a chunk.
+    """
+
+    translation_memory: bool = False
+    """
+    Store translated segments and serve known segments from this memory,
+    see :mod:`viur.assistant.translationmemory`.
+
+    When enabled, every plain text is translated segmented (instead of in a single prompt),
+    and each translation reads and writes the datastore.
+    """
+
+    translation_memory_ttl: datetime.timedelta = datetime.timedelta(days=90)
+    """
+    How long a remembered segment or field is kept after it was last translated.
+    """
+
+    translation_memory_fuzzy_threshold: t.Optional[float] = 0.8
+    """
+    Minimum similarity (between 0 and 1) of a stored segment, so that its translation is given
+    to the model as a hint when translating a new segment. ``None`` disables the fuzzy lookup.
+    """
+
+    translate_language_characteristic_map: dict[str, str] = {}
+    """
+    Maps language codes to the characteristic, which is used by ``translate_all`` for this language.
+
+    Language codes with a private-use subtag of a defined characteristic (like ``"de-x-simple"``)
+    use this characteristic by default.
+    """
+
+    translate_output_tokens: int = 4_000
+    """
+    Output token limit for the combined translations of ``translate_all`` in a single request.
+    If the translations into all languages would exceed it, the languages are split into parallel requests.
+    """
+
+    translate_module_batch_size: int = 50
+    """
+    Number of entries, which are processed by a single deferred task of ``translate_module``.
+    Progress is checkpointed after each batch. Limited to 100 by the datastore.
+    """
+
+    translate_module_write_batch_size: int = 25
+    """
+    Number of translated entries of ``translate_module``, which are written back in a single transaction.
+    """
+
+    translate_module_max_items_per_second: t.Optional[float] = 2.0
+    """
+    Maximum throughput of ``translate_module`` in entries per second, to protect the rate-limits
+    of the provider and the interactive use of the assistant. ``None`` disables the cap.
+    """
+
+    batch_base_url: t.Optional[str] = None
+    """
+    URL of an OpenAI-compatible API for the batch API, see :mod:`viur.assistant.batches`.
+    Defaults to the official API, use ``http://localhost:8090/v1`` for the stand-in server ``tests/batch_server.py``.
+    """
+
+    batch_max_requests: int = 1_000
+    """
+    Maximum number of queued requests, which are submitted in a single batch.
+    """
+
+    batch_completion_window: str = "24h"
+    """
+    The time frame within which a batch should be processed by the provider.
+    """
+
     describe_image_jpeg_quality_default = 50
     """
     Default JPEG compression quality used when resizing and encoding images.
@@ -82,23 +178,282 @@ class AssistantConfig(ConfigType):
     Used by `_get_resized_image_bytes` if no other value is provided.
     """
 
-    # TODO: make client set-able?
-    '''
-    describe_image_pixel_min = 1_000
+    async_max_concurrency: int = 16
+    """
+    Maximum number of concurrent upstream calls when fanning out many requests at once,
+    e.g. in batch and backfill operations.
+    """
+
+    input_token_budget: dict[str, int] = {
+        "*": 100_000,
+    }
+    """
+    Maximum estimated input tokens of a single upstream request by model, ``"*"`` applies to all other models.
+    Larger requests are rejected before they're sent, see :mod:`viur.assistant.tokens`.
+    """
+
+    usage_quotas: dict[str, dict[str, int]] = {}
+    """
+    Daily quotas per user by operation, ``"*"`` limits all operations together, see :mod:`viur.assistant.usage`.
+
+    Each quota maps a metric (``tokens``, ``input_tokens``, ``output_tokens``, ``images`` or ``calls``)
+    to its limit, e.g. ``{"*": {"tokens": 1_000_000}, "describe_image": {"images": 500}}``.
+    Operations are named like the exposed methods, ``translate_module`` covers the whole backfill.
+    """
+
+    usage_quota_tolerance: float = 0.05
+    """
+    Share of a quota, within which the usage is read from the datastore instead of the cache of the instance,
+    and thus accurate up to the unflushed usage of other instances.
+    """
+
+    usage_shards: int = 8
+    """
+    Number of shards of a usage counter. More shards allow more concurrent flushes of the same counter,
+    but make reads more expensive. Don't decrease it, as the usage in the higher shards would be ignored.
+    """
+
+    usage_flush_interval: int = 30
+    """
+    Maximum number of seconds the usage is aggregated in an instance, before it's flushed into the datastore.
+    """
+
+    usage_read_ttl: int = 60
+    """
+    Number of seconds a read of a usage counter is cached per instance.
+    """
+
+    usage_retention: datetime.timedelta = datetime.timedelta(days=90)
+    """
+    How long the usage counters of a day are kept.
+    """
+
+    config_cache_ttl: t.Optional[datetime.timedelta] = datetime.timedelta(minutes=1)
+    """
+    How long the configuration stored in the assistant singleton is cached per instance.
+    The cache of the instance handling an edit is cleared immediately. ``None`` disables the cache.
+    """
+
+    warmup_preconnect: bool = False
+    """
+    Open pooled connections to the configured providers during :meth:`Assistant.warmup`,
+    by listing their models.
+    """
+
+    warmup_modules: t.Optional[list[str]] = None
+    """
+    Modules whose structures are computed during :meth:`Assistant.warmup`.
+    ``None`` means all ``List`` and ``Tree`` modules.
+    """
+
+    scheduler_capacity: int = 16
+    """
+    Maximum number of upstream calls, which run at once per instance, see :mod:`viur.assistant.scheduler`.
+    """
+
+    scheduler_interactive_reserved: int = 4
+    """
+    Number of the ``scheduler_capacity`` slots, which are reserved for interactive requests.
+    """
+
+    scheduler_interactive_wait_target: float = 1.0
+    """
+    Maximum wait time (in seconds) of interactive requests for a slot.
+    If it's exceeded, bulk traffic is throttled.
+    """
+
+    singleflight_cross_instance: bool = False
+    """
+    Coalesce identical concurrent ``translate`` and ``describe_image`` requests across instances.
+
+    Identical requests within an instance are always coalesced. If enabled, a marker entity
+    in the datastore additionally allows other instances to await the result of the leader.
+    """
+
+    singleflight_timeout: int = 30
+    """
+    Maximum number of seconds a follower waits for the leader on another instance,
+    before it performs the request on its own.
+    """
+
+    singleflight_result_ttl: int = 10
+    """
+    Number of seconds the result of a cross-instance leader is kept for late followers.
+    """
+
+    script_cache: bool = True
+    """
+    Cache the results of ``generate_script``, see :mod:`viur.assistant.scriptcache`.
+    A request can bypass the cache with ``bypass_cache=True``.
+    """
+
+    script_cache_ttl: datetime.timedelta = datetime.timedelta(days=1)
+    """
+    How long results of ``generate_script`` are cached.
+    """
+
+    script_cache_similarity_threshold: t.Optional[float] = None
+    """
+    Minimum cosine similarity (between 0 and 1) of the embeddings of two prompts in the same context,
+    so that the cached result of one is served for the other. ``None`` disables the similarity tier.
+
+    Use a high value (like 0.95), as the default embedder only captures the lexical similarity,
+    e.g. prompts differing in a single number are very similar.
+    """
+
+    script_cache_embedder: t.Optional[t.Callable[[str], t.Sequence[float]]] = None
+    """
+    Computes the embedding of a prompt for the similarity tier of the script cache.
+    ``None`` uses the offline feature-hashing embedder :func:`viur.assistant.scriptcache.hashed_embedding`.
+    """
+
+    script_session_ttl: datetime.timedelta = datetime.timedelta(days=1)
+    """
+    How long a script session is kept after its last turn, see :mod:`viur.assistant.scriptsessions`.
+    """
+
+    script_session_history_tokens: int = 8_000
+    """
+    Estimated tokens of the history of a script session, above which the older turns are summarized.
+    """
+
+    script_session_keep_turns: int = 2
+    """
+    Number of the latest turns of a script session, which are never summarized.
+    """
+
+    script_session_summary_tokens: int = 1_000
+    """
+    Maximum tokens of the summary of a script session.
+    """
+
+    job_ttl: datetime.timedelta = datetime.timedelta(days=1)
+    """
+    Time-to-live of an assistant job.
+
+    After this period a job, including its result, is no longer available
+    and will be purged by a periodic task.
+    """
+
+    job_long_poll_timeout: int = 25
+    """
+    Maximum number of seconds a ``job_result`` request waits for a job to finish.
+
+    Should stay below the request timeout of the frontend instances.
+    """
+
+    job_max_attempts: int = 3
+    """
+    Maximum number of attempts for a job which failed due to a temporary error
+    (like a rate-limit or an unavailable service), before it's marked as failed.
+    """
+
+    describe_image_upload_once: bool = False
+    """
+    Upload preprocessed images once into the file module and send only their URL to the provider,
+    instead of inlining them base64-encoded into every request.
+
+    The reference is cached and reused for further requests on the same image (e.g. in other languages
+    or on retries). The provider must be able to fetch the URL, so this doesn't work on a local
+    development server.
+    """
+
+    image_reference_ttl: datetime.timedelta = datetime.timedelta(days=1)
+    """
+    Time-to-live of an uploaded image reference, stale uploads are evicted by a periodic task.
+    """
+
+    image_reference_base_url: t.Optional[str] = None
+    """
+    Base URL (like ``https://www.example.com``) used to build absolute URLs of uploaded image references.
+    Defaults to the host of the current request.
+    """
+
+    describe_images_batch_size: int = 8
+    """
+    Maximum number of images which are described within one request in gallery mode (``describe_images``).
+    """
+
+    describe_image_eager_languages: t.Optional[list[str]] = None
+    """
+    Languages for which image descriptions are generated in advance,
+    e.g. when an image is uploaded (see ``DescribeImageOnUploadMixin``).
+
+    Defaults to all available languages (``conf.i18n.available_languages``).
+    """
+
+    describe_image_eager_batch: bool = False
+    """
+    Queue eagerly generated image descriptions for the batch API (see :mod:`viur.assistant.batches`),
+    instead of generating them immediately. This is cheaper, but they can take up to a day.
+    """
+
+    describe_image_eager_pending: datetime.timedelta = datetime.timedelta(hours=1)
+    """
+    How long the eager preparation of the descriptions of an image is considered in progress.
+    Within this time, the preparation isn't queued again (e.g. on repeated saves of an ``ImageBone``).
+    With ``describe_image_eager_batch``, it's at least a day.
+    """
+
+    describe_image_hash_max_distance: t.Optional[int] = 3
+    """
+    Maximum Hamming distance between the perceptual hashes (dHash) of two images to consider them near-identical.
+
+    The description of a near-identical image (by the same model and preprocessing, in the same language,
+    with the same prompt and context) is reused instead of requesting a new one.
+    The index only guarantees to find distances up to 3, so larger values are capped to 3.
+    Set to ``None`` to disable the reuse.
+    """
+
+    describe_image_adaptive: bool = True
+    """
+    Use the adaptive preprocessing policy for images.
+
+    Uniform borders are trimmed, the pixel budget (within ``describe_image_pixel_min`` and
+    ``describe_image_pixel_max``) and the detail level are chosen by the content and aspect ratio
+    of the image, and the format with the smallest payload is used.
+    If disabled, images are always resized to ``describe_image_pixel_default`` and sent as JPEG in low detail.
+    """
+
+    describe_image_pixel_min: int = 1_000
     """
     Minimum allowed pixel count when resizing an image.
     Prevents extremely small images that may lack meaningful visual information
     for AI-based interpretation.
     """
 
-    describe_image_pixel_max = 200_000
+    describe_image_pixel_max: int = 200_000
     """
     Maximum allowed pixel count when resizing an image.
     Limits image resolution to avoid high token usage and ensure efficient
     processing when generating AI-based descriptions.
     """
 
-    '''
+    describe_image_min_short_side: int = 128
+    """
+    Minimum length in pixels of the short side of an image with an extreme aspect ratio
+    (like a panorama or a banner), to keep its content legible. Still limited by ``describe_image_pixel_max``.
+    """
+
+    describe_image_high_detail_complexity: float | None = None
+    """
+    Minimum visual complexity (between 0 and 1, estimated by edge density) of an image,
+    to request it in "high" detail. Less complex images are sent in "low" detail.
+
+    "high" detail costs several times the tokens of "low" detail (for ``gpt-4o-mini`` 2833 tokens
+    plus 5667 per 512px tile, instead of 2833), so it's opt-in: ``None`` always uses "low" detail.
+    """
+
+    describe_image_formats: list[t.Literal["JPEG", "WEBP"]] = ["JPEG", "WEBP"]
+    """
+    Output formats to try for an image, the one with the smallest payload is used.
+    """
+
+    describe_image_webp_quality_default: int = 50
+    """
+    Default WebP compression quality used when encoding images.
+    Valid range is 0 (lowest quality) to 100 (best quality).
+    """
 
 
 CONFIG: t.Final[AssistantConfig] = AssistantConfig(
@@ -107,3 +462,14 @@ CONFIG: t.Final[AssistantConfig] = AssistantConfig(
 """
 The viur-assistent config instance.
 """
+
+
+def get_assistant() -> t.Any:
+    """
+    Returns the ``Assistant`` module registered at ``CONFIG.module_path``, or None if it's not registered.
+    """
+    module = conf.main_app
+    for name in CONFIG.module_path.strip("/").split("/"):
+        if (module := getattr(module, name, None)) is None:
+            return None
+    return module
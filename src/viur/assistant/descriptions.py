@@ -0,0 +1,89 @@
+"""
+Image descriptions
+
+Storage for precomputed image descriptions (alt texts).
+
+Descriptions are stored per file in an entity of the kind ``viur-assistant-image-description``,
+mapping language codes to the generated description. Only descriptions generated without
+a custom prompt or context are stored, as only these are reusable.
+
+While descriptions are prepared in advance, the entity is marked as pending, so the preparation isn't queued twice.
+"""
+
+import datetime
+import typing as t
+
+from viur.core import db, utils
+
+__all__ = [
+    "DESCRIPTION_KIND",
+    "get_descriptions",
+    "set_description",
+    "mark_pending",
+]
+
+DESCRIPTION_KIND: t.Final[str] = "viur-assistant-image-description"
+"""The datastore kind of the stored descriptions"""
+
+
+def _get_key(filekey: db.Key | str) -> db.Key:
+    return db.Key(DESCRIPTION_KIND, str(db.keyHelper(filekey, "file").id_or_name))
+
+
+def get_descriptions(filekey: db.Key | str) -> dict[str, str]:
+    """
+    Returns the stored descriptions of a file.
+
+    :param filekey: Key of the file.
+    :return: A dictionary mapping language codes to descriptions.
+    """
+    if entity := db.Get(_get_key(filekey)):
+        return entity["descriptions"] or {}
+    return {}
+
+
+def _get_entity(filekey: db.Key | str) -> db.Entity:
+    key = _get_key(filekey)
+    if not (entity := db.Get(key)):
+        entity = db.Entity(key)
+        entity["file"] = db.keyHelper(filekey, "file")
+        entity["descriptions"] = {}
+        entity.exclude_from_indexes = {"descriptions"}
+    return entity
+
+
+def set_description(filekey: db.Key | str, language: str, description: str) -> None:
+    """
+    Store the description of a file for a language.
+
+    :param filekey: Key of the file.
+    :param language: Language code of the description.
+    :param description: The description.
+    """
+    def txn():
+        entity = _get_entity(filekey)
+        entity["descriptions"] = (entity["descriptions"] or {}) | {language: description}
+        entity["changedate"] = utils.utcNow()
+        db.Put(entity)
+
+    db.RunInTransaction(txn)
+
+
+def mark_pending(filekey: db.Key | str, duration: datetime.timedelta) -> bool:
+    """
+    Mark the preparation of the descriptions of a file as pending, unless it's already pending.
+
+    :param filekey: Key of the file.
+    :param duration: How long the preparation is considered pending.
+    :return: True if the file has been marked, False if a preparation is already pending.
+    """
+    def txn():
+        entity = _get_entity(filekey)
+        now = utils.utcNow()
+        if entity.get("pending_until") and entity["pending_until"] > now:
+            return False
+        entity["pending_until"] = now + duration
+        db.Put(entity)
+        return True
+
+    return db.RunInTransaction(txn)
@@ -0,0 +1,28 @@
+"""
+Expiry
+
+Shared purge of expired entities.
+
+Entities with a limited lifetime (like jobs, sessions or cached results) store their expiration time
+in the indexed property ``expires``. The periodic tasks of their modules delete them with :func:`purge_expired`.
+"""
+
+from viur.core import db, utils
+
+__all__ = [
+    "purge_expired",
+]
+
+
+def purge_expired(kind: str) -> int:
+    """
+    Delete all entities of a kind whose ``expires`` has passed.
+
+    :param kind: The datastore kind.
+    :return: The number of deleted entities.
+    """
+    query = db.Query(kind).filter("expires <", utils.utcNow())
+    keys = [entity.key for entity in query.iter()]
+    for chunk in range(0, len(keys), 300):  # db.Delete handles at most 300 keys at once
+        db.Delete(keys[chunk:chunk + 300])
+    return len(keys)
@@ -0,0 +1,170 @@
+"""
+Image hash
+
+Perceptual hash index to reuse image descriptions across duplicate images.
+
+For every described image, a 64-bit difference hash (dHash) is computed during preprocessing.
+The hash is stored in an entity of the kind ``viur-assistant-image-hash``, together with the
+generated descriptions per *variant* (model, preprocessing parameters, detail level, language, prompt and context).
+
+Similar images have hashes with a small Hamming distance. To find candidates without a full scan,
+the hash is split into four 16-bit bands, which are stored as an indexed list property.
+If two hashes differ in at most three bits, at least one of their bands is equal (pigeonhole principle),
+so candidates are found by exact band matches and verified by their Hamming distance.
+Larger values of ``CONFIG.describe_image_hash_max_distance`` are therefore capped to three.
+"""
+
+import random
+import typing as t
+
+from viur.core import db, utils
+
+from viur.assistant import tokens
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+if t.TYPE_CHECKING:
+    from PIL import Image
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "IMAGE_HASH_KIND",
+    "IMAGE_HASH_STATS_KIND",
+    "dhash",
+    "hamming_distance",
+    "find_description",
+    "store_description",
+    "get_stats",
+]
+
+IMAGE_HASH_KIND: t.Final[str] = "viur-assistant-image-hash"
+"""The datastore kind of the hash index"""
+
+IMAGE_HASH_STATS_KIND: t.Final[str] = "viur-assistant-image-hash-stats"
+"""The datastore kind of the (sharded) hit/miss counters"""
+
+_BANDS: t.Final[int] = 4
+_BAND_BITS: t.Final[int] = 64 // _BANDS
+_STATS_SHARDS: t.Final[int] = 8
+
+
+def dhash(image: "Image.Image") -> int:
+    """
+    Compute the 64-bit difference hash of an image.
+
+    The image is reduced to 9x8 grayscale pixels, and each bit encodes
+    whether a pixel is brighter than its right neighbour.
+    """
+    from PIL import Image
+
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Returns the number of differing bits of two hashes"""
+    return (a ^ b).bit_count()
+
+
+def _bands(value: int) -> list[str]:
+    mask = (1 << _BAND_BITS) - 1
+    return [f"{i}:{(value >> (i * _BAND_BITS)) & mask:04x}" for i in range(_BANDS)]
+
+
+def find_description(value: int, variant: str) -> str | None:
+    """
+    Find the description of a near-identical image.
+
+    :param value: The dHash of the image.
+    :param variant: Key of the variant (model, preprocessing, language, prompt and context) of the description.
+    :return: The description of the closest matching image within
+        ``CONFIG.describe_image_hash_max_distance`` (at most 3), or None.
+    """
+    if (max_distance := CONFIG.describe_image_hash_max_distance) is None:
+        return None
+    if max_distance > _BANDS - 1:
+        logger.warning(f"describe_image_hash_max_distance={max_distance} exceeds the index, using {_BANDS - 1}")
+        max_distance = _BANDS - 1
+
+    best = None
+    seen = set()
+    for band in _bands(value):
+        for entity in db.Query(IMAGE_HASH_KIND).filter("bands =", band).run(50):
+            if entity.key in seen:
+                continue
+            seen.add(entity.key)
+
+            distance = hamming_distance(value, int(entity["dhash"], 16))
+            if (
+                distance <= max_distance
+                and (description := (entity["descriptions"] or {}).get(variant))
+                and (best is None or distance < best[0])
+            ):
+                best = (distance, description)
+
+    if not tokens.is_dry_run():
+        _count("hits" if best else "misses")
+    if best:
+        logger.debug(f"Found description with distance {best[0]} for {value=:016x}")
+        return best[1]
+    return None
+
+
+def store_description(value: int, variant: str, description: str) -> None:
+    """
+    Store the description of an image in the index.
+
+    :param value: The dHash of the image.
+    :param variant: Key of the variant (model, preprocessing, language, prompt and context) of the description.
+    :param description: The description.
+    """
+    key = db.Key(IMAGE_HASH_KIND, f"{value:016x}")
+
+    def txn():
+        if not (entity := db.Get(key)):
+            entity = db.Entity(key)
+            entity["dhash"] = f"{value:016x}"
+            entity["bands"] = _bands(value)
+            entity["descriptions"] = {}
+            entity.exclude_from_indexes = {"descriptions"}
+        entity["descriptions"] = (entity["descriptions"] or {}) | {variant: description}
+        entity["changedate"] = utils.utcNow()
+        db.Put(entity)
+
+    db.RunInTransaction(txn)
+
+
+def _count(name: str) -> None:
+    """Increment a hit/miss counter on a random shard"""
+    key = db.Key(IMAGE_HASH_STATS_KIND, f"shard-{random.randrange(_STATS_SHARDS)}")
+
+    def txn():
+        if not (entity := db.Get(key)):
+            entity = db.Entity(key)
+        entity[name] = (entity.get(name) or 0) + 1
+        db.Put(entity)
+
+    try:
+        db.RunInTransaction(txn)
+    except Exception as e:  # statistics must never break a request
+        logger.warning(f"Failed to count {name!r}: {e!r}")
+
+
+def get_stats() -> dict[str, t.Any]:
+    """Returns the summed-up hit/miss counters of the index"""
+    hits = misses = 0
+    for entity in db.Get([db.Key(IMAGE_HASH_STATS_KIND, f"shard-{i}") for i in range(_STATS_SHARDS)]):
+        if entity:
+            hits += entity.get("hits") or 0
+            misses += entity.get("misses") or 0
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+        "entries": db.Query(IMAGE_HASH_KIND).count(),
+    }
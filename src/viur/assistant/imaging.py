@@ -0,0 +1,170 @@
+"""
+Imaging
+
+Adaptive preprocessing policy for images, which are sent to a vision model.
+
+Instead of a fixed pixel count and detail level, the policy
+
+- trims uniform borders, which carry no information,
+- chooses the pixel budget from the visual complexity and the aspect ratio of the image,
+  within ``CONFIG.describe_image_pixel_min`` and ``CONFIG.describe_image_pixel_max``,
+- uses ``"high"`` detail only for complex content and if enabled by ``CONFIG.describe_image_high_detail_complexity``,
+- encodes the image in the format with the smallest payload, and
+- estimates the image tokens of the request.
+
+See https://platform.openai.com/docs/guides/images?api-mode=chat#calculating-costs
+
+Pillow is imported on first use, to keep it out of the cold start of an instance.
+"""
+
+import io
+import math
+import typing as t
+
+from viur.assistant.config import CONFIG
+
+if t.TYPE_CHECKING:
+    from PIL import Image
+
+__all__ = [
+    "LOW_DETAIL_SIZE",
+    "trim_borders",
+    "complexity",
+    "choose_pixel_budget",
+    "choose_detail",
+    "estimate_image_tokens",
+    "encode_smallest",
+]
+
+LOW_DETAIL_SIZE: t.Final[int] = 512
+"""Images are resized by OpenAI to fit into a square of this size in ``"low"`` detail"""
+
+IMAGE_TOKEN_COSTS: t.Final[dict[str, tuple[int, int]]] = {
+    "gpt-4o-mini": (2833, 5667),
+    "*": (85, 170),
+}
+"""Base tokens and tokens per 512px tile of an image, by model"""
+
+MIME_TYPES: t.Final[dict[str, str]] = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+"""Supported output formats and their mime types"""
+
+
+def trim_borders(image: "Image.Image", tolerance: int = 10) -> "Image.Image":
+    """
+    Crop uniform borders of an image.
+
+    The color of the top-left pixel is considered as the border color.
+
+    :param image: The image to trim.
+    :param tolerance: Maximum difference of a pixel to the border color to be considered as border.
+    :return: The trimmed image, or the image itself if there is nothing to trim.
+    """
+    from PIL import Image, ImageChops
+
+    background = Image.new(image.mode, image.size, image.getpixel((0, 0)))
+    difference = ImageChops.difference(image, background).convert("L")
+    bbox = difference.point(lambda value: 255 if value > tolerance else 0).getbbox()
+    if not bbox or bbox == (0, 0, image.width, image.height):
+        return image
+    return image.crop(bbox)
+
+
+def complexity(image: "Image.Image") -> float:
+    """
+    Estimate the visual complexity of an image by its edge density.
+
+    :return: A value between 0 (plain) and 1 (very detailed).
+    """
+    from PIL import ImageFilter, ImageStat
+
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((256, 256))
+    edges = thumbnail.filter(ImageFilter.FIND_EDGES)
+    # an average edge intensity of 64 is already a very busy image
+    return min(1.0, ImageStat.Stat(edges).mean[0] / 64)
+
+
+def choose_pixel_budget(image: "Image.Image", target_pixel_count: int, image_complexity: float) -> int:
+    """
+    Choose the pixel budget of an image.
+
+    Plain images get less, detailed images more pixels than the target pixel count.
+    Images with an extreme aspect ratio get enough pixels to keep their short side legible.
+    The budget is limited by the configured minimum and maximum pixel count.
+
+    :param image: The (trimmed) image.
+    :param target_pixel_count: The default pixel count.
+    :param image_complexity: The complexity of the image, see :func:`complexity`.
+    :return: The pixel budget.
+    """
+    budget = target_pixel_count * (0.5 + 1.5 * image_complexity)
+
+    aspect_ratio = max(image.width, image.height) / min(image.width, image.height)
+    min_short_side = CONFIG.describe_image_min_short_side
+    budget = max(budget, min_short_side * min_short_side * aspect_ratio)
+
+    return round(min(max(budget, CONFIG.describe_image_pixel_min), CONFIG.describe_image_pixel_max))
+
+
+def choose_detail(width: int, height: int, image_complexity: float) -> t.Literal["low", "high"]:
+    """
+    Choose the detail level of an image.
+
+    ``"low"`` is sufficient if the image fits into the low detail size anyway,
+    or if its content is not detailed enough to benefit from a higher resolution.
+    ``"high"`` is never chosen unless enabled by ``CONFIG.describe_image_high_detail_complexity``,
+    as it always costs more tokens.
+    """
+    if (threshold := CONFIG.describe_image_high_detail_complexity) is None:
+        return "low"
+    if max(width, height) <= LOW_DETAIL_SIZE:
+        return "low"
+    if image_complexity >= threshold:
+        return "high"
+    return "low"
+
+
+def estimate_image_tokens(width: int, height: int, detail: str, model: str) -> int:
+    """
+    Estimate the image tokens of an image, as calculated by OpenAI.
+
+    :param width: Width of the image.
+    :param height: Height of the image.
+    :param detail: The detail level, ``"low"`` or ``"high"``.
+    :param model: The model which is used.
+    :return: The estimated number of image tokens.
+    """
+    base, per_tile = IMAGE_TOKEN_COSTS.get(model, IMAGE_TOKEN_COSTS["*"])
+    if detail == "low":
+        return base
+
+    # fit into 2048x2048, then scale the shortest side down to 768
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    if (shortest := min(width, height)) > 768:
+        width, height = width * 768 / shortest, height * 768 / shortest
+
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return base + per_tile * tiles
+
+
+def encode_smallest(image: "Image.Image", jpeg_quality: int, webp_quality: int) -> tuple[bytes, str]:
+    """
+    Encode an image in all configured formats and return the smallest result.
+
+    :param image: The image to encode.
+    :param jpeg_quality: The quality used for JPEG.
+    :param webp_quality: The quality used for WebP.
+    :return: The encoded image and its mime type.
+    """
+    qualities = {"JPEG": jpeg_quality, "WEBP": webp_quality}
+    best = None
+    for image_format in CONFIG.describe_image_formats:
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, quality=qualities[image_format])
+        if best is None or buffer.tell() < len(best[0]):
+            best = (buffer.getvalue(), MIME_TYPES[image_format])
+    return best
@@ -0,0 +1,149 @@
+"""
+Jobs
+
+Persistence helpers for long-running assistant operations.
+
+A job is a plain datastore entity of the kind ``viur-assistant-job``.
+It stores the requested operation with its raw parameters, the current status
+and, once finished, the rendered result in a compressed form.
+Jobs expire after ``CONFIG.job_ttl`` and are purged periodically.
+"""
+
+import datetime
+import json
+import typing as t
+import zlib
+
+from viur.core import db, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant import expiry
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "JOB_KIND",
+    "JobStatus",
+    "create_job",
+    "get_job",
+    "update_job",
+    "compress",
+    "decompress",
+    "job_to_dict",
+]
+
+JOB_KIND: t.Final[str] = "viur-assistant-job"
+"""The datastore kind of the job entities"""
+
+
+class JobStatus:
+    PENDING: t.Final[str] = "pending"
+    """Job is queued, but not yet started"""
+
+    RUNNING: t.Final[str] = "running"
+    """Job is currently executed by a deferred task"""
+
+    DONE: t.Final[str] = "done"
+    """Job has finished successfully, the result is available"""
+
+    FAILED: t.Final[str] = "failed"
+    """Job has failed, the error is available"""
+
+
+def compress(data: str) -> bytes:
+    """Compress a (rendered) result for storage"""
+    return zlib.compress(data.encode("utf-8"), level=9)
+
+
+def decompress(data: bytes) -> str:
+    """Decompress a result written by :func:`compress`"""
+    return zlib.decompress(data).decode("utf-8")
+
+
+def create_job(
+    operation: str,
+    params: dict[str, t.Any],
+    owner: db.Key | None = None,
+) -> db.Entity:
+    """
+    Create and store a new pending job.
+
+    :param operation: Name of the assistant operation to execute.
+    :param params: The (raw) parameters to pass to the operation.
+    :param owner: Key of the user who submitted the job.
+    :return: The stored job entity.
+    """
+    now = utils.utcNow()
+    entity = db.Entity(db.Key(JOB_KIND, utils.string.random(32)))
+    entity["operation"] = operation
+    entity["params"] = json.dumps(params, separators=(",", ":"))
+    entity["status"] = JobStatus.PENDING
+    entity["owner"] = owner
+    entity["attempts"] = 0
+    entity["creationdate"] = now
+    entity["changedate"] = now
+    entity["expires"] = now + CONFIG.job_ttl
+    entity["content_type"] = None
+    entity["result"] = None
+    entity["error"] = None
+    entity["progress"] = None
+    entity.exclude_from_indexes = {"params", "result", "error", "content_type", "progress"}
+    db.Put(entity)
+    return entity
+
+
+def get_job(key: db.Key | str) -> db.Entity | None:
+    """
+    Fetch a job by its key, expired jobs are treated as non-existing.
+
+    :param key: The job key or the name of the job key.
+    :return: The job entity, or None if it doesn't exist (anymore).
+    """
+    if not isinstance(key, db.Key):
+        key = db.Key(JOB_KIND, str(key))
+    if not (entity := db.Get(key)) or entity["expires"] < utils.utcNow():
+        return None
+    return entity
+
+
+def update_job(key: db.Key, **values: t.Any) -> db.Entity | None:
+    """
+    Transactionally update the given values of a job.
+
+    :param key: The job key.
+    :param values: The properties to set.
+    :return: The updated job entity, or None if the job doesn't exist (anymore).
+    """
+
+    def txn():
+        if not (entity := db.Get(key)):
+            return None
+        entity.update(values)
+        entity["changedate"] = utils.utcNow()
+        db.Put(entity)
+        return entity
+
+    return db.RunInTransaction(txn)
+
+
+def job_to_dict(entity: db.Entity) -> dict[str, t.Any]:
+    """Returns the public status representation of a job"""
+    return {
+        "key": entity.key.id_or_name,
+        "operation": entity["operation"],
+        "status": entity["status"],
+        "attempts": entity["attempts"],
+        "creationdate": entity["creationdate"].isoformat(),
+        "changedate": entity["changedate"].isoformat(),
+        "expires": entity["expires"].isoformat(),
+        "error": json.loads(entity["error"]) if entity["error"] else None,
+        "progress": json.loads(entity["progress"]) if entity.get("progress") else None,
+    }
+
+
+@PeriodicTask(interval=datetime.timedelta(hours=1))
+def purge_expired_jobs() -> None:
+    """Delete all jobs whose TTL has been exceeded"""
+    if count := expiry.purge_expired(JOB_KIND):
+        logger.info(f"Purged {count} expired jobs")
@@ -1,23 +1,88 @@
+import asyncio
 import base64
+import contextlib
+import dataclasses
+import datetime
+import hashlib
 import io
 import json
 import os
+import time
 import typing as t
 from json import JSONDecodeError
 
-import PIL
-import anthropic
-import openai
-from openai.types import ChatModel
-from openai.types.chat import ChatCompletionMessageParam
 from viur.core import conf, current, db, errors, exposed, utils
+from viur.core.bones import StringBone, TextBone
 from viur.core.decorators import access, force_post
 from viur.core.prototypes import List, Singleton, Tree
-
+from viur.core.render.json.default import CustomJsonEncoder
+from viur.core.skeleton import SkeletonInstance
+from viur.core.tasks import CallDeferred
+
+from viur.assistant import (
+    batches,
+    descriptions,
+    imagehash,
+    imaging,
+    jobs,
+    references,
+    scheduler,
+    scriptcache,
+    scriptsessions,
+    segments,
+    tokens,
+    translationmemory,
+    usage,
+)
+from viur.assistant.clients import get_anthropic_client, get_openai_client
+from viur.assistant.concurrency import gather_bounded, get_loop, run_sync
 from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+from viur.assistant.singleflight import make_key, single_flight
+
+if t.TYPE_CHECKING:  # the provider SDKs and Pillow are imported on first use, to speed up cold starts
+    import anthropic
+    from openai.types import ChatModel
+    from openai.types.chat import ChatCompletionMessageParam
 
 logger = ASSISTANT_LOGGER.getChild(__name__)
 
+_config_cache: tuple[float, SkeletonInstance] | None = None
+"""The cached configuration and its (monotonic) expiration time, see :meth:`Assistant.get_config`"""
+
+_structure_cache: dict[tuple[str, str | None], dict] = {}
+"""The cached module structures by module name and language, see :meth:`Assistant.get_viur_structures`"""
+
+_STRUCTURE_ESSENTIALS: t.Final[frozenset[str]] = frozenset({
+    "type", "descr", "multiple", "required", "languages", "values", "module", "using", "relskel",
+})
+"""Properties of a bone structure, which are kept when structures are reduced to fit the input budget"""
+
+
+@dataclasses.dataclass(frozen=True)
+class PreprocessedImage:
+    """An image, prepared to be sent to an AI model"""
+
+    data: bytes
+    """The encoded image"""
+
+    mimetype: str
+    """Mime type of the encoded image"""
+
+    width: int
+    """Width of the encoded image in pixels"""
+
+    height: int
+    """Height of the encoded image in pixels"""
+
+    detail: t.Literal["low", "high"]
+    """Detail level to request for the image"""
+
+    dhash: int
+    """Perceptual difference hash of the image, see :mod:`viur.assistant.imagehash`"""
+
+    url: str | None = None
+    """URL of the uploaded image, if it's referenced instead of inlined, see :mod:`viur.assistant.references`"""
+
 
 class Assistant(Singleton):
     """
@@ -42,6 +107,10 @@ class Assistant(Singleton):
      - this singleton skel itself.
      - The backend configuration `CONFIG`.
 
+    All upstream I/O is implemented asynchronously (``*_async`` methods)
+    and runs on a shared event loop, see :mod:`viur.assistant.concurrency`.
+    The exposed methods are synchronous wrappers around them.
+
     .. note::
        The methods in this module assumes a properly configured environment
        with API keys and AI model settings. However, you only need to
@@ -51,6 +120,15 @@ class Assistant(Singleton):
     """
     kindName: t.Final[str] = "viur-assistant"
 
+    job_operations: t.Final[tuple[str, ...]] = (
+        "generate_script",
+        "translate",
+        "translate_all",
+        "describe_image",
+        "describe_images",
+    )
+    """Operations which can be submitted as a job via :meth:`job_submit`"""
+
     @exposed
     @access("admin")
     @force_post
@@ -60,7 +138,9 @@ class Assistant(Singleton):
         prompt: str,
         modules_to_include: list[str] = None,
         enable_caching: bool = False,
-        max_thinking_tokens: int = 0
+        max_thinking_tokens: int = 0,
+        bypass_cache: bool = False,
+        dry_run: bool = False,
     ):
         """
         Generates a script based on a user prompt and optional module structures using a language model.
@@ -78,23 +158,57 @@ class Assistant(Singleton):
             scriptor documentation prompt section.
         :param max_thinking_tokens: If greater than 0, enables the model's "thinking" feature with a
             token budget for intermediate reasoning or planning steps.
+            Limited by the configured ``anthropic_max_thinking_tokens``.
+        :param bypass_cache: If set to True, a new script is generated even if a cached result exists
+            (see :mod:`viur.assistant.scriptcache`). The new result replaces the cached one.
+        :param dry_run: If set to True, only the estimated tokens of the request are returned,
+            see :mod:`viur.assistant.tokens`.
         :return: A JSON-encoded string of the model's response, typically containing the generated script.
 
         :raises InternalServerError:
           - If configuration (`skel`) is missing.
           - If the LLM request fails due to connection or model errors.
+        :raises RequestTooLarge: If the request exceeds the input budget, even with reduced module structures.
+        :raises TooManyRequests: If a daily quota of the current user is exhausted, see :mod:`viur.assistant.usage`.
 
         .. note::
          - Requires a valid `anthropic_model` configuration in the current context.
          - The actual parsing of the generated code (e.g., extracting specific script content)
            is currently marked as a TODO and has to be discussed.
         """
-        if not (skel := self.getContents()):
-            raise errors.InternalServerError(descr="Configuration missing")
+        coro = self.generate_script_async(
+            prompt=prompt,
+            modules_to_include=modules_to_include,
+            enable_caching=enable_caching,
+            max_thinking_tokens=max_thinking_tokens,
+            bypass_cache=bypass_cache,
+        )
+        if dry_run:
+            return self._dry_run(coro)
+        result = self._run_metered("generate_script", coro)
+        current.request.get().response.headers["Content-Type"] = "application/json"
+        return result
+
+    async def generate_script_async(
+        self,
+        *,
+        prompt: str,
+        modules_to_include: list[str] = None,
+        enable_caching: bool = False,
+        max_thinking_tokens: int = 0,
+        bypass_cache: bool = False,
+    ) -> str:
+        """
+        Asynchronous implementation of :meth:`generate_script`.
+
+        :return: A JSON-encoded string of the model's response.
+        """
+        skel = await asyncio.to_thread(self.get_config)
+        thinking_budget = self._get_thinking_budget(skel, max_thinking_tokens)
 
         llm_params = {
             "model": skel["anthropic_model"],
-            "max_tokens": skel["anthropic_max_tokens"] + max_thinking_tokens,
+            "max_tokens": skel["anthropic_max_tokens"] + thinking_budget,
             "temperature": skel["anthropic_temperature"],
             "system": [{
                 "type": "text",
@@ -116,20 +230,24 @@ class Assistant(Singleton):
             scriptor_doc_system_param["cache_control"] = {"type": "ephemeral"}
 
         # thinking configuration
-        if max_thinking_tokens > 0:
+        if thinking_budget > 0:
             llm_params["thinking"] = {
                 "type": "enabled",
-                # TODO: "budget_tokens": min(max_thinking_tokens, skel["anthropic_max_thinking_tokens"])
-                "budget_tokens": max_thinking_tokens,
+                "budget_tokens": thinking_budget,
             }
 
         # add module structures
-        if modules_to_include is not None and (structures := self.get_viur_structures(modules_to_include)):
+        structures = None
+        if modules_to_include is not None and (
+            structures := await asyncio.to_thread(self.get_viur_structures, modules_to_include)
+        ):
             user_content.append({
                 "type": "text",
-                "text": json.dumps({
-                    "module_structures": structures
-                }, indent=2)
+                "text": self._get_structures_text(
+                    structures,
+                    model=llm_params["model"],
+                    other_text=skel["anthropic_system_prompt"] + prompt,
+                ),
             })
 
         # finally, append user prompt
@@ -138,16 +256,313 @@ class Assistant(Singleton):
             "text": prompt
         })
 
-        anthropic_client = anthropic.Anthropic(api_key=CONFIG.api_anthropic_key)
-        logger.debug(f"{llm_params=}")
+        # serve near-identical requests from the cache, see :mod:`viur.assistant.scriptcache`
+        if CONFIG.script_cache:
+            cache_prompt = scriptcache.normalize_prompt(prompt)
+            cache_context = scriptcache.context_key(
+                llm_params["model"],
+                skel["anthropic_system_prompt"],
+                thinking_budget,
+                structures,
+            )
+            if not bypass_cache and (
+                result := await asyncio.to_thread(scriptcache.lookup, cache_prompt, cache_context)
+            ) is not None:
+                return result
+
+        message = await self.anthropic_create_message_async(**llm_params)
+        result = message.model_dump_json()  # TODO: parse real "code" value
+        if CONFIG.script_cache:
+            await asyncio.to_thread(scriptcache.store, cache_prompt, cache_context, result)
+        return result
+
+    @exposed
+    @access("admin")
+    @force_post
+    def script_session_turn(
+        self,
+        *,
+        prompt: str,
+        session: str | None = None,
+        modules_to_include: list[str] = None,
+        max_thinking_tokens: int = 0,
+        dry_run: bool = False,
+    ):
+        """
+        Generates a script in a multi-turn session, to refine it step by step.
+
+        The conversation is stored server-side (see :mod:`viur.assistant.scriptsessions`),
+        so only the new prompt and the key of the session have to be sent.
+        The stable prefix of the conversation is laid out for the prompt caching of the provider,
+        so that follow-ups only pay for the new turn.
+
+        :param prompt: The instruction of this turn.
+        :param session: The key of the session to continue. A new session is started, if it's omitted.
+        :param modules_to_include: Optional list of module names whose structures are included
+            in every turn of a new session. Ignored when continuing a session.
+        :param max_thinking_tokens: If greater than 0, enables the model's "thinking" feature with a
+            token budget for intermediate reasoning or planning steps.
+            Limited by the configured ``anthropic_max_thinking_tokens``.
+        :param dry_run: If set to True, only the estimated tokens of the request are returned,
+            see :mod:`viur.assistant.tokens`. A new session is not stored then.
+        :return: The ``session`` (including its ``key``) and the ``message`` of the model.
+
+        :raises NotFound: If the session doesn't exist, has expired or belongs to another user.
+        :raises TooManyRequests: If a daily quota of the current user is exhausted, see :mod:`viur.assistant.usage`.
+        """
+        coro = self.script_session_turn_async(
+            prompt=prompt,
+            session=session,
+            modules_to_include=modules_to_include,
+            max_thinking_tokens=max_thinking_tokens,
+        )
+        if dry_run:
+            return self._dry_run(coro)
+        return self.render_json(self._run_metered("script_session_turn", coro))
+
+    async def script_session_turn_async(
+        self,
+        *,
+        prompt: str,
+        session: str | None = None,
+        modules_to_include: list[str] = None,
+        max_thinking_tokens: int = 0,
+    ) -> dict[str, t.Any]:
+        """
+        Asynchronous implementation of :meth:`script_session_turn`.
+        """
+        if session:
+            entity = await asyncio.to_thread(self._get_script_session, session)
+        else:  # a new session is stored after its first turn succeeded
+            user = current.user.get()
+            entity = scriptsessions.new_session(user and user["key"], list(modules_to_include or ()))
+
+        skel = await asyncio.to_thread(self.get_config)
+        structures = None
+        if entity["modules"]:
+            structures = await asyncio.to_thread(self.get_viur_structures, entity["modules"])
+
+        message = await self.anthropic_create_message_async(
+            **self._get_script_session_params(skel, entity, structures, prompt, max_thinking_tokens)
+        )
+        answer = "".join(block.text for block in message.content if block.type == "text")
+
+        if not session:
+            entity = await asyncio.to_thread(scriptsessions.create_session, entity, prompt, answer)
+        elif not (entity := await asyncio.to_thread(scriptsessions.add_turn, entity.key, prompt, answer)):
+            raise errors.NotFound("Session has expired")
+        if scriptsessions.history_tokens(entity) > CONFIG.script_session_history_tokens:
+            await asyncio.to_thread(self.summarize_script_session, entity.key)
+
+        return {
+            "session": scriptsessions.session_to_dict(entity),
+            "message": message.model_dump(mode="json"),
+        }
+
+    def _get_script_session_params(
+        self,
+        skel: SkeletonInstance,
+        session: db.Entity,
+        structures: dict[str, dict] | None,
+        prompt: str,
+        max_thinking_tokens: int,
+    ) -> dict[str, t.Any]:
+        """
+        Returns the parameters of the next turn of a script session.
+
+        The stable prefix comes first: the system prompt, the module structures, the summary
+        and the previous turns. Each of them ends with a cache breakpoint, so the cached prefix
+        of the previous turn is hit and only the new turn is processed.
+        """
+        ephemeral = {"type": "ephemeral"}
+        thinking_budget = self._get_thinking_budget(skel, max_thinking_tokens)
+        context = []
+        if structures:
+            context.append({
+                "type": "text",
+                "text": self._get_structures_text(
+                    structures,
+                    model=skel["anthropic_model"],
+                    other_text=skel["anthropic_system_prompt"] + prompt,
+                ),
+                "cache_control": ephemeral,
+            })
+        if session["summary"]:
+            context.append({
+                "type": "text",
+                "text": f"Summary of the previous conversation:\n\n{session["summary"]}",
+                "cache_control": ephemeral,
+            })
+
+        messages = []
+        for turn in scriptsessions.get_turns(session):
+            messages.append({"role": "user", "content": [{"type": "text", "text": turn["prompt"]}]})
+            messages.append({"role": "assistant", "content": [{"type": "text", "text": turn["answer"] or "-"}]})
+        if messages:
+            messages[-1]["content"][-1]["cache_control"] = ephemeral
+        messages.append({"role": "user", "content": [{"type": "text", "text": prompt}]})
+        messages[0]["content"][:0] = context
+
+        llm_params = {
+            "model": skel["anthropic_model"],
+            "max_tokens": skel["anthropic_max_tokens"] + thinking_budget,
+            "temperature": skel["anthropic_temperature"],
+            "system": [{
+                "type": "text",
+                "text": skel["anthropic_system_prompt"],
+                "cache_control": ephemeral,
+            }],
+            "messages": messages,
+        }
+        if thinking_budget > 0:
+            llm_params["thinking"] = {
+                "type": "enabled",
+                "budget_tokens": thinking_budget,
+            }
+        return llm_params
+
+    @CallDeferred
+    def summarize_script_session(self, key: db.Key):
+        """
+        Replace the older turns of a script session by a summary.
+
+        The latest ``CONFIG.script_session_keep_turns`` turns are kept verbatim,
+        a previous summary is included in the new one.
+
+        :param key: The key of the session.
+        """
+        if not (session := scriptsessions.get_session(key)):
+            return
+        turns = scriptsessions.get_turns(session)
+        if (
+            len(turns) <= CONFIG.script_session_keep_turns
+            or scriptsessions.history_tokens(session) <= CONFIG.script_session_history_tokens
+        ):
+            return
+
+        summarized = turns[:len(turns) - CONFIG.script_session_keep_turns]
+        transcript = "\n\n".join(f"User:\n{turn["prompt"]}\n\nAssistant:\n{turn["answer"]}" for turn in summarized)
+        if session["summary"]:
+            transcript = f"Summary of the earlier conversation:\n{session["summary"]}\n\n{transcript}"
+
+        skel = self.get_config()
+        with scheduler.lane(scheduler.Priority.NORMAL), usage.metered("script_session_turn", enforce=False):
+            message = run_sync(self.anthropic_create_message_async(
+                model=skel["anthropic_model"],
+                max_tokens=CONFIG.script_session_summary_tokens,
+                system=(
+                    "Summarize the following conversation about generating a script. "
+                    "Keep all requirements, decisions, names of modules and bones, "
+                    "and the latest version of the script."
+                ),
+                messages=[{"role": "user", "content": transcript}],
+            ))
+        summary = "".join(block.text for block in message.content if block.type == "text")
+
+        scriptsessions.apply_summary(key, summary, session["offset"] + len(summarized))
+        logger.info(f"Summarized {len(summarized)} turns of script session {key=}")
+
+    @exposed
+    @access("admin")
+    def script_session_view(self, key: str):
+        """
+        Returns a script session with its summary and history.
+
+        :param key: The key of the session, as returned by :meth:`script_session_turn`.
+
+        :raises NotFound: If the session doesn't exist, has expired or belongs to another user.
+        """
+        return self.render_json(scriptsessions.session_to_dict(self._get_script_session(key), with_turns=True))
+
+    @exposed
+    @access("admin")
+    @force_post
+    def script_session_delete(self, key: str):
+        """
+        Deletes a script session.
+
+        :param key: The key of the session, as returned by :meth:`script_session_turn`.
+
+        :raises NotFound: If the session doesn't exist, has expired or belongs to another user.
+        """
+        db.Delete(self._get_script_session(key).key)
+        return self.render_json({"key": key})
+
+    def _get_script_session(self, key: str) -> db.Entity:
+        """
+        Fetch a script session, ensuring it exists and belongs to the current user.
+
+        :raises NotFound: If the session doesn't exist, has expired or belongs to another user.
+        """
+        if not (session := scriptsessions.get_session(key)):
+            raise errors.NotFound(f"Session not found with {key=!r}")
+
+        user = current.user.get()
+        if session["owner"] != user["key"] and "root" not in user["access"]:
+            raise errors.NotFound(f"Session not found with {key=!r}")
+
+        return session
+
+    def _get_thinking_budget(self, skel: SkeletonInstance, max_thinking_tokens: int) -> int:
+        """Returns the requested thinking budget, limited by the configured ``anthropic_max_thinking_tokens``"""
+        return max(0, min(max_thinking_tokens, skel["anthropic_max_thinking_tokens"] or 0))
+
+    def _get_structures_text(self, structures: dict[str, dict], *, model: str, other_text: str) -> str:
+        """
+        Returns the module structures as prompt text.
+
+        If they would exceed the input budget of the model together with the other text of the request,
+        they're reduced to the essential properties of their bones.
+        """
+        text = json.dumps({"module_structures": structures}, indent=2)
+        available = tokens.get_input_budget(model) - tokens.estimate_text(other_text, tokens.Provider.ANTHROPIC, model)
+        if tokens.estimate_text(text, tokens.Provider.ANTHROPIC, model) > available:
+            logger.info(f"Reducing module structures of {len(text)} characters, as they exceed the input budget")
+            text = json.dumps({"module_structures": self._reduce_structure(structures)}, separators=(",", ":"))
+        return text
+
+    def _reduce_structure(self, structure: t.Any) -> t.Any:
+        """Returns a structure with only the essential, non-empty properties of each bone"""
+        if not isinstance(structure, dict):
+            return structure
+        if isinstance(structure.get("type"), str):  # a bone
+            return {
+                key: self._reduce_structure(value)
+                for key, value in structure.items()
+                if key in _STRUCTURE_ESSENTIALS and value not in (None, False, "", [], {})
+            }
+        return {key: self._reduce_structure(value) for key, value in structure.items()}
+
+    def _dry_run(self, coro: t.Coroutine) -> str:
+        """
+        Run an operation without calling the providers, and render the estimated tokens of its upstream requests.
+
+        The estimates cover all requests, which can be sent without waiting for an answer,
+        see :mod:`viur.assistant.tokens`. Requests answered by a cache are not included.
+        Nothing is written, e.g. no image references are uploaded and no descriptions are stored.
+
+        :return: The ``requests`` with their estimated ``input_tokens`` and the total ``input_tokens``.
+        """
+        with tokens.dry_run() as estimates:
+            run_sync(coro)
+        return self.render_json({
+            "requests": estimates,
+            "input_tokens": sum(estimate["input_tokens"] for estimate in estimates),
+        })
+
+    def _run_metered(self, operation: str, coro: t.Coroutine) -> t.Any:
+        """
+        Run an operation, after checking the quotas of the current user, and meter its upstream calls.
+
+        :raises TooManyRequests: If a quota is exhausted, see :mod:`viur.assistant.usage`.
+        """
         try:
-            message = anthropic_client.messages.create(**llm_params)
-        except Exception as e:
-            logger.exception(e)
-            raise errors.InternalServerError(descr=str(e))
-        logger.debug(f"{message=}")
-        current.request.get().response.headers["Content-Type"] = "application/json"
-        return message.model_dump_json()  # TODO: parse real "code" value
+            usage.check_quota(operation)
+        except errors.HTTPException:
+            coro.close()
+            raise
+        with usage.metered(operation, enforce=False):
+            return run_sync(coro)
 
     def get_viur_structures(self, modules_to_include: t.Iterable[str]) -> dict[str, dict]:
         """
@@ -155,12 +570,14 @@ class Assistant(Singleton):
 
         For each named module, its structure is extracted if it is of type ``List`` or ``Tree``.
         ``Tree`` structures will return separate entries for ``node`` and ``leaf`` skeletons.
+        Structures are computed once per instance and language, the access is checked on every call.
 
         :param modules_to_include: List of ViUR module names to retrieve structures for.
         :return: A dictionary mapping module names to their respective structure definitions.
             For ``Tree`` modules, nested keys ``"node"`` and ``"leaf"`` are returned.
 
         :raises ValueError: If a module exists but is not a supported type (i.e., not ``List`` or ``Tree``).
+        :raises Unauthorized: If the current user is not allowed to view a module.
 
         .. note::
            Modules that are missing or not found are silently skipped.
@@ -170,22 +587,41 @@ class Assistant(Singleton):
             module = getattr(conf.main_app.vi, module_name, None)
             if not module:
                 continue
-            if isinstance(module, List):
-                if module_name not in structures_from_viur:
-                    structures_from_viur[module_name] = module.structure()
-            elif isinstance(module, Tree):
-                if module_name not in structures_from_viur:
-                    structures_from_viur[module_name] = {
-                        "node": module.structure(skelType="node"),
-                        "leaf": module.structure(skelType="leaf")
-                    }
-            else:
+            if not isinstance(module, (List, Tree)):
                 raise ValueError(
                     f"The ViUR-module must be of type 'Tree' or 'List'. "
                     f"{module!r} is (currently) unsupported."
                 )
+            if module_name not in structures_from_viur:
+                if not self._can_view_structure(module):
+                    raise errors.Unauthorized()
+                structures_from_viur[module_name] = self._get_structure(module_name, module)
         return structures_from_viur
 
+    def _can_view_structure(self, module: List | Tree) -> bool:
+        """Checks if the current user is allowed to view the structure of a module, like ``structure()`` does"""
+        if isinstance(module, Tree):
+            return all(module.canView(skel_type, module.viewSkel(skel_type)) for skel_type in ("node", "leaf"))
+        return module.canView(module.viewSkel())
+
+    def _get_structure(self, module_name: str, module: List | Tree) -> dict:
+        """Returns the (cached) structure of a module in the current language, without checking the access"""
+        cache_key = (module_name, current.language.get())
+        if (structure := _structure_cache.get(cache_key)) is None:
+            if isinstance(module, Tree):
+                structure = {
+                    skel_type: self._render_structure(module.viewSkel(skel_type))
+                    for skel_type in ("node", "leaf")
+                }
+            else:
+                structure = self._render_structure(module.viewSkel())
+            _structure_cache[cache_key] = structure
+        return structure
+
+    def _render_structure(self, skel: SkeletonInstance) -> dict:
+        """Returns the structure of a skeleton as plain JSON data, independent of the current request"""
+        return json.loads(json.dumps(skel.structure(), cls=CustomJsonEncoder))
+
     @exposed
     @access("admin")
     @force_post
@@ -195,6 +631,9 @@ class Assistant(Singleton):
         text: str,
         language: str,
         characteristic: t.Optional[str] = None,
+        field: t.Optional[str] = None,
+        current_translation: t.Optional[str] = None,
+        dry_run: bool = False,
     ):
         """
         Translate a given text into a target language, optionally using a specific style.
@@ -207,154 +646,1592 @@ class Assistant(Singleton):
         :param language: The target language code (e.g. ``"de"``, ``"en"``, ``"de-x-simple"``).
         :param characteristic: Optional translation style (e.g. ``"simplified"``, ``"formal"``, etc.)
             as defined in ``CONFIG.translate_language_characteristics``.
+        :param field: Optional identifier of the translated field (e.g. ``"module/key/bone"``).
+            The source segments of each translated field are remembered, so that after an edit
+            only the changed segments are translated again.
+        :param current_translation: The current translation of the field. Unchanged segments keep
+            their translation from it, including manual corrections.
+        :param dry_run: If set to True, only the estimated tokens of the upstream requests are returned,
+            see :mod:`viur.assistant.tokens`.
         :return: Translated text as a plain string. HTML tags from the original text are preserved.
 
         :raises InternalServerError: If configuration is missing.
+        :raises TooManyRequests: If a daily quota of the current user is exhausted, see :mod:`viur.assistant.usage`.
 
         .. note::
            - The translation style is determined by merging base rules (`*`) and the selected characteristic.
            - The returned translation contains only the translated text, with no explanation or additional formatting.
         """
-        if not (skel := self.getContents()):
-            raise errors.InternalServerError(descr="Configuration missing")
+        coro = self.translate_async(
+            text=text,
+            language=language,
+            characteristic=characteristic,
+            field=field,
+            current_translation=current_translation,
+        )
+        if dry_run:
+            return self._dry_run(coro)
+        return self.render_text(self._run_metered("translate", coro))
 
-        characteristics = [
-            *CONFIG.translate_language_characteristics.get("*", []),
-            *CONFIG.translate_language_characteristics.get(characteristic, []),
-        ]
+    async def translate_async(
+        self,
+        *,
+        text: str,
+        language: str,
+        characteristic: t.Optional[str] = None,
+        field: t.Optional[str] = None,
+        current_translation: t.Optional[str] = None,
+    ) -> str:
+        """
+        Asynchronous implementation of :meth:`translate`.
+
+        Identical concurrent requests are coalesced into a single upstream call.
+
+        :return: The translated text.
+        """
+        return await single_flight(
+            make_key(
+                "translate",
+                hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                language,
+                characteristic,
+                field,
+                current_translation and hashlib.sha256(current_translation.encode("utf-8")).hexdigest(),
+            ),
+            lambda: self._translate_async(
+                text=text,
+                language=language,
+                characteristic=characteristic,
+                field=field,
+                current_translation=current_translation,
+            ),
+        )
+
+    async def _translate_async(
+        self,
+        *,
+        text: str,
+        language: str,
+        characteristic: t.Optional[str] = None,
+        field: t.Optional[str] = None,
+        current_translation: t.Optional[str] = None,
+    ) -> str:
+        skel = await asyncio.to_thread(self.get_config)
+
+        if CONFIG.translate_segmented and segments.looks_like_html(text):
+            document_class = segments.HtmlDocument
+        elif field or CONFIG.translation_memory or segments.estimate_tokens(text) > CONFIG.translate_chunk_tokens:
+            document_class = segments.TextDocument
+        else:
+            document_class = None
+
+        if document_class is not None:
+            return await self._translate_document_async(
+                document_class(text),
+                model=skel["openai_model"],
+                language=language,
+                characteristic=characteristic,
+                field=field,
+                current_translation=document_class(current_translation) if current_translation else None,
+            )
 
-        message = self.openai_create_completion(
+        return await self.openai_create_completion_async(
             model=skel["openai_model"],
             messages=[{  # type: ignore (typed dict)
                 "role": "user",
                 "content": (
-                    f"Translate the following text into {CONFIG.language_map.get(language, language)}"
-                    f" ({". ".join(characteristics)})"
+                    f"Translate the following text into {self._get_translation_target(language, characteristic)}"
                     f" and only return the translation, keep HTML-tags (if there are any):\n\n{text}\n"
                 )
             }],
             stop=None,
         )
 
-        return self.render_text(message)
-
-    @exposed
-    @access("admin", "file-view")
-    @force_post
-    def describe_image(
+    async def _translate_document_async(
         self,
-        filekey: db.Key | str,
-        prompt: str = "",
-        context: str = "",
-        language: str | None = None,
-    ):
+        document: segments.Document,
+        *,
+        model: str,
+        language: str,
+        characteristic: t.Optional[str] = None,
+        field: t.Optional[str] = None,
+        current_translation: segments.Document | None = None,
+    ) -> str:
         """
-        Generate an HTML ``alt`` attribute description for a given image using OpenAi.
-
-        This method reads an image via its filekey, resizes it to a configured pixel target,
-        and sends it along with optional prompt and context data to an OpenAI model.
-        The model returns a plain-text alternative description for accessibility purposes,
-        formatted as an HTML ``alt`` text in the specified language.
-
-        :param filekey: Key identifying the image file in the ViUR file module.
-            (Key of the :class:`file skeleton <viur.core.modules.file.FileLeafSkel>`).
-        :param prompt: Optional user-defined hint or instruction for how the image should be interpreted.
-        :param context: Optional additional background information to support a better description.
-        :param language: Target language code for the generated description (e.g., ``"en"``, ``"de-x-simple"``).
-            Falls back to the current session language if not specified.
-        :return: A plain-text string suitable for use in an HTML ``alt`` attribute (no quotes or labels).
+        Translate the segments of a document and re-insert them.
 
-        :raises InternalServerError: If required configuration is missing.
-        :raises NotFound: If the referenced image file could not be loaded.
+        If the document is the source of a known ``field``, its unchanged segments keep their
+        previous translation, taken from the ``current_translation`` if it has the same structure.
+        Segments which are known by the translation memory (see :mod:`viur.assistant.translationmemory`)
+        are served from it. The remaining segments are split into chunks of ``CONFIG.translate_chunk_tokens``,
+        which are translated concurrently. Each chunk gets the last ``CONFIG.translate_chunk_overlap``
+        preceding segments as context, and translations of similar segments as hints,
+        to keep the terminology consistent.
 
-        .. note::
-          - The image is resized and converted to JPEG before being sent to the model.
-          - This function uses a preconfigured OpenAI model, pixel count, and JPEG quality settings.
+        :return: The translated document.
         """
-        if not (skel := self.getContents()):
-            raise errors.InternalServerError(descr="Configuration missing")
+        if not document.segments:
+            return document.render([])
+
+        hashes = [translationmemory.segment_hash(segment) for segment in document.segments]
+        previous = {}
+        if field and (state := await asyncio.to_thread(translationmemory.get_field, field, language, characteristic)):
+            previous_hashes, previous_translations = state
+            if current_translation is not None and len(current_translation.segments) == len(previous_hashes):
+                previous_translations = current_translation.segments
+            previous = dict(zip(previous_hashes, previous_translations))
+
+        memory_context = self._get_memory_context(model, language, characteristic)
+        if CONFIG.translation_memory:
+            translations = await asyncio.to_thread(
+                translationmemory.lookup, document.segments, language, memory_context
+            )
+        else:
+            translations = [None] * len(document.segments)
 
-        if language is None:
-            language = current.language.get()
+        for index, segment_hash in enumerate(hashes):
+            if segment_hash in previous:
+                translations[index] = previous[segment_hash]
 
-        blob, mime = conf.main_app.file.read(key=filekey)
-        if not blob:
-            raise errors.NotFound(f"File not found with {filekey=!r}")
+        pending = [index for index, translation in enumerate(translations) if translation is None]
+        logger.debug(f"Translating {len(pending)} of {len(document.segments)} segments")
 
-        resized_image_bytes = self._get_resized_image_bytes(
-            image=blob,
-            target_pixel_count=CONFIG.describe_image_pixel_default,
-            jpeg_quality=CONFIG.describe_image_jpeg_quality_default,
-        )
-        base64_image = base64.b64encode(resized_image_bytes).decode("utf-8")
+        if CONFIG.translation_memory and pending:
+            hints = await gather_bounded(
+                asyncio.to_thread(translationmemory.find_similar, document.segments[index], language, memory_context)
+                for index in pending
+            )
+        else:
+            hints = [None] * len(pending)
 
-        context_prompt = ""
-        if context or prompt:
-            context_prompt = (
-                f"Use the following data as additional information to describe the image:\n"
-                # TODO: ??? f" {re.sub(r"[^a-zA-Z0-9 _-]", "", context)}\n\n"
-                f" {prompt}\n\n{context}"
+        chunks = segments.chunk([document.segments[index] for index in pending], CONFIG.translate_chunk_tokens)
+        results = await gather_bounded(
+            self._translate_segments_async(
+                [document.segments[index] for index in pending[chunk.start:chunk.stop]],
+                model=model,
+                language=language,
+                characteristic=characteristic,
+                context=document.segments[
+                    max(0, pending[chunk.start] - CONFIG.translate_chunk_overlap):pending[chunk.start]
+                ],
+                hints=[hint for hint in hints[chunk.start:chunk.stop] if hint],
+            )
+            for chunk in chunks
+        )
+        for index, translation in zip(pending, (translation for result in results for translation in result)):
+            translations[index] = translation
+
+        # Translate segments with broken placeholders once more on their own
+        if invalid := [
+            index for index in pending
+            if not document.is_valid(index, translations[index])
+        ]:
+            logger.debug(f"Retranslating {len(invalid)} segments with invalid placeholders")
+            retries = await gather_bounded(
+                self._translate_segments_async(
+                    [document.segments[index]],
+                    model=model,
+                    language=language,
+                    characteristic=characteristic,
+                )
+                for index in invalid
+            )
+            for index, (translation,) in zip(invalid, retries):
+                translations[index] = translation
+
+        if CONFIG.translation_memory and pending:
+            await asyncio.to_thread(
+                translationmemory.store,
+                [
+                    (document.segments[index], translations[index])
+                    for index in pending
+                    if document.is_valid(index, translations[index])
+                ],
+                language,
+                memory_context,
             )
 
-        content = [
-            {
-                "type": "text",
-                "text": (
-                    f"Analyze the image and generate an appropriate HTML alt attribute"
-                    f" in language: {CONFIG.language_map.get(language, language)}."
-                    f" Provide only the plain text for the alt attributes without quotes and label.\n\n"
-                    f"{context_prompt}\n"
-                ),
-            },
-            {
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_image}",
-                    # "url": "http://some-domain.com/image.jpeg",
-                    "detail": "low",
-                    # "low" = 85 Tokens, "high" = calulated differently
-                    # "low" = resize (on openapis side) to < 512x512px
-                    # https://platform.openai.com/docs/guides/images?api-mode=chat#calculating-costs
-                },
-            },
-        ]
+        if field:
+            await asyncio.to_thread(translationmemory.set_field, field, hashes, translations, language, characteristic)
 
-        message = self.openai_create_completion(
-            model=skel["openai_model"],
-            messages=[{  # type: ignore (typed dict)
-                "role": "user",
-                "content": content,
-            }],
-        )
-        return self.render_text(message)
+        return document.render(translations)
 
-    def _get_resized_image_bytes(
+    async def _translate_segments_async(
         self,
-        image: t.IO[bytes] | str | bytes | "os.PathLike[str]" | "os.PathLike[bytes]",
-        target_pixel_count: int,
-        jpeg_quality: int = 50,
-    ):
+        texts: list[str],
+        *,
+        model: str,
+        language: str,
+        characteristic: t.Optional[str] = None,
+        context: t.Sequence[str] = (),
+        hints: t.Sequence[tuple[str, str]] = (),
+    ) -> list[str]:
         """
-        Resize an image to approximately match a target total pixel count and return it as a JPEG byte stream.
-
-        The image is scaled proportionally to meet the target pixel count (width × height),
-        while preserving the original aspect ratio. If the resized dimensions would exceed
-        the original image size, no upscaling is performed. The result is encoded as a JPEG.
+        Translate a list of segments, see :mod:`viur.assistant.segments`, in a single request.
 
-        :param image: Input image, provided as a file-like object, byte string, file path, or raw bytes.
-        :param target_pixel_count: Desired total number of pixels for the resized image.
-            Used to compute the new dimensions.
-        :param jpeg_quality: JPEG compression quality (0 to 100).
-            Higher values yield better image quality at the cost of file size. Default is 50.
-        :return: The resized and JPEG-compressed image as a byte stream.
+        The segments are sent as a compact JSON array and must be returned in the same order.
+        If the model returns a different number of translations, each segment is translated on its own.
 
-        :raises ValueError: If `jpeg_quality` is not in the 0–100 range or the image input is invalid.
+        :param context: Preceding segments, which are given as context only and are not translated.
+        :param hints: Pairs of similar segments and their existing translations.
+        :return: The translated segments.
+        """
+        translations = await self.openai_create_completion_async(**self._get_translate_segments_params(
+            texts,
+            model=model,
+            language=language,
+            characteristic=characteristic,
+            context=context,
+            hints=hints,
+        ))
+
+        if len(translations) == len(texts):
+            return translations
+        if len(texts) == 1:
+            raise errors.InternalServerError(f"Expected 1 translation, got {len(translations)}")
+
+        logger.warning(f"Expected {len(texts)} translations, got {len(translations)}; translating one by one")
+        return [
+            translation
+            for translation, in await gather_bounded(
+                self._translate_segments_async([text], model=model, language=language, characteristic=characteristic)
+                for text in texts
+            )
+        ]
+
+    def _get_translate_segments_params(
+        self,
+        texts: list[str],
+        *,
+        model: str,
+        language: str,
+        characteristic: t.Optional[str] = None,
+        context: t.Sequence[str] = (),
+        hints: t.Sequence[tuple[str, str]] = (),
+    ) -> dict[str, t.Any]:
+        """
+        Returns the completion parameters to translate a list of segments, see :meth:`_translate_segments_async`.
+        """
+        preamble = ""
+        if context:
+            preamble += (
+                f"The texts continue this preceding text, which is given as context only:\n\n"
+                f"{json.dumps(list(context), ensure_ascii=False)}\n\n"
+            )
+        if hints:
+            preamble += (
+                f"Keep the wording consistent with these existing translations of similar texts:\n\n"
+                f"{json.dumps(dict(hints), ensure_ascii=False)}\n\n"
+            )
+
+        return dict(
+            model=model,
+            messages=[{  # type: ignore (typed dict)
+                "role": "user",
+                "content": (
+                    f"{preamble}"
+                    f"Translate each text of the following JSON array"
+                    f" into {self._get_translation_target(language, characteristic)}."
+                    f" Keep the placeholders like <1>, </1> and <1/> around the corresponding words"
+                    f" and return the translations in the same order:\n\n"
+                    f"{json.dumps(texts, ensure_ascii=False)}\n"
+                )
+            }],
+            stop=None,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "viur-assistant-segments",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "answer": {"type": "array", "items": {"type": "string"}}
+                        },
+                        "required": ["answer"],
+                        "additionalProperties": False
+                    },
+                    "strict": True
+                }
+            },
+        )
+
+    def _get_memory_context(self, model: str, language: str, characteristic: t.Optional[str] = None) -> str:
+        """Returns the context of translations in the translation memory, see :mod:`viur.assistant.translationmemory`"""
+        return translationmemory.context_key(model, self._get_translation_target(language, characteristic))
+
+    def _get_document(self, text: str) -> segments.Document:
+        """
+        Returns the text split into segments, see :mod:`viur.assistant.segments`.
+        """
+        if CONFIG.translate_segmented and segments.looks_like_html(text):
+            return segments.HtmlDocument(text)
+        return segments.TextDocument(text)
+
+    def _get_translation_target(self, language: str, characteristic: t.Optional[str] = None) -> str:
+        """
+        Returns the target language and its characteristics, as described in the translation prompt.
+        """
+        characteristics = [
+            *CONFIG.translate_language_characteristics.get("*", []),
+            *CONFIG.translate_language_characteristics.get(characteristic, []),
+        ]
+        return f"{CONFIG.language_map.get(language, language)} ({". ".join(characteristics)})"
+
+    def _get_language_characteristic(self, language: str) -> str | None:
+        """
+        Returns the characteristic of a language for :meth:`translate_all`.
+
+        Uses ``CONFIG.translate_language_characteristic_map``, or the private-use subtag
+        of the language code (like ``"simple"`` of ``"de-x-simple"``) if it's a defined characteristic.
+        """
+        if language in CONFIG.translate_language_characteristic_map:
+            return CONFIG.translate_language_characteristic_map[language]
+        if "-x-" in language and (subtag := language.split("-x-", 1)[1]) in CONFIG.translate_language_characteristics:
+            return subtag
+        return None
+
+    @exposed
+    @access("admin")
+    @force_post
+    def translate_all(
+        self,
+        *,
+        text: str,
+        languages: t.Optional[list[str]] = None,
+        dry_run: bool = False,
+    ):
+        """
+        Translate a given text into several languages at once.
+
+        The text is sent only once, and the translations into all languages are requested
+        in a single structured completion. If the combined translations would exceed
+        ``CONFIG.translate_output_tokens``, the languages are split into parallel requests.
+        A text whose translation alone exceeds it is translated into each language on its own, in chunks.
+
+        :param text: The source text to translate.
+        :param languages: The target language codes. Defaults to ``conf.i18n.available_languages``.
+            The characteristic of each language is determined by ``CONFIG.translate_language_characteristic_map``.
+        :param dry_run: If set to True, only the estimated tokens of the upstream requests are returned,
+            see :mod:`viur.assistant.tokens`.
+        :return: A JSON object mapping each language code to its translation.
+
+        :raises InternalServerError: If configuration is missing.
+        :raises TooManyRequests: If a daily quota of the current user is exhausted, see :mod:`viur.assistant.usage`.
+        """
+        coro = self.translate_all_async(text=text, languages=languages)
+        if dry_run:
+            return self._dry_run(coro)
+        return self.render_json(self._run_metered("translate_all", coro))
+
+    async def translate_all_async(
+        self,
+        *,
+        text: str,
+        languages: t.Optional[t.Iterable[str]] = None,
+    ) -> dict[str, str]:
+        """
+        Asynchronous implementation of :meth:`translate_all`.
+
+        :return: A dictionary mapping each language code to its translation.
+        """
+        languages = list(dict.fromkeys(languages or conf.i18n.available_languages))
+        skel = await asyncio.to_thread(self.get_config)
+
+        document = self._get_document(text)
+        if not document.segments:
+            return {language: text for language in languages}
+
+        # Group the languages, so that the translations of each group fit into the output limit.
+        # If a single translation exceeds it, each language is translated (in chunks) on its own.
+        tokens_per_language = sum(segments.estimate_tokens(segment) for segment in document.segments)
+        if tokens_per_language > CONFIG.translate_output_tokens:
+            groups = []
+        else:
+            group_size = CONFIG.translate_output_tokens // tokens_per_language
+            groups = [languages[i:i + group_size] for i in range(0, len(languages), group_size)]
+        logger.debug(f"Translating {len(document.segments)} segments in {len(groups)} requests")
+
+        results = {}
+        for group, group_result in zip(groups, await gather_bounded(
+            (
+                self._translate_segments_multi_async(document.segments, model=skel["openai_model"], languages=group)
+                for group in groups
+            ),
+            return_exceptions=True,
+        )):
+            if isinstance(group_result, tokens.DryRun):
+                raise group_result
+            if isinstance(group_result, Exception):
+                logger.warning(f"Translating {group=} at once failed: {group_result}")
+                continue
+            results |= group_result
+
+        translations = {}
+        fallbacks = []
+        for language in languages:
+            if (
+                len(result := results.get(language) or []) == len(document.segments)
+                and all(document.is_valid(index, translation) for index, translation in enumerate(result))
+            ):
+                translations[language] = document.render(result)
+                if CONFIG.translation_memory:
+                    await asyncio.to_thread(
+                        translationmemory.store,
+                        zip(document.segments, result),
+                        language,
+                        self._get_memory_context(
+                            skel["openai_model"], language, self._get_language_characteristic(language),
+                        ),
+                    )
+            else:
+                fallbacks.append(language)
+
+        # Translate languages with incomplete results on their own
+        if fallbacks:
+            logger.debug(f"Translating {fallbacks=} on their own")
+            for language, translation in zip(fallbacks, await gather_bounded(
+                self.translate_async(
+                    text=text,
+                    language=language,
+                    characteristic=self._get_language_characteristic(language),
+                )
+                for language in fallbacks
+            )):
+                translations[language] = translation
+
+        return {language: translations[language] for language in languages}
+
+    async def _translate_segments_multi_async(
+        self,
+        texts: list[str],
+        *,
+        model: str,
+        languages: list[str],
+    ) -> dict[str, list[str]]:
+        """
+        Translate a list of segments into several languages in a single request.
+
+        :return: A dictionary mapping each language code to the translated segments.
+        """
+        targets = "\n".join(
+            f"- {language}: {self._get_translation_target(language, self._get_language_characteristic(language))}"
+            for language in languages
+        )
+
+        return await self.openai_create_completion_async(
+            model=model,
+            messages=[{  # type: ignore (typed dict)
+                "role": "user",
+                "content": (
+                    f"Translate each text of the following JSON array into each of these languages:\n{targets}\n\n"
+                    f"Keep the placeholders like <1>, </1> and <1/> around the corresponding words"
+                    f" and return the translations keyed by language code, in the same order as the texts:\n\n"
+                    f"{json.dumps(texts, ensure_ascii=False)}\n"
+                )
+            }],
+            stop=None,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "viur-assistant-languages",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "answer": {
+                                "type": "object",
+                                "properties": {
+                                    language: {"type": "array", "items": {"type": "string"}}
+                                    for language in languages
+                                },
+                                "required": languages,
+                                "additionalProperties": False
+                            }
+                        },
+                        "required": ["answer"],
+                        "additionalProperties": False
+                    },
+                    "strict": True
+                }
+            },
+        )
+
+    @exposed
+    @access("admin", "file-view")
+    @force_post
+    def describe_image(
+        self,
+        filekey: db.Key | str,
+        prompt: str = "",
+        context: str = "",
+        language: str | None = None,
+        dry_run: bool = False,
+    ):
+        """
+        Generate an HTML ``alt`` attribute description for a given image using OpenAi.
+
+        This method reads an image via its filekey, resizes it to a configured pixel target,
+        and sends it along with optional prompt and context data to an OpenAI model.
+        The model returns a plain-text alternative description for accessibility purposes,
+        formatted as an HTML ``alt`` text in the specified language.
+
+        :param filekey: Key identifying the image file in the ViUR file module.
+            (Key of the :class:`file skeleton <viur.core.modules.file.FileLeafSkel>`).
+        :param prompt: Optional user-defined hint or instruction for how the image should be interpreted.
+        :param context: Optional additional background information to support a better description.
+        :param language: Target language code for the generated description (e.g., ``"en"``, ``"de-x-simple"``).
+            Falls back to the current session language if not specified.
+        :param dry_run: If set to True, only the estimated tokens of the upstream requests are returned,
+            see :mod:`viur.assistant.tokens`.
+        :return: A plain-text string suitable for use in an HTML ``alt`` attribute (no quotes or labels).
+
+        :raises InternalServerError: If required configuration is missing.
+        :raises NotFound: If the referenced image file could not be loaded.
+        :raises TooManyRequests: If a daily quota of the current user is exhausted, see :mod:`viur.assistant.usage`.
+
+        .. note::
+          - The image is trimmed, resized and encoded as JPEG or WebP before being sent to the model,
+            see :mod:`viur.assistant.imaging`. The estimated image tokens are reported
+            in the ``X-Assistant-Image-Tokens`` response header.
+          - This function uses a preconfigured OpenAI model, pixel count, and JPEG quality settings.
+          - Descriptions of near-identical images are reused,
+            see ``CONFIG.describe_image_hash_max_distance``.
+        """
+        coro = self.describe_image_async(
+            filekey=filekey,
+            prompt=prompt,
+            context=context,
+            language=language,
+        )
+        if dry_run:
+            return self._dry_run(coro)
+        return self.render_text(self._run_metered("describe_image", coro))
+
+    async def describe_image_async(
+        self,
+        filekey: db.Key | str,
+        prompt: str = "",
+        context: str = "",
+        language: str | None = None,
+    ) -> str:
+        """
+        Asynchronous implementation of :meth:`describe_image`.
+
+        Identical concurrent requests are coalesced into a single upstream call.
+
+        :return: The plain-text description of the image.
+        """
+        if language is None:
+            language = current.language.get()
+
+        return await single_flight(
+            make_key("describe_image", str(filekey), language, prompt.strip(), context.strip()),
+            lambda: self._describe_image_async(filekey=filekey, prompt=prompt, context=context, language=language),
+        )
+
+    async def _describe_image_async(
+        self,
+        *,
+        filekey: db.Key | str,
+        prompt: str,
+        context: str,
+        language: str,
+    ) -> str:
+        # Descriptions without a custom prompt or context are reusable, see prepare_image_descriptions()
+        reusable = not (prompt or context)
+        if reusable:
+            precomputed = await asyncio.to_thread(descriptions.get_descriptions, filekey)
+            if description := precomputed.get(language):
+                logger.debug(f"Using precomputed description for {filekey=} in {language=}")
+                return description
+
+        image = await self._load_image_async(filekey)
+
+        # Reuse the description of a near-identical image
+        skel = await asyncio.to_thread(self.get_config)
+        variant = self._get_description_variant(
+            image, model=skel["openai_model"], prompt=prompt, context=context, language=language,
+        )
+        if description := await asyncio.to_thread(imagehash.find_description, image.dhash, variant):
+            logger.debug(f"Using description of a near-identical image for {filekey=}")
+        else:
+            description = await self._describe_preprocessed_image_async(
+                image=image,
+                prompt=prompt,
+                context=context,
+                language=language,
+            )
+            await asyncio.to_thread(imagehash.store_description, image.dhash, variant, description)
+
+        if reusable and not tokens.is_dry_run():
+            await asyncio.to_thread(descriptions.set_description, filekey, language, description)
+
+        return description
+
+    @exposed
+    @access("admin", "file-view")
+    @force_post
+    def describe_images(
+        self,
+        filekeys: list[str],
+        prompt: str = "",
+        context: str = "",
+        language: str | None = None,
+        dry_run: bool = False,
+    ):
+        """
+        Generate HTML ``alt`` attribute descriptions for multiple images at once (gallery mode).
+
+        Like :meth:`describe_image`, but the images are preprocessed in parallel and packed
+        into as few requests as possible (``CONFIG.describe_images_batch_size`` images per request),
+        so the fixed overhead of a request is shared by the whole gallery.
+        Precomputed descriptions and descriptions of near-identical images are reused.
+
+        :param filekeys: Keys of the image files.
+        :param prompt: Optional user-defined hint or instruction, shared by all images.
+        :param context: Optional additional background information, shared by all images.
+        :param language: Target language code for the generated descriptions.
+            Falls back to the current session language if not specified.
+        :param dry_run: If set to True, only the estimated tokens of the upstream requests are returned,
+            see :mod:`viur.assistant.tokens`.
+        :return: A JSON object mapping each file key to its description.
+
+        :raises InternalServerError: If required configuration is missing.
+        :raises NotFound: If any of the referenced image files could not be loaded.
+        :raises TooManyRequests: If a daily quota of the current user is exhausted, see :mod:`viur.assistant.usage`.
+        """
+        coro = self.describe_images_async(
+            filekeys=filekeys,
+            prompt=prompt,
+            context=context,
+            language=language,
+        )
+        if dry_run:
+            return self._dry_run(coro)
+        return self.render_json(self._run_metered("describe_images", coro))
+
+    async def describe_images_async(
+        self,
+        filekeys: t.Iterable[db.Key | str],
+        prompt: str = "",
+        context: str = "",
+        language: str | None = None,
+    ) -> dict[str, str]:
+        """
+        Asynchronous implementation of :meth:`describe_images`.
+
+        :return: A dictionary mapping each file key to its description.
+        """
+        if language is None:
+            language = current.language.get()
+
+        filekeys = list(dict.fromkeys(str(filekey) for filekey in filekeys))
+        reusable = not (prompt or context)
+        skel = await asyncio.to_thread(self.get_config)
+        result = {}
+
+        if reusable:
+            for filekey, precomputed in zip(filekeys, await gather_bounded(
+                asyncio.to_thread(descriptions.get_descriptions, filekey) for filekey in filekeys
+            )):
+                if description := precomputed.get(language):
+                    result[filekey] = description
+
+        pending = [filekey for filekey in filekeys if filekey not in result]
+        images = await gather_bounded(self._load_image_async(filekey) for filekey in pending)
+        variants = {
+            filekey: self._get_description_variant(
+                image, model=skel["openai_model"], prompt=prompt, context=context, language=language,
+            )
+            for filekey, image in zip(pending, images)
+        }
+        similar = await gather_bounded(
+            asyncio.to_thread(imagehash.find_description, image.dhash, variants[filekey])
+            for filekey, image in zip(pending, images)
+        )
+
+        missing = []
+        for filekey, image, description in zip(pending, images, similar):
+            if description:
+                result[filekey] = description
+            else:
+                missing.append((filekey, image))
+
+        batch_size = CONFIG.describe_images_batch_size
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        for batch, batch_descriptions in zip(batches, await gather_bounded(
+            self._describe_preprocessed_images_async(
+                images=[image for _, image in batch],
+                prompt=prompt,
+                context=context,
+                language=language,
+            )
+            for batch in batches
+        )):
+            for (filekey, image), description in zip(batch, batch_descriptions):
+                result[filekey] = description
+                await asyncio.to_thread(imagehash.store_description, image.dhash, variants[filekey], description)
+                if reusable:
+                    await asyncio.to_thread(descriptions.set_description, filekey, language, description)
+
+        return {filekey: result[filekey] for filekey in filekeys}
+
+    async def _load_image_async(self, filekey: db.Key | str) -> PreprocessedImage:
+        """
+        Read and preprocess an image file.
+
+        With ``CONFIG.describe_image_upload_once``, the preprocessed image is uploaded once and
+        referenced by its URL. Further calls with the same source file and preprocessing parameters
+        reuse the reference, without reading and preprocessing the image again.
+        Within a dry-run (see :mod:`viur.assistant.tokens`), nothing is uploaded.
+
+        :raises NotFound: If the image file could not be loaded.
+        """
+        if CONFIG.describe_image_upload_once:
+            file_skel = conf.main_app.file.viewSkel("leaf")
+            if not await asyncio.to_thread(file_skel.read, db.keyHelper(filekey, file_skel.kindName)):
+                raise errors.NotFound(f"File not found with {filekey=!r}")
+
+            params_key = make_key("preprocess_image", self._get_preprocess_params())
+            if reference := await asyncio.to_thread(references.get_reference, file_skel["dlkey"], params_key):
+                return PreprocessedImage(
+                    data=b"",
+                    mimetype=reference["mimetype"],
+                    width=reference["width"],
+                    height=reference["height"],
+                    detail=reference["detail"],
+                    dhash=int(reference["dhash"], 16),
+                    url=reference["url"],
+                )
+
+        blob, mime = await asyncio.to_thread(conf.main_app.file.read, key=filekey)
+        if not blob:
+            raise errors.NotFound(f"File not found with {filekey=!r}")
+
+        image = await asyncio.to_thread(self._preprocess_image, image=blob, **self._get_preprocess_params())
+
+        if CONFIG.describe_image_upload_once and not tokens.is_dry_run():
+            reference = await asyncio.to_thread(
+                references.create_reference,
+                file_skel["dlkey"],
+                params_key,
+                image.data,
+                image.mimetype,
+                {
+                    "width": image.width,
+                    "height": image.height,
+                    "detail": image.detail,
+                    "dhash": f"{image.dhash:016x}",
+                },
+            )
+            image = dataclasses.replace(image, url=reference["url"])
+
+        return image
+
+    def _get_description_variant(
+        self,
+        image: PreprocessedImage,
+        *,
+        model: str,
+        prompt: str,
+        context: str,
+        language: str,
+    ) -> str:
+        """
+        Returns the key of the variant of a description in the hash index, see :mod:`viur.assistant.imagehash`.
+
+        Descriptions are only reused for the same model, preprocessing parameters, detail level,
+        language, prompt and context.
+        """
+        return make_key(
+            "describe_image",
+            model,
+            self._get_preprocess_params(),
+            image.detail,
+            language,
+            prompt.strip(),
+            context.strip(),
+        )
+
+    def _get_preprocess_params(self) -> dict[str, t.Any]:
+        """
+        Returns the parameters for :meth:`_preprocess_image`, as configured for image descriptions.
+        """
+        return {
+            "target_pixel_count": CONFIG.describe_image_pixel_default,
+            "jpeg_quality": CONFIG.describe_image_jpeg_quality_default,
+            "adaptive": CONFIG.describe_image_adaptive,
+        }
+
+    async def _describe_preprocessed_images_async(
+        self,
+        *,
+        images: list[PreprocessedImage],
+        prompt: str,
+        context: str,
+        language: str,
+    ) -> list[str]:
+        """
+        Describe multiple images within one request.
+
+        The model answers with a JSON array of numbered descriptions. Images the model
+        has missed are described in a separate request each.
+        """
+        if len(images) == 1:
+            return [await self._describe_preprocessed_image_async(
+                image=images[0], prompt=prompt, context=context, language=language,
+            )]
+
+        skel = await asyncio.to_thread(self.get_config)
+
+        image_tokens = sum(
+            imaging.estimate_image_tokens(image.width, image.height, image.detail, skel["openai_model"])
+            for image in images
+        )
+        logger.info(f"Describing {len(images)} images at once: {image_tokens=}")
+        self._add_image_tokens_header(image_tokens)
+
+        context_prompt = ""
+        if context or prompt:
+            context_prompt = (
+                f"Use the following data as additional information to describe the images:\n"
+                f" {prompt}\n\n{context}"
+            )
+
+        content = [{
+            "type": "text",
+            "text": (
+                f"Analyze each of the following {len(images)} numbered images and generate an appropriate"
+                f" HTML alt attribute for each of them in language: {CONFIG.language_map.get(language, language)}."
+                f" Provide for every image its number and only the plain text for the alt attribute"
+                f" without quotes and label.\n\n"
+                f"{context_prompt}\n"
+            ),
+        }]
+        for number, image in enumerate(images, start=1):
+            content.append({"type": "text", "text": f"Image {number}:"})
+            content.append(self._image_content_part(image))
+
+        answer = await self.openai_create_completion_async(
+            model=skel["openai_model"],
+            messages=[{  # type: ignore (typed dict)
+                "role": "user",
+                "content": content,
+            }],
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "viur-assistant-gallery",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "answer": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "image": {"type": "integer"},
+                                        "description": {"type": "string"},
+                                    },
+                                    "required": ["image", "description"],
+                                    "additionalProperties": False,
+                                },
+                            },
+                        },
+                        "required": ["answer"],
+                        "additionalProperties": False,
+                    },
+                    "strict": True,
+                },
+            },
+        )
+
+        numbered = {item["image"]: item["description"] for item in answer}
+        missed = [number for number in range(1, len(images) + 1) if not numbered.get(number)]
+        for number, description in zip(missed, await gather_bounded(
+            self._describe_preprocessed_image_async(
+                image=images[number - 1], prompt=prompt, context=context, language=language,
+            )
+            for number in missed
+        )):
+            numbered[number] = description
+        return [numbered[number] for number in range(1, len(images) + 1)]
+
+    async def _describe_preprocessed_image_async(
+        self,
+        *,
+        image: PreprocessedImage,
+        prompt: str,
+        context: str,
+        language: str,
+    ) -> str:
+        skel = await asyncio.to_thread(self.get_config)
+
+        image_tokens = imaging.estimate_image_tokens(image.width, image.height, image.detail, skel["openai_model"])
+        logger.info(f"Describing {image.width}x{image.height}px {image.mimetype} in {image.detail=}: {image_tokens=}")
+        self._add_image_tokens_header(image_tokens)
+
+        return await self.openai_create_completion_async(**self._get_describe_image_params(
+            image,
+            model=skel["openai_model"],
+            prompt=prompt,
+            context=context,
+            language=language,
+        ))
+
+    def _add_image_tokens_header(self, image_tokens: int) -> None:
+        """Add the estimated image tokens of a request to the ``X-Assistant-Image-Tokens`` response header"""
+        headers = current.request.get().response.headers
+        headers["X-Assistant-Image-Tokens"] = str(int(headers.get("X-Assistant-Image-Tokens") or 0) + image_tokens)
+
+    def _get_describe_image_params(
+        self,
+        image: PreprocessedImage,
+        *,
+        model: str,
+        prompt: str,
+        context: str,
+        language: str,
+    ) -> dict[str, t.Any]:
+        """
+        Returns the completion parameters to describe a preprocessed image.
+        """
+        context_prompt = ""
+        if context or prompt:
+            context_prompt = (
+                f"Use the following data as additional information to describe the image:\n"
+                # TODO: ??? f" {re.sub(r"[^a-zA-Z0-9 _-]", "", context)}\n\n"
+                f" {prompt}\n\n{context}"
+            )
+
+        content = [
+            {
+                "type": "text",
+                "text": (
+                    f"Analyze the image and generate an appropriate HTML alt attribute"
+                    f" in language: {CONFIG.language_map.get(language, language)}."
+                    f" Provide only the plain text for the alt attributes without quotes and label.\n\n"
+                    f"{context_prompt}\n"
+                ),
+            },
+            self._image_content_part(image),
+        ]
+
+        return dict(
+            model=model,
+            messages=[{  # type: ignore (typed dict)
+                "role": "user",
+                "content": content,
+            }],
+        )
+
+    def _image_content_part(self, image: PreprocessedImage) -> dict[str, t.Any]:
+        """
+        Returns the message content part of a preprocessed image.
+        """
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": image.url or f"data:{image.mimetype};base64,{base64.b64encode(image.data).decode("utf-8")}",
+                "detail": image.detail,
+                # "low" = resize (on openapis side) to < 512x512px, see imaging.estimate_image_tokens()
+                # https://platform.openai.com/docs/guides/images?api-mode=chat#calculating-costs
+            },
+        }
+
+    def queue_image_descriptions(self, filekey: db.Key | str) -> None:
+        """
+        Queue :meth:`prepare_image_descriptions` for an image, unless a preparation is already pending.
+
+        The preparation is considered pending for ``CONFIG.describe_image_eager_pending``
+        (at least a day with ``CONFIG.describe_image_eager_batch``).
+
+        :param filekey: Key of the image file.
+        """
+        duration = CONFIG.describe_image_eager_pending
+        if CONFIG.describe_image_eager_batch:
+            duration = max(duration, datetime.timedelta(days=1))
+
+        if descriptions.mark_pending(filekey, duration):
+            self.prepare_image_descriptions(filekey)
+        else:
+            logger.debug(f"Preparation of {filekey=} is already pending")
+
+    @CallDeferred
+    def prepare_image_descriptions(self, filekey: db.Key | str, languages: t.Iterable[str] | None = None):
+        """
+        Generates the descriptions of an image in advance, in a deferred task.
+
+        The descriptions are stored alongside the file, so later calls of :meth:`describe_image`
+        (without a custom prompt or context) are answered instantly.
+        Languages for which a description already exists are skipped.
+
+        :param filekey: Key of the image file.
+        :param languages: The language codes to generate descriptions for.
+            Defaults to ``CONFIG.describe_image_eager_languages``, or all available languages.
+        """
+        file_skel = conf.main_app.file.viewSkel("leaf")
+        if not file_skel.read(filekey) or not (file_skel["mimetype"] or "").startswith("image/"):
+            logger.debug(f"Skipping {filekey=}, it's not an image")
+            return
+
+        if languages is None:
+            languages = CONFIG.describe_image_eager_languages or conf.i18n.available_languages
+        existing = descriptions.get_descriptions(filekey)
+
+        missing = [language for language in languages if language not in existing]
+
+        if missing and CONFIG.describe_image_eager_batch:
+            image = run_sync(self._load_image_async(filekey))
+            model = self.get_config()["openai_model"]
+            for language in missing:
+                batches.enqueue(
+                    "describe_image",
+                    self._get_describe_image_params(image, model=model, prompt="", context="", language=language),
+                    {"filekey": str(filekey), "language": language},
+                )
+            logger.info(f"Queued descriptions for {filekey=} in {missing=}")
+
+        elif missing:
+            with scheduler.lane(scheduler.Priority.BULK), usage.metered("prepare_image_descriptions", enforce=False):
+                run_sync(gather_bounded(
+                    self.describe_image_async(filekey=filekey, language=language)
+                    for language in missing
+                ))
+            logger.info(f"Prepared descriptions for {filekey=} in {missing=}")
+
+    @exposed
+    @access("admin")
+    @force_post
+    def job_submit(
+        self,
+        *,
+        operation: str,
+        **kwargs,
+    ):
+        """
+        Submit a long-running assistant operation as a job.
+
+        The job is executed in a deferred task, so the request returns immediately.
+        Use :meth:`job_status` to poll or :meth:`job_result` to (long-)poll for the result.
+
+        :param operation: Name of the operation to execute, one of :attr:`job_operations`.
+        :param kwargs: The parameters for the operation, exactly as they would be passed
+            to the synchronous endpoint.
+        :return: The status of the created job, including its ``key``.
+
+        :raises NotAcceptable: If the operation is not supported.
+        """
+        if operation not in self.job_operations:
+            raise errors.NotAcceptable(f"Unsupported {operation=!r}")
+
+        user = current.user.get()
+        job = jobs.create_job(operation, kwargs, owner=user and user["key"])
+        self.execute_job(job.key)
+
+        return self.render_json(jobs.job_to_dict(job))
+
+    @exposed
+    @access("admin")
+    def job_status(self, key: str):
+        """
+        Returns the status of a job.
+
+        :param key: The key of the job, as returned by :meth:`job_submit`.
+        :return: The status of the job.
+
+        :raises NotFound: If the job doesn't exist or has expired.
+        """
+        return self.render_json(jobs.job_to_dict(self._get_job(key)))
+
+    @exposed
+    @access("admin")
+    def job_result(self, key: str, wait: int = 0):
+        """
+        Returns the result of a job, optionally waiting for it to finish.
+
+        If the job is finished, the result is returned exactly as the synchronous
+        endpoint would have rendered it. Otherwise, the job status is returned
+        with the HTTP status ``202 Accepted``.
+
+        :param key: The key of the job, as returned by :meth:`job_submit`.
+        :param wait: Number of seconds to wait for the job to finish (long-polling).
+            Limited by ``CONFIG.job_long_poll_timeout``.
+        :return: The result of the job, or its status if it's not finished yet.
+
+        :raises NotFound: If the job doesn't exist or has expired.
+        :raises HTTPException: With the original error, if the job has failed.
+        """
+        job = self._get_job(key)
+        deadline = time.monotonic() + max(0, min(wait, CONFIG.job_long_poll_timeout))
+
+        while job["status"] in (jobs.JobStatus.PENDING, jobs.JobStatus.RUNNING) and time.monotonic() < deadline:
+            time.sleep(1)
+            job = self._get_job(key)
+
+        if job["status"] == jobs.JobStatus.DONE:
+            current.request.get().response.headers["Content-Type"] = job["content_type"]
+            return jobs.decompress(job["result"])
+
+        if job["status"] == jobs.JobStatus.FAILED:
+            error = json.loads(job["error"])
+            raise errors.HTTPException(status=error["status"], name=error["name"], descr=error["descr"])
+
+        current.request.get().response.status = "202 Accepted"
+        return self.render_json(jobs.job_to_dict(job))
+
+    def _get_job(self, key: str) -> db.Entity:
+        """
+        Fetch a job, ensuring it exists and belongs to the current user.
+
+        :raises NotFound: If the job doesn't exist, has expired or belongs to another user.
+        """
+        if not (job := jobs.get_job(key)):
+            raise errors.NotFound(f"Job not found with {key=!r}")
+
+        user = current.user.get()
+        if job["owner"] != user["key"] and "root" not in user["access"]:
+            raise errors.NotFound(f"Job not found with {key=!r}")
+
+        return job
+
+    @CallDeferred
+    def execute_job(self, key: db.Key):
+        """
+        Executes a job in a deferred task.
+
+        The operation is invoked like its exposed endpoint, so parameter parsing and
+        access checks apply as usual. The rendered result is stored compressed in the job.
+        Temporary errors (rate-limit, unavailable service) are retried by the task queue
+        up to ``CONFIG.job_max_attempts`` times.
+
+        :param key: The key of the job to execute.
+        """
+        if not (job := jobs.get_job(key)) or job["status"] not in (jobs.JobStatus.PENDING, jobs.JobStatus.RUNNING):
+            logger.warning(f"Job {key=!r} is not executable anymore")
+            return
+
+        if not (job := jobs.update_job(key, status=jobs.JobStatus.RUNNING, attempts=job["attempts"] + 1)):
+            logger.warning(f"Job {key=!r} has been deleted in the meantime")
+            return
+
+        try:
+            with scheduler.lane(scheduler.Priority.NORMAL):
+                result = getattr(self, job["operation"])(**json.loads(job["params"]))
+        except errors.HTTPException as e:
+            error = json.dumps({"status": e.status, "name": e.name, "descr": e.descr})
+            if e.status in (429, 503) and job["attempts"] < CONFIG.job_max_attempts:
+                jobs.update_job(key, status=jobs.JobStatus.PENDING, error=error)
+                raise  # let the task queue retry
+            jobs.update_job(key, status=jobs.JobStatus.FAILED, error=error)
+            return
+        except Exception as e:
+            logger.exception(e)
+            jobs.update_job(key, status=jobs.JobStatus.FAILED, error=json.dumps({
+                "status": 500, "name": "Internal Server Error", "descr": str(e),
+            }))
+            return
+
+        jobs.update_job(
+            key,
+            status=jobs.JobStatus.DONE,
+            content_type=current.request.get().response.headers.get("Content-Type"),
+            result=jobs.compress(result if isinstance(result, str) else json.dumps(result)),
+            error=None,
+        )
+
+    @exposed
+    @access("admin")
+    @force_post
+    def translate_module(
+        self,
+        *,
+        module: str,
+        languages: t.Optional[list[str]] = None,
+        source_language: t.Optional[str] = None,
+        bones: t.Optional[list[str]] = None,
+        batch: bool = False,
+    ):
+        """
+        Translate all entries of a ``List`` or ``Tree`` module into missing languages, as a job.
+
+        The entries are processed in batches of ``CONFIG.translate_module_batch_size`` by deferred tasks,
+        which iterate the module with datastore cursors. Only empty language slots of multi-language
+        ``StringBone`` and ``TextBone`` bones are translated, like :meth:`translate` would do.
+        The progress is checkpointed in the job after each batch, including the throughput and an ETA,
+        so :meth:`job_status` reports it and an interrupted job resumes at its last cursor.
+
+        :param module: Name of the module to translate.
+        :param languages: The target language codes. Defaults to ``conf.i18n.available_languages``.
+        :param source_language: The language code of the source texts. Defaults to ``conf.i18n.default_language``.
+        :param bones: Names of the bones to translate. Defaults to all translatable bones.
+        :param batch: Queue the translations for the batch API (see :mod:`viur.assistant.batches`)
+            instead of translating them immediately. They are written once their batch is completed.
+        :return: The status of the created job, including its ``key``.
+
+        :raises NotAcceptable: If the module is not a ``List`` or ``Tree`` module.
+        :raises Forbidden: If the current user is not allowed to edit the module.
+        :raises TooManyRequests: If a daily quota of the current user is exhausted, see :mod:`viur.assistant.usage`.
+        """
+        if not isinstance(mod := getattr(conf.main_app.vi, module, None), (List, Tree)):
+            raise errors.NotAcceptable(f"Unsupported {module=!r}")
+
+        user = current.user.get()
+        if f"{module}-edit" not in user["access"] and "root" not in user["access"]:
+            raise errors.Forbidden()
+        usage.check_quota("translate_module")
+
+        skel_types = ["node", "leaf"] if isinstance(mod, Tree) else [None]
+        job = jobs.create_job(
+            "translate_module",
+            {
+                "module": module,
+                "languages": languages or conf.i18n.available_languages,
+                "source_language": source_language or conf.i18n.default_language,
+                "bones": bones,
+                "batch": batch,
+            },
+            owner=user["key"],
+        )
+        job = jobs.update_job(job.key, progress=json.dumps({
+            "skel_types": skel_types,
+            "cursor": None,
+            "total": sum(self._get_module_skel(mod, skel_type).all().count() for skel_type in skel_types),
+            "processed": 0,
+            "translated": 0,
+            "retries": 0,
+            "started": utils.utcNow().isoformat(),
+            "items_per_second": None,
+            "eta_seconds": None,
+        }))
+        self.translate_module_batch(job.key)
+
+        return self.render_json(jobs.job_to_dict(job))
+
+    def _get_module_skel(self, mod: List | Tree, skel_type: str | None) -> SkeletonInstance:
+        return mod.editSkel(skel_type) if skel_type else mod.editSkel()
+
+    @CallDeferred
+    def translate_module_batch(self, key: db.Key):
+        """
+        Translates the next batch of a :meth:`translate_module` job in a deferred task.
+
+        After the batch is written, the progress is checkpointed and the next batch is deferred,
+        delayed according to ``CONFIG.translate_module_max_items_per_second``.
+        Temporary errors (rate-limit, unavailable service) reschedule the same batch,
+        up to ``CONFIG.job_max_attempts`` times in a row.
+
+        :param key: The key of the job.
+        """
+        if not (job := jobs.get_job(key)) or job["status"] not in (jobs.JobStatus.PENDING, jobs.JobStatus.RUNNING):
+            logger.warning(f"Job {key=!r} is not executable anymore")
+            return
+
+        batch_started = time.monotonic()
+        params = json.loads(job["params"])
+        progress = json.loads(job["progress"])
+        mod = getattr(conf.main_app.vi, params["module"])
+        skel_type = progress["skel_types"][0]
+
+        query = self._get_module_skel(mod, skel_type).all()
+        if progress["cursor"]:
+            query.setCursor(progress["cursor"])
+        skels = query.fetch(CONFIG.translate_module_batch_size) or []
+
+        jobs.update_job(key, status=jobs.JobStatus.RUNNING)
+        try:
+            with scheduler.lane(scheduler.Priority.BULK), usage.metered("translate_module"):
+                translated = self._translate_module_skels(mod, skel_type, skels, params)
+        except errors.HTTPException as e:
+            if e.status in (429, 503) and progress["retries"] < CONFIG.job_max_attempts:
+                progress["retries"] += 1
+                jobs.update_job(key, progress=json.dumps(progress))
+                self.translate_module_batch(key, _countdown=60)
+                return
+            jobs.update_job(key, status=jobs.JobStatus.FAILED, error=json.dumps({
+                "status": e.status, "name": e.name, "descr": e.descr,
+            }))
+            return
+        except Exception as e:
+            logger.exception(e)
+            jobs.update_job(key, status=jobs.JobStatus.FAILED, error=json.dumps({
+                "status": 500, "name": "Internal Server Error", "descr": str(e),
+            }))
+            return
+
+        # Checkpoint
+        if (cursor := skels and skels.getCursor()) and len(skels) == CONFIG.translate_module_batch_size:
+            progress["cursor"] = cursor
+        else:
+            progress["skel_types"].pop(0)
+            progress["cursor"] = None
+
+        progress["processed"] += len(skels)
+        progress["translated"] += translated
+        progress["retries"] = 0
+        elapsed = (utils.utcNow() - datetime.datetime.fromisoformat(progress["started"])).total_seconds()
+        progress["items_per_second"] = round(progress["processed"] / elapsed, 2) if elapsed else None
+        progress["eta_seconds"] = (
+            round(max(0, progress["total"] - progress["processed"]) / progress["items_per_second"])
+            if progress["items_per_second"] else None
+        )
+
+        if not progress["skel_types"]:
+            jobs.update_job(
+                key,
+                status=jobs.JobStatus.DONE,
+                progress=json.dumps(progress),
+                content_type="application/json",
+                result=jobs.compress(json.dumps(progress)),
+                error=None,
+            )
+            logger.info(f"Translated {params['module']!r}: {progress}")
+            return
+
+        jobs.update_job(key, progress=json.dumps(progress), expires=utils.utcNow() + CONFIG.job_ttl)
+
+        # Respect the throughput cap
+        countdown = 0
+        if CONFIG.translate_module_max_items_per_second:
+            min_duration = len(skels) / CONFIG.translate_module_max_items_per_second
+            countdown = max(0, round(min_duration - (time.monotonic() - batch_started)))
+        self.translate_module_batch(key, _countdown=countdown)
+
+    def _translate_module_skels(
+        self,
+        mod: List | Tree,
+        skel_type: str | None,
+        skels: t.Iterable[SkeletonInstance],
+        params: dict[str, t.Any],
+    ) -> int:
+        """
+        Translate the missing language slots of some skeletons and write them back.
+
+        :return: The number of translated values.
+        """
+        tasks = []  # (key, bone name, language, source text)
+        for skel in skels:
+            for name, bone in skel.items():
+                if (
+                    not isinstance(bone, (StringBone, TextBone))
+                    or not bone.languages
+                    or bone.multiple
+                    or (params["bones"] and name not in params["bones"])
+                    or not (values := skel[name])
+                    or not (source := values.get(params["source_language"]))
+                ):
+                    continue
+                tasks.extend(
+                    (skel["key"], name, language, source)
+                    for language in params["languages"]
+                    if language != params["source_language"]
+                    and language in bone.languages
+                    and not values.get(language)
+                )
+
+        if not tasks:
+            return 0
+
+        if params.get("batch"):
+            model = self.get_config()["openai_model"]
+            for key, name, language, source in tasks:
+                characteristic = self._get_language_characteristic(language)
+                batches.enqueue(
+                    "translate",
+                    self._get_translate_segments_params(
+                        self._get_document(source).segments,
+                        model=model,
+                        language=language,
+                        characteristic=characteristic,
+                    ),
+                    {
+                        "module": params["module"],
+                        "skel_type": skel_type,
+                        "key": str(key),
+                        "bone": name,
+                        "language": language,
+                        "characteristic": characteristic,
+                        "text": source,
+                        "model": model,
+                    },
+                )
+            return len(tasks)
+
+        translations = run_sync(gather_bounded(
+            self.translate_async(
+                text=source,
+                language=language,
+                characteristic=self._get_language_characteristic(language),
+                field=f"{params['module']}/{key.id_or_name}/{name}",
+            )
+            for key, name, language, source in tasks
+        ))
+
+        updates = {}
+        for (key, name, language, _), translation in zip(tasks, translations):
+            updates.setdefault(key, []).append((name, language, translation))
+
+        def set_translations(skel: SkeletonInstance) -> None:
+            for name, language, translation in updates[skel["key"]]:
+                if not skel[name].get(language):  # may have been edited in the meantime
+                    skel[name][language] = translation
+
+        # Write back in batches, each within a single transaction
+        keys = list(updates)
+        for chunk in range(0, len(keys), CONFIG.translate_module_write_batch_size):
+            def txn():
+                for key in keys[chunk:chunk + CONFIG.translate_module_write_batch_size]:
+                    self._get_module_skel(mod, skel_type).patch(set_translations, key=key)
+
+            db.RunInTransaction(txn)
+
+        return len(tasks)
+
+    def apply_batch_result(self, operation: str, target: dict[str, t.Any], content: str) -> None:
+        """
+        Writes the result of a batch request to its target, see :mod:`viur.assistant.batches`.
+
+        :param operation: Name of the operation, which queued the request.
+        :param target: The target of the result, as it was queued.
+        :param content: The message content of the completion.
+        """
+        answer = self._parse_completion_answer(content)
+
+        if operation == "describe_image":
+            descriptions.set_description(target["filekey"], target["language"], answer)
+            return
+
+        if operation != "translate":
+            raise ValueError(f"Unsupported {operation=!r}")
+
+        document = self._get_document(target["text"])
+        if len(answer) == len(document.segments) and all(
+            document.is_valid(index, translation) for index, translation in enumerate(answer)
+        ):
+            translation = document.render(answer)
+            if CONFIG.translation_memory:
+                translationmemory.store(
+                    zip(document.segments, answer),
+                    target["language"],
+                    self._get_memory_context(
+                        target.get("model") or self.get_config()["openai_model"],
+                        target["language"],
+                        target["characteristic"],
+                    ),
+                )
+        else:
+            logger.debug(f"Incomplete batch result for {target=}, translating it again")
+            translation = run_sync(self.translate_async(
+                text=target["text"],
+                language=target["language"],
+                characteristic=target["characteristic"],
+            ))
+
+        def set_translation(skel: SkeletonInstance) -> None:
+            if not skel[target["bone"]].get(target["language"]):  # may have been edited in the meantime
+                skel[target["bone"]][target["language"]] = translation
+
+        mod = getattr(conf.main_app.vi, target["module"])
+        self._get_module_skel(mod, target["skel_type"]).patch(set_translation, key=target["key"])
+
+    @exposed
+    @access("admin")
+    def image_hash_stats(self):
+        """
+        Returns the statistics of the perceptual hash index, which reuses
+        descriptions across near-identical images.
+
+        :return: The number of ``hits``, ``misses``, the ``hit_rate`` and the number of indexed images (``entries``).
+        """
+        return self.render_json(imagehash.get_stats())
+
+    @exposed
+    @access("admin")
+    def scheduler_stats(self):
+        """
+        Returns the statistics of the priority lanes of this instance, see :mod:`viur.assistant.scheduler`.
+
+        :return: The queue depth, running calls and wait times (in seconds) of each lane.
+        """
+        return self.render_json(scheduler.get_stats())
+
+    @exposed
+    @access("admin")
+    def usage_view(self, day: t.Optional[str] = None, user: t.Optional[str] = None):
+        """
+        Returns the usage of a user on a day and the configured quotas, see :mod:`viur.assistant.usage`.
+
+        The usage is eventually consistent, the pending usage of the instances is not included.
+
+        :param day: The (UTC) day in ISO format, like ``"2025-01-31"``. Defaults to today.
+        :param user: The key of another user, only allowed for root users. Defaults to the current user.
+        :return: The ``usage`` by operation (``"*"`` for all operations) and the ``quotas``.
+
+        :raises Forbidden: If a non-root user requests the usage of another user.
+        """
+        current_user = current.user.get()
+        user_key = current_user["key"]
+        if user:
+            if "root" not in current_user["access"]:
+                raise errors.Forbidden()
+            user_key = db.keyHelper(user, "user")
+
+        return self.render_json({
+            "day": day or utils.utcNow().date().isoformat(),
+            "usage": usage.query_usage(user_key, day),
+            "quotas": CONFIG.usage_quotas,
+        })
+
+    def _get_resized_image_bytes(
+        self,
+        image: t.IO[bytes] | str | bytes | "os.PathLike[str]" | "os.PathLike[bytes]",
+        target_pixel_count: int,
+        jpeg_quality: int = 50,
+    ):
+        """
+        Resize an image to approximately match a target total pixel count and return it as a JPEG byte stream.
+
+        The image is scaled proportionally to meet the target pixel count (width × height),
+        while preserving the original aspect ratio. If the resized dimensions would exceed
+        the original image size, no upscaling is performed. The result is encoded as a JPEG.
+
+        :param image: Input image, provided as a file-like object, byte string, file path, or raw bytes.
+        :param target_pixel_count: Desired total number of pixels for the resized image.
+            Used to compute the new dimensions.
+        :param jpeg_quality: JPEG compression quality (0 to 100).
+            Higher values yield better image quality at the cost of file size. Default is 50.
+        :return: The resized and JPEG-compressed image as a byte stream.
+
+        :raises ValueError: If `jpeg_quality` is not in the 0–100 range or the image input is invalid.
 
         .. note::
          - Images in PNG, SVG, or WEBP format are automatically converted to RGB JPEG.
          - This function is intended for preprocessing images before passing them to
            AI models, balancing detail and data size.
         """
+        return self._preprocess_image(
+            image=image,
+            target_pixel_count=target_pixel_count,
+            jpeg_quality=jpeg_quality,
+        ).data
+
+    def _preprocess_image(
+        self,
+        image: t.IO[bytes] | str | bytes | "os.PathLike[str]" | "os.PathLike[bytes]",
+        target_pixel_count: int,
+        jpeg_quality: int = 50,
+        adaptive: bool = False,
+    ) -> PreprocessedImage:
+        """
+        Resize and encode an image like :meth:`_get_resized_image_bytes`,
+        and compute its perceptual hash (dHash) within the same pass.
+
+        In adaptive mode (see :mod:`viur.assistant.imaging`), uniform borders are trimmed,
+        the pixel budget and detail level are chosen by the content and aspect ratio of the image,
+        and the image is encoded in the format with the smallest payload.
+
+        :param adaptive: Use the adaptive preprocessing policy, ``target_pixel_count`` is the default budget then.
+        :return: The preprocessed image with its metadata.
+        """
         if not (0 <= jpeg_quality <= 100):
             raise ValueError("jpeg_quality must be between 0 and 100")
 
@@ -363,12 +2240,21 @@ class Assistant(Singleton):
         if not isinstance(image, (io.TextIOBase, io.BufferedIOBase, io.RawIOBase, io.IOBase)):
             raise ValueError("image must be file-like or bytes")
 
-        pillow_image = PIL.Image.open(image)
+        from PIL import Image
+
+        pillow_image = Image.open(image)
         if pillow_image.format in ["PNG", "SVG", "WEBP"]:  # TODO: ???
             jpeg_image = io.BytesIO()
             pillow_image.convert("RGB").save(jpeg_image, "JPEG")
             jpeg_image.seek(0)
-            pillow_image = PIL.Image.open(jpeg_image)
+            pillow_image = Image.open(jpeg_image)
+
+        dhash = imagehash.dhash(pillow_image)
+
+        if adaptive:
+            pillow_image = imaging.trim_borders(pillow_image.convert("RGB"))
+            image_complexity = imaging.complexity(pillow_image)
+            target_pixel_count = imaging.choose_pixel_budget(pillow_image, target_pixel_count, image_complexity)
 
         original_img_total_pixels = pillow_image.width * pillow_image.height
         side_ratio_to_n_pixels = (target_pixel_count / original_img_total_pixels) ** 0.5
@@ -380,19 +2266,47 @@ class Assistant(Singleton):
         else:
             resized_img = pillow_image.resize(
                 (new_width, new_height),
-                PIL.Image.Resampling.LANCZOS
+                Image.Resampling.LANCZOS
             )
 
-        result_bio = io.BytesIO()
-        resized_img.save(result_bio, "jpeg", quality=jpeg_quality)
-        result_bio.seek(0)
-        return result_bio.read()
+        if adaptive:
+            data, mimetype = imaging.encode_smallest(
+                resized_img,
+                jpeg_quality=jpeg_quality,
+                webp_quality=CONFIG.describe_image_webp_quality_default,
+            )
+            detail = imaging.choose_detail(resized_img.width, resized_img.height, image_complexity)
+        else:
+            result_bio = io.BytesIO()
+            resized_img.save(result_bio, "jpeg", quality=jpeg_quality)
+            data, mimetype, detail = result_bio.getvalue(), "image/jpeg", "low"
+
+        return PreprocessedImage(
+            data=data,
+            mimetype=mimetype,
+            width=resized_img.width,
+            height=resized_img.height,
+            detail=detail,
+            dhash=dhash,
+        )
 
     def openai_create_completion(
         self,
         *,
-        model: str | ChatModel,
-        messages: t.Iterable[ChatCompletionMessageParam],
+        model: "str | ChatModel",
+        messages: "t.Iterable[ChatCompletionMessageParam]",
+        **kwargs
+    ):
+        """
+        Synchronous wrapper for :meth:`openai_create_completion_async`.
+        """
+        return run_sync(self.openai_create_completion_async(model=model, messages=messages, **kwargs))
+
+    async def openai_create_completion_async(
+        self,
+        *,
+        model: "str | ChatModel",
+        messages: "t.Iterable[ChatCompletionMessageParam]",
         **kwargs
     ):
         """
@@ -407,35 +2321,23 @@ class Assistant(Singleton):
         :return: The response in plain text on success.
 
         :raises errors.HTTPException: If an API error occurs.
+        :raises errors.RequestTooLarge: If the request exceeds the input budget, see :mod:`viur.assistant.tokens`.
         """
-        client = openai.Client(api_key=CONFIG.api_openai_key)
+        import openai
+
+        params = self._get_completion_params(model=model, messages=messages, **kwargs)
+        tokens.preflight(tokens.Provider.OPENAI, model, params)
+
+        client = get_openai_client()
         try:
-            response = client.chat.completions.create(  # type: ignore
-                model=model,
-                messages=messages,
-                n=kwargs.pop("n", 1),  # How many chat completion choices
-                response_format=kwargs.pop("response_format", {  # type: ignore (typed dict)
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": "viur-assistant",
-                        "schema": {
-                            "type": "object",
-                            "properties": {
-                                "answer": {"type": "string"}
-                            },
-                            "required": ["answer"],
-                            "additionalProperties": False
-                        },
-                        "strict": True
-                    }
-                }),
-                **kwargs
-            )
+            async with scheduler.slot():
+                response = await client.chat.completions.create(**params)  # type: ignore
         except openai.APIConnectionError as e:
             logger.error(f"OpenAI API error: {e}")
             raise errors.ServiceUnavailable(descr=str(e)) from e
         except openai.RateLimitError as e:
             logger.error(f"OpenAI API rate-limit reached: {e}")
+            scheduler.report_rate_limit()
             current.request.get().response.headers["Retry-After"] = e.response.headers.get("Retry-After", "60")
             raise errors.HTTPException(status=e.status_code, name=e.code, descr=str(e)) from e
         except openai.APIStatusError as e:
@@ -443,13 +2345,219 @@ class Assistant(Singleton):
             raise errors.HTTPException(status=e.status_code, name=e.code, descr=str(e)) from e
 
         logger.debug(f"{response=}")
+        usage.record(
+            input_tokens=response.usage and response.usage.prompt_tokens or 0,
+            output_tokens=response.usage and response.usage.completion_tokens or 0,
+            images=usage.count_images(params),
+        )
+        if response.usage:
+            tokens.calibrate(tokens.Provider.OPENAI, model, params, response.usage.prompt_tokens)
+        return self._parse_completion_answer(response.choices[0].message.content)
+
+    def _get_completion_params(
+        self,
+        *,
+        model: "str | ChatModel",
+        messages: "t.Iterable[ChatCompletionMessageParam]",
+        **kwargs
+    ) -> dict[str, t.Any]:
+        """
+        Returns the parameters of a chat completion, as used by :meth:`openai_create_completion_async`
+        and for the batch API, see :mod:`viur.assistant.batches`.
+        """
+        return {
+            "model": model,
+            "messages": messages,
+            "n": kwargs.pop("n", 1),  # How many chat completion choices
+            "response_format": kwargs.pop("response_format", {  # type: ignore (typed dict)
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "viur-assistant",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "answer": {"type": "string"}
+                        },
+                        "required": ["answer"],
+                        "additionalProperties": False
+                    },
+                    "strict": True
+                }
+            }),
+            **kwargs
+        }
+
+    def _parse_completion_answer(self, content: str) -> t.Any:
+        """
+        Returns the answer of a chat completion in structured JSON format.
+
+        :raises InternalServerError: If the content is not valid.
+        """
         try:
-            message = json.loads(response.choices[0].message.content)
+            message = json.loads(content)
             message = message["answer"]
-        except (JSONDecodeError, KeyError):
+        except (JSONDecodeError, KeyError, TypeError):
             raise errors.InternalServerError("Got invalid JSON from API")
         return message
 
+    async def anthropic_create_message_async(self, **llm_params) -> "anthropic.types.Message":
+        """
+        Creates a message using the Anthropic API.
+
+        :param llm_params: The parameters passing to the client.
+        :return: The created message.
+
+        :raises errors.TooManyRequests: If the rate-limit of the API is reached.
+        :raises errors.ServiceUnavailable: If the API is overloaded or can't be reached.
+        :raises errors.InternalServerError: If the request fails otherwise.
+        :raises errors.RequestTooLarge: If the request exceeds the input budget, see :mod:`viur.assistant.tokens`.
+        """
+        import anthropic
+
+        logger.debug(f"{llm_params=}")
+        tokens.preflight(tokens.Provider.ANTHROPIC, llm_params["model"], llm_params)
+        try:
+            async with scheduler.slot():
+                message = await get_anthropic_client().messages.create(**llm_params)
+        except anthropic.APIConnectionError as e:
+            logger.error(f"Anthropic API error: {e}")
+            raise errors.ServiceUnavailable(descr=str(e)) from e
+        except anthropic.RateLimitError as e:
+            logger.error(f"Anthropic API rate-limit reached: {e}")
+            scheduler.report_rate_limit()
+            if request := current.request.get():
+                request.response.headers["Retry-After"] = e.response.headers.get("Retry-After", "60")
+            raise errors.TooManyRequests(descr=str(e)) from e
+        except anthropic.APIStatusError as e:
+            if e.status_code in (503, 529):  # 529: overloaded
+                logger.error(f"Anthropic API unavailable: [{e.status_code}] {e}")
+                raise errors.ServiceUnavailable(descr=str(e)) from e
+            logger.exception(e)
+            raise errors.InternalServerError(descr=str(e))
+        except Exception as e:
+            logger.exception(e)
+            raise errors.InternalServerError(descr=str(e))
+        logger.debug(f"{message=}")
+        input_tokens = (
+            message.usage.input_tokens
+            + (message.usage.cache_creation_input_tokens or 0)
+            + (message.usage.cache_read_input_tokens or 0)
+        )
+        usage.record(
+            input_tokens=input_tokens,
+            output_tokens=message.usage.output_tokens,
+            images=usage.count_images(llm_params),
+        )
+        tokens.calibrate(tokens.Provider.ANTHROPIC, llm_params["model"], llm_params, input_tokens)
+        return message
+
+    def get_config(self) -> SkeletonInstance:
+        """
+        Returns the configuration of the assistant stored in this singleton.
+
+        The configuration is cached per instance for ``CONFIG.config_cache_ttl``.
+
+        :raises InternalServerError: If the configuration is missing.
+        """
+        global _config_cache
+        if _config_cache and _config_cache[0] > time.monotonic():
+            return _config_cache[1]
+        if not (skel := self.getContents()):
+            raise errors.InternalServerError(descr="Configuration missing")
+        if CONFIG.config_cache_ttl:
+            _config_cache = (time.monotonic() + CONFIG.config_cache_ttl.total_seconds(), skel)
+        return skel
+
+    def onEdited(self, skel: SkeletonInstance):
+        global _config_cache
+        super().onEdited(skel)
+        _config_cache = None
+
+    def warmup(self, *, preconnect: bool | None = None, modules: t.Iterable[str] | None = None) -> dict[str, float]:
+        """
+        Prime the state of the assistant on a new instance, before it serves its first request.
+
+        Imports the provider SDKs and Pillow, starts the event loop, builds the clients,
+        reads the configuration and computes the module structures in all available languages.
+        Failing steps are logged and skipped.
+        It's intended to be called by the warmup request of the platform, see :doc:`/getting-started`.
+
+        :param preconnect: Open pooled connections to the providers, defaults to ``CONFIG.warmup_preconnect``.
+        :param modules: Modules whose structures are computed, defaults to ``CONFIG.warmup_modules``.
+        :return: The duration of each step in seconds.
+        """
+        timings = {}
+
+        @contextlib.contextmanager
+        def step(name: str) -> t.Iterator[None]:
+            started = time.perf_counter()
+            try:
+                yield
+            except Exception as e:
+                logger.warning(f"Warmup step {name!r} failed: {e!r}")
+            finally:
+                timings[name] = round(time.perf_counter() - started, 3)
+
+        with step("imports"):
+            import anthropic  # noqa: F401
+            import openai  # noqa: F401
+            from PIL import Image  # noqa: F401
+
+        with step("loop"):
+            get_loop()
+
+        with step("clients"):
+            if CONFIG.api_openai_key:
+                get_openai_client()
+            if CONFIG.api_anthropic_key:
+                get_anthropic_client()
+
+        if CONFIG.warmup_preconnect if preconnect is None else preconnect:
+            with step("preconnect"):
+                run_sync(self._preconnect_async())
+
+        with step("config"):
+            self.get_config()
+
+        with step("structures"):
+            if (modules := CONFIG.warmup_modules if modules is None else modules) is None:
+                modules = [
+                    name for name in dir(conf.main_app.vi)
+                    if isinstance(getattr(conf.main_app.vi, name, None), (List, Tree))
+                ]
+            # The structures are cached per language, which the router sets for every request
+            for language in conf.i18n.available_languages:
+                token = current.language.set(language)
+                try:
+                    for module_name in modules:
+                        if isinstance(module := getattr(conf.main_app.vi, module_name, None), (List, Tree)):
+                            self._get_structure(module_name, module)
+                finally:
+                    current.language.reset(token)
+
+        logger.info(f"Warmup took {sum(timings.values()):.3f}s: {timings}")
+        return timings
+
+    async def _preconnect_async(self) -> None:
+        """Open pooled connections to the configured providers, by listing their models"""
+        aws = []
+        if CONFIG.api_openai_key:
+            aws.append(get_openai_client().with_options(max_retries=0).models.list())
+        if CONFIG.api_anthropic_key:
+            aws.append(get_anthropic_client().with_options(max_retries=0).models.list())
+        for result in await asyncio.gather(*aws, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to preconnect: {result!r}")
+
+    def render_json(self, data: t.Any) -> str:
+        """
+        Render the given data as JSON, regardless of the current renderer.
+
+        :param data: The JSON-serializable data to render.
+        """
+        current.request.get().response.headers["Content-Type"] = "application/json; charset=utf-8"
+        return json.dumps(data)
+
     def render_text(self, text: str) -> t.Any:
         """
         Render the give text as usual for the current renderer.
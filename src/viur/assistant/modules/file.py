@@ -0,0 +1,39 @@
+from viur.core.skeleton import SkeletonInstance
+
+from viur.assistant.config import ASSISTANT_LOGGER, get_assistant
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "DescribeImageOnUploadMixin",
+]
+
+
+class DescribeImageOnUploadMixin:
+    """
+    Mixin for the ViUR file module, which generates image descriptions as soon as an image is uploaded.
+
+    The descriptions are generated in a deferred task for the configured languages
+    (``CONFIG.describe_image_eager_languages``) and stored alongside the file.
+    Later calls of :meth:`Assistant.describe_image` are then answered instantly.
+
+    .. code-block:: python
+
+        # deploy/modules/file.py
+        from viur.core.modules.file import File as _File
+        from viur.assistant import DescribeImageOnUploadMixin
+
+        class File(DescribeImageOnUploadMixin, _File):
+            pass
+    """
+
+    def onAdded(self, skelType: str, skel: SkeletonInstance):
+        super().onAdded(skelType, skel)
+
+        if skelType != "leaf" or not (skel["mimetype"] or "").startswith("image/"):
+            return
+
+        if assistant := get_assistant():
+            assistant.queue_image_descriptions(skel["key"])
+        else:
+            logger.warning("The assistant module is not registered, can't prepare image descriptions")
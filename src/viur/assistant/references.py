@@ -0,0 +1,115 @@
+"""
+Image references
+
+Upload-once references for preprocessed images.
+
+Instead of inlining a preprocessed image base64-encoded into every vision request,
+it can be uploaded once into the file module and referenced by a signed download URL,
+which the provider fetches on its own. References are cached in entities of the kind
+``viur-assistant-image-reference``, keyed by the dlkey of the source file and the
+preprocessing parameters, together with the metadata of the preprocessed image.
+
+Chat completions can only reference images by URL (provider file IDs are not supported
+for images there), so the file module acts as the file storage.
+References expire after ``CONFIG.image_reference_ttl`` and their uploads are evicted periodically.
+"""
+
+import datetime
+import typing as t
+
+from viur.core import conf, current, db, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "IMAGE_REFERENCE_KIND",
+    "get_reference",
+    "create_reference",
+]
+
+IMAGE_REFERENCE_KIND: t.Final[str] = "viur-assistant-image-reference"
+"""The datastore kind of the cached references"""
+
+_EXTENSIONS: t.Final[dict[str, str]] = {
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+}
+
+
+def get_reference(dlkey: str, params_key: str) -> db.Entity | None:
+    """
+    Returns the cached reference of a preprocessed image, if it's still valid.
+
+    :param dlkey: The dlkey of the source file.
+    :param params_key: A key of the preprocessing parameters.
+    """
+    entity = db.Get(db.Key(IMAGE_REFERENCE_KIND, f"{dlkey}-{params_key}"))
+    if not entity or entity["expires"] < utils.utcNow():
+        return None
+    return entity
+
+
+def create_reference(
+    dlkey: str,
+    params_key: str,
+    data: bytes,
+    mimetype: str,
+    metadata: dict[str, t.Any],
+) -> db.Entity:
+    """
+    Upload a preprocessed image and cache its reference.
+
+    :param dlkey: The dlkey of the source file.
+    :param params_key: A key of the preprocessing parameters.
+    :param data: The encoded, preprocessed image.
+    :param mimetype: The mime type of the encoded image.
+    :param metadata: Additional metadata of the preprocessed image, stored with the reference.
+    :return: The reference entity, containing the absolute ``url``.
+    """
+    file_module = conf.main_app.file
+    filekey = file_module.write(
+        filename=f"viur-assistant-{params_key}.{_EXTENSIONS[mimetype]}",
+        content=data,
+        mimetype=mimetype,
+        width=metadata.get("width"),
+        height=metadata.get("height"),
+    )
+    file_skel = file_module.viewSkel("leaf")
+    file_skel.read(filekey)
+
+    # The signed URL remains valid a bit longer than the reference is used
+    url = file_module.create_download_url(
+        file_skel["dlkey"],
+        file_skel["name"],
+        expires=CONFIG.image_reference_ttl + datetime.timedelta(hours=1),
+    )
+    base_url = CONFIG.image_reference_base_url or current.request.get().request.host_url
+
+    entity = db.Entity(db.Key(IMAGE_REFERENCE_KIND, f"{dlkey}-{params_key}"))
+    entity.update(metadata)
+    entity["mimetype"] = mimetype
+    entity["url"] = base_url.rstrip("/") + url
+    entity["file"] = filekey
+    entity["file_dlkey"] = file_skel["dlkey"]
+    entity["creationdate"] = utils.utcNow()
+    entity["expires"] = utils.utcNow() + CONFIG.image_reference_ttl
+    entity.exclude_from_indexes = {"url", *metadata.keys()}
+    db.Put(entity)
+    logger.debug(f"Uploaded image reference for {dlkey=} as {filekey=}")
+    return entity
+
+
+@PeriodicTask(interval=datetime.timedelta(hours=4))
+def evict_stale_image_references() -> None:
+    """Delete expired references and their uploaded images"""
+    file_module = conf.main_app.file
+    count = 0
+    for entity in db.Query(IMAGE_REFERENCE_KIND).filter("expires <", utils.utcNow()).iter():
+        file_module.mark_for_deletion(entity["file_dlkey"])
+        db.Delete([entity["file"], entity.key])
+        count += 1
+    if count:
+        logger.info(f"Evicted {count} stale image references")
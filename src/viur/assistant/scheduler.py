@@ -0,0 +1,198 @@
+"""
+Scheduler
+
+Priority lanes in front of all upstream calls of an instance.
+
+Every upstream call acquires a slot of the scheduler, within the lane of the current :class:`Priority`:
+
+- ``interactive``: Requests of users in the admin, like clicking on translate. This is the default.
+- ``normal``: Submitted jobs.
+- ``bulk``: Background work, like bulk translations or eager image descriptions.
+
+At most ``CONFIG.scheduler_capacity`` calls run at once. ``CONFIG.scheduler_interactive_reserved``
+slots of them are reserved for interactive traffic, and free slots are always granted to the highest lane first.
+Running calls can't be interrupted, so bulk traffic is throttled instead of preempted: if interactive calls
+have to wait longer than ``CONFIG.scheduler_interactive_wait_target`` or the provider reports a rate-limit,
+the share of the bulk lane is halved and recovers slowly afterwards.
+
+The scheduler works per instance, on the event loop of the assistant (see :mod:`viur.assistant.concurrency`).
+"""
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import time
+import typing as t
+
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "Priority",
+    "current_priority",
+    "lane",
+    "slot",
+    "report_rate_limit",
+    "get_stats",
+]
+
+
+class Priority:
+    INTERACTIVE: t.Final[str] = "interactive"
+    """Requests of users, which are waiting for the answer"""
+
+    NORMAL: t.Final[str] = "normal"
+    """Submitted jobs"""
+
+    BULK: t.Final[str] = "bulk"
+    """Background work, which is not waited for"""
+
+
+_PRIORITIES: t.Final[tuple[str, ...]] = (Priority.INTERACTIVE, Priority.NORMAL, Priority.BULK)
+_EWMA_WEIGHT: t.Final[float] = 0.2
+_MIN_BULK_SHARE: t.Final[float] = 0.1
+
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "viur_assistant_priority",
+    default=Priority.INTERACTIVE,
+)
+"""The priority of upstream calls in the current context"""
+
+
+class _Lane:
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.waiters: collections.deque[asyncio.Future] = collections.deque()
+        self.running = 0
+        self.served = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def record(self, wait_time: float) -> None:
+        self.wait_time += _EWMA_WEIGHT * (wait_time - self.wait_time)
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
+_lanes: dict[str, _Lane] = {priority: _Lane(priority) for priority in _PRIORITIES}
+_bulk_share = 1.0
+
+
+def _get_limit(priority: str) -> int:
+    """Returns the maximum number of running calls of a lane and all lower lanes"""
+    if priority == Priority.INTERACTIVE:
+        return CONFIG.scheduler_capacity
+    shared = max(1, CONFIG.scheduler_capacity - CONFIG.scheduler_interactive_reserved)
+    if priority == Priority.BULK:
+        return max(1, int(shared * _bulk_share))
+    return shared
+
+
+def _can_run(priority: str) -> bool:
+    position = _PRIORITIES.index(priority)
+    return all(
+        sum(_lanes[lower].running for lower in _PRIORITIES[index:]) < _get_limit(_PRIORITIES[index])
+        for index in range(position + 1)
+    )
+
+
+def _dispatch() -> None:
+    """Grant free slots to the waiting calls, highest lane first"""
+    for priority in _PRIORITIES:
+        state = _lanes[priority]
+        while state.waiters and _can_run(priority):
+            if not (future := state.waiters.popleft()).done():
+                state.running += 1
+                future.set_result(None)
+
+
+def _adapt(wait_time: float) -> None:
+    """Adapt the share of the bulk lane to the wait time of interactive calls"""
+    global _bulk_share
+    if wait_time > CONFIG.scheduler_interactive_wait_target:
+        if _bulk_share > _MIN_BULK_SHARE:
+            _bulk_share = max(_MIN_BULK_SHARE, _bulk_share / 2)
+            logger.info(f"Interactive calls waited {wait_time:.2f}s, throttling bulk lane to {_bulk_share:.0%}")
+    elif _bulk_share < 1.0:
+        _bulk_share = min(1.0, _bulk_share + 0.05)
+
+
+def report_rate_limit() -> None:
+    """Throttle the bulk lane, as the provider has reported a rate-limit"""
+    global _bulk_share
+    _bulk_share = max(_MIN_BULK_SHARE, _bulk_share / 2)
+    logger.info(f"Rate-limit reached, throttling bulk lane to {_bulk_share:.0%}")
+
+
+@contextlib.contextmanager
+def lane(priority: str) -> t.Iterator[None]:
+    """
+    Run upstream calls of the enclosed (synchronous) code in the lane of the given priority.
+
+    .. code-block:: python
+
+        with scheduler.lane(scheduler.Priority.BULK):
+            run_sync(...)
+    """
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def slot(priority: str | None = None) -> t.AsyncIterator[None]:
+    """
+    Acquire a slot for an upstream call, must be used on the event loop of the assistant.
+
+    :param priority: The priority of the call, defaults to :data:`current_priority`.
+    """
+    state = _lanes[priority or current_priority.get()]
+    started = time.monotonic()
+
+    position = _PRIORITIES.index(state.priority)
+    if any(_lanes[higher].waiters for higher in _PRIORITIES[:position + 1]) or not _can_run(state.priority):
+        future = asyncio.get_running_loop().create_future()
+        state.waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():  # the slot was granted in the meantime
+                state.running -= 1
+                _dispatch()
+            raise
+    else:
+        state.running += 1
+
+    wait_time = time.monotonic() - started
+    state.record(wait_time)
+    if state.priority == Priority.INTERACTIVE:
+        _adapt(wait_time)
+
+    try:
+        yield
+    finally:
+        state.running -= 1
+        state.served += 1
+        _dispatch()
+
+
+def get_stats() -> dict[str, t.Any]:
+    """Returns the queue depth, running calls and wait times of each lane of this instance"""
+    return {
+        "capacity": CONFIG.scheduler_capacity,
+        "bulk_share": round(_bulk_share, 2),
+        "lanes": {
+            priority: {
+                "waiting": sum(not future.done() for future in state.waiters),
+                "running": state.running,
+                "served": state.served,
+                "limit": _get_limit(priority),
+                "wait_time": round(state.wait_time, 3),
+                "max_wait_time": round(state.max_wait_time, 3),
+            }
+            for priority, state in _lanes.items()
+        },
+    }
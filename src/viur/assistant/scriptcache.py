@@ -0,0 +1,180 @@
+"""
+Script cache
+
+Result cache for ``generate_script``.
+
+Results are stored in entities of the kind ``viur-assistant-script-cache`` for ``CONFIG.script_cache_ttl``,
+keyed by the normalized prompt and the *context* of the request: the model, the system prompt,
+the thinking budget and the included module structures.
+
+With ``CONFIG.script_cache_similarity_threshold``, results of near-duplicate prompts in the same context
+are served as well. The embeddings of the cached prompts are kept in a local (per instance) vector index,
+which is filled from the datastore on the first lookup of a context. Embeddings are computed by
+``CONFIG.script_cache_embedder``, which defaults to an offline feature-hashing embedder,
+see :func:`hashed_embedding`.
+"""
+
+import datetime
+import hashlib
+import math
+import re
+import typing as t
+import unicodedata
+
+from viur.core import db, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant import expiry, jobs
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+from viur.assistant.singleflight import make_key
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "SCRIPT_CACHE_KIND",
+    "normalize_prompt",
+    "context_key",
+    "hashed_embedding",
+    "lookup",
+    "store",
+    "evict_expired_scripts",
+]
+
+SCRIPT_CACHE_KIND: t.Final[str] = "viur-assistant-script-cache"
+"""The datastore kind of the cached results"""
+
+_DIMENSIONS: t.Final[int] = 256
+_MAX_INDEX_ENTRIES: t.Final[int] = 500
+_WHITESPACE_PATTERN: t.Final[re.Pattern] = re.compile(r"\s+")
+_WORD_PATTERN: t.Final[re.Pattern] = re.compile(r"\w+")
+
+_index: dict[str, list[tuple[str, list[float], float]]] = {}
+"""The local vector index: Cache keys, embeddings and their norms by context"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt (unicode and whitespace), so that trivially different prompts share a cache entry"""
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", prompt)).strip()
+
+
+def context_key(model: str, system_prompt: str, thinking_budget: int, structures: dict[str, t.Any] | None) -> str:
+    """
+    Build the key of the context of a request.
+
+    :param model: The model.
+    :param system_prompt: The system prompt.
+    :param thinking_budget: The thinking budget in tokens.
+    :param structures: The included module structures.
+    """
+    return make_key("generate_script", model, system_prompt, thinking_budget, structures)
+
+
+def hashed_embedding(text: str) -> list[float]:
+    """
+    Offline embedding of a text, by hashing its words and character trigrams into a fixed-size vector.
+
+    It captures the lexical similarity of prompts only, which is sufficient to detect near-duplicates.
+    """
+    text = text.casefold()
+    vector = [0.0] * _DIMENSIONS
+    features = _WORD_PATTERN.findall(text)
+    features += [text[i:i + 3] for i in range(len(text) - 2)]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest)
+        vector[value % _DIMENSIONS] += 1.0 if value & (1 << 63) else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [round(value / norm, 4) for value in vector]
+
+
+def _embed(text: str) -> list[float]:
+    return list((CONFIG.script_cache_embedder or hashed_embedding)(text))
+
+
+def _norm(vector: t.Sequence[float]) -> float:
+    return math.sqrt(sum(value * value for value in vector)) or 1.0
+
+
+def _get_key(prompt: str, context: str) -> db.Key:
+    return db.Key(SCRIPT_CACHE_KIND, make_key("generate_script", prompt, context))
+
+
+def _get_index(context: str) -> list[tuple[str, list[float], float]]:
+    """Returns the local vector index of a context, loads it from the datastore on first use"""
+    if (entries := _index.get(context)) is None:
+        entries = _index[context] = []
+        now = utils.utcNow()
+        for entity in db.Query(SCRIPT_CACHE_KIND).filter("context =", context).run(_MAX_INDEX_ENTRIES):
+            if (embedding := entity["embedding"]) and entity["expires"] > now:
+                entries.append((entity.key.id_or_name, embedding, _norm(embedding)))
+    return entries
+
+
+def _read(key: db.Key) -> str | None:
+    if (entity := db.Get(key)) and entity["expires"] > utils.utcNow():
+        return jobs.decompress(entity["result"])
+    return None
+
+
+def lookup(prompt: str, context: str) -> str | None:
+    """
+    Look up the cached result of a request.
+
+    :param prompt: The normalized prompt, see :func:`normalize_prompt`.
+    :param context: The key of the context, see :func:`context_key`.
+    :return: The cached result of the same prompt or, with the similarity tier enabled,
+        of the most similar prompt, or None.
+    """
+    if (result := _read(_get_key(prompt, context))) is not None:
+        logger.debug("Found cached script")
+        return result
+
+    if (threshold := CONFIG.script_cache_similarity_threshold) is None:
+        return None
+
+    embedding = _embed(prompt)
+    norm = _norm(embedding)
+    best = None
+    for key, other, other_norm in _get_index(context):
+        if len(other) != len(embedding):  # embedded by another embedder
+            continue
+        similarity = sum(a * b for a, b in zip(embedding, other)) / (norm * other_norm)
+        if similarity >= threshold and (best is None or similarity > best[0]):
+            best = (similarity, key)
+
+    if best and (result := _read(db.Key(SCRIPT_CACHE_KIND, best[1]))) is not None:
+        logger.debug(f"Found cached script of a similar prompt with similarity {best[0]:.2f}")
+        return result
+    return None
+
+
+def store(prompt: str, context: str, result: str) -> None:
+    """
+    Store the result of a request.
+
+    :param prompt: The normalized prompt, see :func:`normalize_prompt`.
+    :param context: The key of the context, see :func:`context_key`.
+    :param result: The result.
+    """
+    entity = db.Entity(_get_key(prompt, context))
+    entity["prompt"] = prompt
+    entity["context"] = context
+    entity["result"] = jobs.compress(result)
+    entity["embedding"] = None
+    entity["creationdate"] = utils.utcNow()
+    entity["expires"] = utils.utcNow() + CONFIG.script_cache_ttl
+    entity.exclude_from_indexes = {"prompt", "result", "embedding"}
+
+    if CONFIG.script_cache_similarity_threshold is not None:
+        entity["embedding"] = _embed(prompt)
+        if (entries := _index.get(context)) is not None and len(entries) < _MAX_INDEX_ENTRIES:
+            entries.append((entity.key.id_or_name, entity["embedding"], _norm(entity["embedding"])))
+
+    db.Put(entity)
+
+
+@PeriodicTask(interval=datetime.timedelta(hours=4))
+def evict_expired_scripts() -> None:
+    """Delete expired results"""
+    if count := expiry.purge_expired(SCRIPT_CACHE_KIND):
+        logger.info(f"Evicted {count} expired scripts")
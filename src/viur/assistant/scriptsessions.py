@@ -0,0 +1,187 @@
+"""
+Script sessions
+
+Server-side storage of multi-turn ``generate_script`` conversations.
+
+A session is an entity of the kind ``viur-assistant-script-session``. It stores the included modules
+and the turns of the conversation in a compact form: only the prompt and the text of the answer
+of each turn, compressed. Clients send only the new prompt and the key of the session.
+
+Once the history exceeds ``CONFIG.script_session_history_tokens``, the older turns are summarized,
+and the summary replaces them. Sessions expire ``CONFIG.script_session_ttl`` after their last turn.
+"""
+
+import datetime
+import json
+import typing as t
+
+from viur.core import db, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant import expiry, jobs, segments
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "SCRIPT_SESSION_KIND",
+    "new_session",
+    "create_session",
+    "get_session",
+    "get_turns",
+    "add_turn",
+    "apply_summary",
+    "history_tokens",
+    "session_to_dict",
+    "purge_expired_sessions",
+]
+
+SCRIPT_SESSION_KIND: t.Final[str] = "viur-assistant-script-session"
+"""The datastore kind of the sessions"""
+
+
+def new_session(owner: db.Key | None, modules: list[str]) -> db.Entity:
+    """
+    Create a new session without turns, without storing it.
+
+    :param owner: Key of the user who started the session.
+    :param modules: Names of the modules, whose structures are included in every turn.
+    :return: The session entity.
+    """
+    now = utils.utcNow()
+    entity = db.Entity(db.Key(SCRIPT_SESSION_KIND, utils.string.random(32)))
+    entity["owner"] = owner
+    entity["modules"] = modules
+    entity["turns"] = jobs.compress("[]")
+    entity["offset"] = 0
+    entity["summary"] = None
+    entity["creationdate"] = now
+    entity["changedate"] = now
+    entity["expires"] = now + CONFIG.script_session_ttl
+    entity.exclude_from_indexes = {"modules", "turns", "summary"}
+    return entity
+
+
+def create_session(entity: db.Entity, prompt: str, answer: str) -> db.Entity:
+    """
+    Store a new session (see :func:`new_session`) with its first turn.
+
+    A new session is only stored once its first turn succeeded, so failed turns don't leave empty sessions behind.
+
+    :param entity: The new session entity.
+    :param prompt: The prompt of the user.
+    :param answer: The text of the answer of the model.
+    :return: The stored session entity.
+    """
+    _append_turn(entity, prompt, answer)
+    db.Put(entity)
+    return entity
+
+
+def get_session(key: db.Key | str) -> db.Entity | None:
+    """
+    Fetch a session by its key, expired sessions are treated as non-existing.
+
+    :param key: The session key or the name of the session key.
+    :return: The session entity, or None if it doesn't exist (anymore).
+    """
+    if not isinstance(key, db.Key):
+        key = db.Key(SCRIPT_SESSION_KIND, str(key))
+    if not (entity := db.Get(key)) or entity["expires"] < utils.utcNow():
+        return None
+    return entity
+
+
+def get_turns(entity: db.Entity) -> list[dict[str, str]]:
+    """Returns the (not summarized) turns of a session, each with its ``prompt`` and ``answer``"""
+    return json.loads(jobs.decompress(entity["turns"]))
+
+
+def add_turn(key: db.Key, prompt: str, answer: str) -> db.Entity | None:
+    """
+    Transactionally append a turn to a session and extend its expiration.
+
+    :param key: The session key.
+    :param prompt: The prompt of the user.
+    :param answer: The text of the answer of the model.
+    :return: The updated session entity, or None if the session doesn't exist (anymore).
+    """
+
+    def txn():
+        if not (entity := db.Get(key)):
+            return None
+        _append_turn(entity, prompt, answer)
+        db.Put(entity)
+        return entity
+
+    return db.RunInTransaction(txn)
+
+
+def _append_turn(entity: db.Entity, prompt: str, answer: str) -> None:
+    turns = get_turns(entity) + [{"prompt": prompt, "answer": answer}]
+    entity["turns"] = jobs.compress(json.dumps(turns, separators=(",", ":")))
+    entity["changedate"] = utils.utcNow()
+    entity["expires"] = entity["changedate"] + CONFIG.script_session_ttl
+
+
+def apply_summary(key: db.Key, summary: str, until: int) -> None:
+    """
+    Transactionally replace the turns before ``until`` by their summary.
+
+    :param key: The session key.
+    :param summary: The summary of the previous summary and the summarized turns.
+    :param until: The (absolute) index of the first turn, which is not covered by the summary.
+        Turns appended in the meantime are kept.
+    """
+
+    def txn():
+        if not (entity := db.Get(key)) or entity["offset"] >= until:
+            return
+        turns = get_turns(entity)[until - entity["offset"]:]
+        entity["turns"] = jobs.compress(json.dumps(turns, separators=(",", ":")))
+        entity["offset"] = until
+        entity["summary"] = summary
+        db.Put(entity)
+
+    db.RunInTransaction(txn)
+
+
+def history_tokens(entity: db.Entity) -> int:
+    """Estimate the tokens of the history (summary and turns) of a session"""
+    return sum(
+        segments.estimate_tokens(text)
+        for text in (
+            entity["summary"] or "",
+            *(turn[part] for turn in get_turns(entity) for part in ("prompt", "answer")),
+        )
+    )
+
+
+def session_to_dict(entity: db.Entity, with_turns: bool = False) -> dict[str, t.Any]:
+    """
+    Returns the public representation of a session.
+
+    :param with_turns: Include the summary and the (not summarized) turns.
+    """
+    turns = get_turns(entity)
+    data = {
+        "key": entity.key.id_or_name,
+        "modules": entity["modules"] or [],
+        "turns": entity["offset"] + len(turns),
+        "summarized_turns": entity["offset"],
+        "history_tokens": history_tokens(entity),
+        "creationdate": entity["creationdate"].isoformat(),
+        "changedate": entity["changedate"].isoformat(),
+        "expires": entity["expires"].isoformat(),
+    }
+    if with_turns:
+        data["summary"] = entity["summary"]
+        data["history"] = turns
+    return data
+
+
+@PeriodicTask(interval=datetime.timedelta(hours=1))
+def purge_expired_sessions() -> None:
+    """Delete all sessions whose TTL has been exceeded"""
+    if count := expiry.purge_expired(SCRIPT_SESSION_KIND):
+        logger.info(f"Purged {count} expired script sessions")
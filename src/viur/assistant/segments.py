@@ -0,0 +1,399 @@
+"""
+Segments
+
+HTML-aware segmentation of texts for translation.
+
+Instead of sending raw HTML to the model, the text is parsed and only the translatable parts
+are extracted as a list of *segments*:
+
+- Each run of text within a block element becomes one segment. Inline elements inside of it
+  (like ``<strong>`` or ``<a>``) are replaced by compact numbered placeholders
+  (``<1>``, ``</1>`` and ``<1/>`` for void elements), so that sentences stay intact.
+  Literal markers like ``<1>`` within the text are kept as text, the placeholders are numbered above them.
+- The values of translatable attributes (see :data:`TRANSLATABLE_ATTRIBUTES`) become segments of their own.
+
+Everything else (markup, whitespace, scripts, elements with ``translate="no"``) is kept verbatim
+and the translated segments are re-inserted deterministically into the original structure.
+
+Long plain texts are split into paragraphs as segments by :class:`TextDocument`.
+Segments are grouped into chunks of a token budget by :func:`chunk`, so that long documents
+can be translated in parallel.
+"""
+
+import dataclasses
+import html
+import re
+import typing as t
+from html.parser import HTMLParser
+
+__all__ = [
+    "TRANSLATABLE_ATTRIBUTES",
+    "looks_like_html",
+    "estimate_tokens",
+    "chunk",
+    "Document",
+    "HtmlDocument",
+    "TextDocument",
+]
+
+TRANSLATABLE_ATTRIBUTES: t.Final[frozenset[str]] = frozenset({"alt", "title", "placeholder", "aria-label"})
+"""Attributes whose values are translated"""
+
+INLINE_ELEMENTS: t.Final[frozenset[str]] = frozenset({
+    "a", "abbr", "b", "bdi", "bdo", "br", "cite", "code", "data", "del", "dfn", "em", "font", "i", "img",
+    "ins", "kbd", "mark", "q", "s", "samp", "small", "span", "strong", "sub", "sup", "time", "u", "var", "wbr",
+})
+"""Elements which are kept as placeholders within a segment"""
+
+VOID_ELEMENTS: t.Final[frozenset[str]] = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+})
+"""Elements without content and end tag"""
+
+SKIPPED_ELEMENTS: t.Final[frozenset[str]] = frozenset({"script", "style", "template", "pre"})
+"""Elements whose content is never translated"""
+
+_HTML_PATTERN: t.Final[re.Pattern] = re.compile(r"<[a-zA-Z!/][^>]*>|&#?\w+;")
+_PLACEHOLDER_PATTERN: t.Final[re.Pattern] = re.compile(r"<(/?)(\d+)(/?)>")
+_PARAGRAPH_PATTERN: t.Final[re.Pattern] = re.compile(r"(\n[ \t\r\f]*\n\s*)")
+_WHITESPACE: t.Final[str] = " \t\n\r\f"
+
+
+def looks_like_html(text: str) -> bool:
+    """Returns whether a text contains markup or character references"""
+    return bool(_HTML_PATTERN.search(text))
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens of a text (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def chunk(texts: t.Sequence[str], max_tokens: int) -> list[range]:
+    """
+    Group consecutive texts into chunks of at most ``max_tokens`` estimated tokens.
+
+    A single text exceeding the budget becomes a chunk of its own.
+
+    :return: The ranges of the text indices of each chunk.
+    """
+    chunks = []
+    start = tokens = 0
+    for index, text in enumerate(texts):
+        size = estimate_tokens(text)
+        if index > start and tokens + size > max_tokens:
+            chunks.append(range(start, index))
+            start, tokens = index, 0
+        tokens += size
+    if start < len(texts):
+        chunks.append(range(start, len(texts)))
+    return chunks
+
+
+def _is_translatable(text: str) -> bool:
+    return any(char.isalpha() for char in text)
+
+
+def _escape(text: str) -> str:
+    return html.escape(text, quote=False).replace("\xa0", "&nbsp;")
+
+
+@dataclasses.dataclass
+class _Tag:
+    """A start tag with translatable attributes"""
+
+    raw: str
+    name: str
+    attrs: list[tuple[str, str | None]]
+    segments: dict[str, int]
+    """Maps attribute names to their segment index"""
+
+    def render(self, translations: t.Sequence[str]) -> str:
+        attrs = "".join(
+            f" {name}" if value is None
+            else f' {name}="{html.escape(translations[self.segments[name]] if name in self.segments else value)}"'
+            for name, value in self.attrs
+        )
+        end = " />" if self.raw.endswith("/>") else ">"
+        return f"<{self.name}{attrs}{end}"
+
+
+@dataclasses.dataclass
+class _Block:
+    """A run of text, which may contain inline elements"""
+
+    index: int
+    """The segment index"""
+
+    leading: str
+    """Whitespace before the segment"""
+
+    trailing: str
+    """Whitespace after the segment"""
+
+
+class _Parser(HTMLParser):
+    """Splits a text into segments and the markup around them"""
+
+    def __init__(self, document: "HtmlDocument"):
+        super().__init__(convert_charrefs=False)
+        self.document = document
+        self.skip_stack: list[str] = []
+        self.buffer: list[tuple[str, str, str | _Tag | None]] = []  # (raw, text, markup of a placeholder)
+        self.open_inline: list[tuple[str, int]] = []  # (tag name, placeholder number)
+        self.placeholder_count = 0
+
+    def make_tag(self, tag: str, attrs: list[tuple[str, str | None]]) -> str | _Tag:
+        raw = self.get_starttag_text()
+        segments = {}
+        for name, value in attrs:
+            if name in TRANSLATABLE_ATTRIBUTES and value and _is_translatable(value):
+                segments[name] = self.document._add_segment(value)
+        return _Tag(raw, tag, attrs, segments) if segments else raw
+
+    def flush(self) -> None:
+        """Turn the buffered text and inline elements into a segment"""
+        buffer, self.buffer = self.buffer, []
+        self.open_inline.clear()
+        self.placeholder_count = 0
+
+        if not _is_translatable("".join(text for _, text, markup in buffer if markup is None)):
+            self.document.parts.extend(raw if markup is None else markup for raw, _, markup in buffer)
+            return
+
+        # keep the placeholders distinct from literal markers like "<1>" within the text
+        literal = "".join(text for _, text, markup in buffer if markup is None)
+        if numbers := [int(match.group(2)) for match in _PLACEHOLDER_PATTERN.finditer(literal)]:
+            offset = max(numbers)
+            buffer = [
+                (raw, text, markup) if markup is None else (raw, _PLACEHOLDER_PATTERN.sub(
+                    lambda match: f"<{match.group(1)}{int(match.group(2)) + offset}{match.group(3)}>", text,
+                ), markup)
+                for raw, text, markup in buffer
+            ]
+
+        source = "".join(text for _, text, _ in buffer)
+        stripped = source.strip(_WHITESPACE)
+        leading = source[:len(source) - len(source.lstrip(_WHITESPACE))]
+        block = _Block(
+            index=self.document._add_segment(
+                stripped,
+                {text: markup for _, text, markup in buffer if markup is not None},
+            ),
+            leading=leading,
+            trailing=source[len(leading) + len(stripped):],
+        )
+        self.document.parts.append(block)
+
+    def handle_starttag(self, tag, attrs):
+        self.handle_tag(tag, attrs, tag in VOID_ELEMENTS)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_tag(tag, attrs, True)
+
+    def handle_tag(self, tag: str, attrs: list[tuple[str, str | None]], is_void: bool) -> None:
+        if self.skip_stack:
+            if not is_void:
+                self.skip_stack.append(tag)
+            self.document.parts.append(self.get_starttag_text())
+            return
+
+        is_skipped = tag in SKIPPED_ELEMENTS or dict(attrs).get("translate") == "no"
+
+        if tag in INLINE_ELEMENTS and not is_skipped:
+            self.placeholder_count += 1
+            placeholder = f"<{self.placeholder_count}{"/" if is_void else ""}>"
+            self.buffer.append((placeholder, placeholder, self.make_tag(tag, attrs)))
+            if not is_void:
+                self.open_inline.append((tag, self.placeholder_count))
+            return
+
+        self.flush()
+        self.document.parts.append(self.make_tag(tag, attrs))
+        if is_skipped and not is_void:
+            self.skip_stack.append(tag)
+
+    def handle_endtag(self, tag):
+        raw = f"</{tag}>"
+        if self.skip_stack:
+            if tag in self.skip_stack:
+                while self.skip_stack.pop() != tag:
+                    pass
+            self.document.parts.append(raw)
+            return
+
+        for position in range(len(self.open_inline) - 1, -1, -1):
+            if self.open_inline[position][0] == tag:
+                placeholder = f"</{self.open_inline.pop(position)[1]}>"
+                self.buffer.append((placeholder, placeholder, raw))
+                return
+
+        self.flush()
+        self.document.parts.append(raw)
+
+    def handle_data(self, data):
+        if self.skip_stack:
+            self.document.parts.append(data)
+        else:
+            self.buffer.append((data, data, None))
+
+    def handle_entityref(self, name):
+        self.handle_reference(f"&{name};")
+
+    def handle_charref(self, name):
+        self.handle_reference(f"&#{name};")
+
+    def handle_reference(self, raw: str) -> None:
+        if self.skip_stack:
+            self.document.parts.append(raw)
+        else:
+            self.buffer.append((raw, html.unescape(raw), None))
+
+    def handle_comment(self, data):
+        self.flush()
+        self.document.parts.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.flush()
+        self.document.parts.append(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self.flush()
+        self.document.parts.append(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self.flush()
+        self.document.parts.append(f"<![{data}]>")
+
+    def close(self):
+        super().close()
+        self.flush()
+
+
+class Document:
+    """
+    A text, split into translatable segments.
+
+    Translate the :attr:`segments` and re-insert them with :meth:`render`.
+    """
+
+    def __init__(self):
+        self.segments: list[str] = []
+        """The source texts of the segments"""
+
+        self.parts: list[str | _Tag | _Block] = []
+        """The markup and text blocks of the document, in order"""
+
+        self._placeholders: list[dict[str, str | _Tag]] = []
+
+    def _add_segment(self, text: str, placeholders: dict[str, str | _Tag] | None = None) -> int:
+        self.segments.append(text)
+        self._placeholders.append(placeholders or {})
+        return len(self.segments) - 1
+
+    def _escape(self, text: str) -> str:
+        return text
+
+    def _find_placeholders(self, index: int, text: str) -> list[re.Match]:
+        """Returns the placeholders of a segment within a text, other markers like ``<1>`` are literal text"""
+        placeholders = self._placeholders[index]
+        return [match for match in _PLACEHOLDER_PATTERN.finditer(text) if match.group(0) in placeholders]
+
+    def is_valid(self, index: int, translation: str) -> bool:
+        """
+        Returns whether the translation of a segment contains exactly
+        the placeholders of its source, with start placeholders before their end placeholders.
+        """
+        markers = [match.group(0) for match in self._find_placeholders(index, translation)]
+        if sorted(markers) != sorted(self._placeholders[index]):
+            return False
+        return all(
+            markers.index(f"<{marker[2:]}") < position
+            for position, marker in enumerate(markers)
+            if marker.startswith("</")
+        )
+
+    def render(self, translations: t.Sequence[str]) -> str:
+        """
+        Re-insert translated segments into the document.
+
+        Translations with invalid placeholders (see :meth:`is_valid`) are inserted
+        without their inline markup, to keep the structure of the document intact.
+
+        :param translations: The translations, in the order of :attr:`segments`.
+        :return: The translated text.
+        """
+        if len(translations) != len(self.segments):
+            raise ValueError(f"Expected {len(self.segments)} translations, got {len(translations)}")
+
+        result = []
+        for part in self.parts:
+            if isinstance(part, str):
+                result.append(part)
+            elif isinstance(part, _Tag):
+                result.append(part.render(translations))
+            else:
+                result.append(part.leading)
+                result.append(self._render_segment(part.index, translations))
+                result.append(part.trailing)
+        return "".join(result)
+
+    def _render_segment(self, index: int, translations: t.Sequence[str]) -> str:
+        translation = translations[index]
+        placeholders = self._placeholders[index]
+        if not self.is_valid(index, translation):
+            return self._escape(_PLACEHOLDER_PATTERN.sub(
+                lambda match: "" if match.group(0) in placeholders else match.group(0), translation,
+            ))
+
+        result = []
+        position = 0
+        for match in self._find_placeholders(index, translation):
+            result.append(self._escape(translation[position:match.start()]))
+            markup = placeholders[match.group(0)]
+            result.append(markup.render(translations) if isinstance(markup, _Tag) else markup)
+            position = match.end()
+        result.append(self._escape(translation[position:]))
+        return "".join(result)
+
+
+class HtmlDocument(Document):
+    """
+    A parsed HTML text, split into translatable segments.
+
+    .. code-block:: python
+
+        document = HtmlDocument('<p>Hallo <a href="/welt">Welt</a>!</p><img alt="Ein Bild" src="...">')
+        document.segments  # ['Hallo <1>Welt</1>!', 'Ein Bild']
+        document.render(["Hello <1>world</1>!", "An image"])
+    """
+
+    def __init__(self, text: str):
+        super().__init__()
+        parser = _Parser(self)
+        parser.feed(text)
+        parser.close()
+
+    def _escape(self, text: str) -> str:
+        return _escape(text)
+
+
+class TextDocument(Document):
+    """
+    A plain text, split into its paragraphs as segments.
+    """
+
+    def __init__(self, text: str):
+        super().__init__()
+        for position, part in enumerate(_PARAGRAPH_PATTERN.split(text)):
+            if position % 2 or not _is_translatable(part):  # odd positions are the separators
+                self.parts.append(part)
+                continue
+
+            stripped = part.strip(_WHITESPACE)
+            leading = part[:len(part) - len(part.lstrip(_WHITESPACE))]
+            self.parts.append(_Block(
+                index=self._add_segment(stripped),
+                leading=leading,
+                trailing=part[len(leading) + len(stripped):],
+            ))
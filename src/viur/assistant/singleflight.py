@@ -0,0 +1,133 @@
+"""
+Single-flight
+
+Coalesces identical concurrent requests, so that only one of them (the *leader*)
+calls the upstream provider, while all others (the *followers*) await its result.
+
+Within an instance, this works on the event loop of the assistant, where all upstream
+calls are executed. Optionally (``CONFIG.singleflight_cross_instance``), a marker entity
+in the datastore is used to coalesce requests across instances as well.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import typing as t
+
+from viur.core import db, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant import expiry, jobs, tokens
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "SINGLEFLIGHT_KIND",
+    "make_key",
+    "single_flight",
+]
+
+SINGLEFLIGHT_KIND: t.Final[str] = "viur-assistant-singleflight"
+"""The datastore kind of the cross-instance markers"""
+
+T = t.TypeVar("T")
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def make_key(operation: str, *parts: t.Any) -> str:
+    """
+    Build the key of a normalized request.
+
+    :param operation: Name of the operation.
+    :param parts: The (JSON-serializable) values which identify the request.
+    :return: A hash of the operation and its parts.
+    """
+    return hashlib.sha256(
+        json.dumps([operation, *parts], separators=(",", ":"), default=str).encode("utf-8")
+    ).hexdigest()
+
+
+async def single_flight(key: str, factory: t.Callable[[], t.Awaitable[T]]) -> T:
+    """
+    Run the awaitable created by ``factory``, unless an identical request is already in flight.
+
+    :param key: The key of the normalized request, see :func:`make_key`.
+    :param factory: Creates the awaitable performing the request.
+        Its result must be JSON-serializable for cross-instance coalescing.
+    :return: The result of the leader.
+    """
+    if tokens.is_dry_run():  # a dry-run must neither join nor lead real requests
+        return await factory()
+
+    if task := _inflight.get(key):
+        logger.debug(f"Joining in-flight request {key=}")
+        return await asyncio.shield(task)
+
+    if CONFIG.singleflight_cross_instance:
+        task = asyncio.ensure_future(_lead_cross_instance(key, factory))
+    else:
+        task = asyncio.ensure_future(factory())
+
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _lead_cross_instance(key: str, factory: t.Callable[[], t.Awaitable[T]]) -> T:
+    """
+    Lead a request across instances.
+
+    If another instance is already leading this request, its result is awaited by polling
+    the marker entity, until ``CONFIG.singleflight_timeout`` is reached.
+    """
+    db_key = db.Key(SINGLEFLIGHT_KIND, key)
+    deadline = utils.utcNow() + datetime.timedelta(seconds=CONFIG.singleflight_timeout)
+
+    while True:
+        marker, is_leader = await asyncio.to_thread(db.RunInTransaction, _acquire_marker, db_key)
+        if is_leader:
+            break
+        if marker["result"] is not None:
+            logger.debug(f"Using result of another instance for {key=}")
+            return json.loads(jobs.decompress(marker["result"]))
+        if utils.utcNow() >= deadline:
+            logger.warning(f"Timeout while waiting for another instance on {key=}")
+            return await factory()
+        await asyncio.sleep(0.5)
+
+    try:
+        result = await factory()
+    except Exception:
+        await asyncio.to_thread(db.Delete, db_key)
+        raise
+
+    marker["result"] = jobs.compress(json.dumps(result))
+    marker["expires"] = utils.utcNow() + datetime.timedelta(seconds=CONFIG.singleflight_result_ttl)
+    await asyncio.to_thread(db.Put, marker)
+    return result
+
+
+def _acquire_marker(db_key: db.Key) -> tuple[db.Entity, bool]:
+    """
+    Returns the current marker and whether the caller has become the leader.
+    Must be called in a transaction.
+    """
+    now = utils.utcNow()
+    if (marker := db.Get(db_key)) and marker["expires"] > now:
+        return marker, False
+
+    marker = db.Entity(db_key)
+    marker["result"] = None
+    marker["expires"] = now + datetime.timedelta(seconds=CONFIG.singleflight_timeout)
+    marker.exclude_from_indexes = {"result"}
+    db.Put(marker)
+    return marker, True
+
+
+@PeriodicTask(interval=datetime.timedelta(hours=1))
+def purge_expired_singleflight_markers() -> None:
+    """Delete all cross-instance markers which have expired"""
+    expiry.purge_expired(SINGLEFLIGHT_KIND)
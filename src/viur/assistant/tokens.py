@@ -0,0 +1,199 @@
+"""
+Tokens
+
+Local token estimator, used as preflight before every upstream call.
+
+Tokens are estimated from the number of characters of the request, using a ratio of characters
+per token for each provider and model. The ratios start with conservative defaults and are cached
+per instance, calibrated with the usage reported by each response. Images are estimated by their
+detail level, see :mod:`viur.assistant.imaging`.
+
+Requests whose estimated input tokens exceed ``CONFIG.input_token_budget`` are rejected,
+before the slow round-trip to the provider.
+
+Within :func:`dry_run`, the estimates are collected instead of sending the requests.
+Each upstream call aborts the operation with :class:`DryRun`; calls which would run in parallel
+(see :func:`viur.assistant.concurrency.gather_bounded`) are all estimated, calls which depend on
+an answer are not.
+"""
+
+import contextlib
+import contextvars
+import math
+import typing as t
+
+from viur.core import errors
+
+from viur.assistant import imaging
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "Provider",
+    "DryRun",
+    "dry_run",
+    "is_dry_run",
+    "estimate_text",
+    "estimate_request",
+    "get_input_budget",
+    "preflight",
+    "calibrate",
+]
+
+
+class Provider:
+    OPENAI: t.Final[str] = "openai"
+    """OpenAI chat completions"""
+
+    ANTHROPIC: t.Final[str] = "anthropic"
+    """Anthropic messages"""
+
+
+_DEFAULT_CHARS_PER_TOKEN: t.Final[dict[str, float]] = {
+    Provider.OPENAI: 4.0,
+    Provider.ANTHROPIC: 3.5,
+}
+_ANTHROPIC_IMAGE_TOKENS: t.Final[int] = 1_600
+_HIGH_DETAIL_TILES: t.Final[int] = 4
+_MIN_CALIBRATION_CHARS: t.Final[int] = 200
+_EWMA_WEIGHT: t.Final[float] = 0.2
+_REQUEST_KEYS: t.Final[tuple[str, ...]] = ("system", "messages", "tools", "response_format")
+
+_ratios: dict[tuple[str, str], float] = {}
+
+
+class DryRun(Exception):
+    """Raised instead of an upstream call within :func:`dry_run`"""
+
+
+_dry_run_estimates: contextvars.ContextVar[list[dict[str, t.Any]] | None] = contextvars.ContextVar(
+    "viur_assistant_dry_run_estimates",
+    default=None,
+)
+
+
+@contextlib.contextmanager
+def dry_run() -> t.Iterator[list[dict[str, t.Any]]]:
+    """
+    Collect the estimates of the upstream calls of the enclosed code, instead of sending them.
+
+    .. code-block:: python
+
+        with tokens.dry_run() as estimates:
+            run_sync(...)
+    """
+    estimates = []
+    token = _dry_run_estimates.set(estimates)
+    try:
+        yield estimates
+    except DryRun:
+        pass
+    finally:
+        _dry_run_estimates.reset(token)
+
+
+def is_dry_run() -> bool:
+    """Returns whether the current context is within :func:`dry_run`"""
+    return _dry_run_estimates.get() is not None
+
+
+def _chars_per_token(provider: str, model: str) -> float:
+    return _ratios.get((provider, model), _DEFAULT_CHARS_PER_TOKEN[provider])
+
+
+def estimate_text(text: str, provider: str, model: str) -> int:
+    """Estimate the tokens of a text for a model"""
+    return math.ceil(len(text) / _chars_per_token(provider, model)) if text else 0
+
+
+def _measure(value: t.Any, model: str) -> tuple[int, int]:
+    """Returns the characters of all texts and the estimated tokens of all images within request parameters"""
+    if isinstance(value, str):
+        return len(value), 0
+
+    if isinstance(value, dict):
+        if value.get("type") == "image_url":
+            base, per_tile = imaging.IMAGE_TOKEN_COSTS.get(model, imaging.IMAGE_TOKEN_COSTS["*"])
+            if value["image_url"].get("detail") == "low":
+                return 0, base
+            return 0, base + per_tile * _HIGH_DETAIL_TILES
+        if value.get("type") == "image":
+            return 0, _ANTHROPIC_IMAGE_TOKENS
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return 0, 0
+
+    chars = image_tokens = 0
+    for item in value:
+        item_chars, item_image_tokens = _measure(item, model)
+        chars += item_chars
+        image_tokens += item_image_tokens
+    return chars, image_tokens
+
+
+def estimate_request(provider: str, model: str, params: dict[str, t.Any]) -> int:
+    """
+    Estimate the input tokens of a request.
+
+    :param provider: The provider, see :class:`Provider`.
+    :param model: The model.
+    :param params: The parameters of the request, as passed to the client.
+    """
+    chars, image_tokens = _measure([params.get(key) for key in _REQUEST_KEYS], model)
+    return math.ceil(chars / _chars_per_token(provider, model)) + image_tokens
+
+
+def get_input_budget(model: str) -> int:
+    """Returns the maximum estimated input tokens of a request to a model"""
+    return CONFIG.input_token_budget.get(model) or CONFIG.input_token_budget["*"]
+
+
+def preflight(provider: str, model: str, params: dict[str, t.Any]) -> int:
+    """
+    Check a request before it's sent.
+
+    :param provider: The provider, see :class:`Provider`.
+    :param model: The model.
+    :param params: The parameters of the request, as passed to the client.
+    :return: The estimated input tokens.
+
+    :raises DryRun: Within :func:`dry_run`, after the estimate has been collected.
+    :raises RequestTooLarge: If the estimate exceeds the input budget of the model.
+    """
+    estimate = estimate_request(provider, model, params)
+    budget = get_input_budget(model)
+
+    if (estimates := _dry_run_estimates.get()) is not None:
+        estimates.append({
+            "provider": provider,
+            "model": model,
+            "input_tokens": estimate,
+            "input_budget": budget,
+            "max_output_tokens": params.get("max_tokens") or params.get("max_completion_tokens"),
+        })
+        raise DryRun()
+
+    if estimate > budget:
+        raise errors.RequestTooLarge(
+            f"The request is estimated to {estimate} input tokens, which exceeds the budget of {budget} tokens"
+        )
+    return estimate
+
+
+def calibrate(provider: str, model: str, params: dict[str, t.Any], input_tokens: int) -> None:
+    """
+    Calibrate the ratio of characters per token of a model with the usage reported for a request.
+
+    :param provider: The provider, see :class:`Provider`.
+    :param model: The model.
+    :param params: The parameters of the request, as passed to the client.
+    :param input_tokens: The input tokens reported by the provider.
+    """
+    chars, image_tokens = _measure([params.get(key) for key in _REQUEST_KEYS], model)
+    if chars < _MIN_CALIBRATION_CHARS or (text_tokens := input_tokens - image_tokens) <= 0:
+        return
+
+    observed = min(max(chars / text_tokens, 1.0), 8.0)
+    ratio = _chars_per_token(provider, model)
+    _ratios[(provider, model)] = ratio + _EWMA_WEIGHT * (observed - ratio)
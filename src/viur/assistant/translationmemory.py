@@ -0,0 +1,228 @@
+"""
+Translation memory
+
+Persistent memory of translated segments, see :mod:`viur.assistant.segments`.
+It's opt-in, enabled by ``CONFIG.translation_memory``.
+
+Every translated segment is stored in an entity of the kind ``viur-assistant-translation-memory``,
+keyed by a hash of the source segment, the target language and the *context* of the translation:
+the model and the translation target (the language with the rules of its characteristic), see :func:`context_key`.
+Known segments are served from the memory, so that only new segments are sent to the model.
+Changing the model or the rules starts with an empty memory.
+
+For new segments, translations of *similar* segments are looked up as well and given to the model
+as hints, to keep the wording consistent. Candidates are found by their word trigrams, which are
+stored as an indexed list property, and verified by their similarity (see :mod:`difflib`).
+
+Additionally, the source hashes of the segments of each translated *field* (like a bone of an entry)
+are kept in entities of the kind ``viur-assistant-translation-field``, together with their translations.
+When the source of a field is edited, only the changed segments need to be translated again.
+
+Both kinds expire ``CONFIG.translation_memory_ttl`` after they were last written and are purged periodically.
+"""
+
+import datetime
+import difflib
+import hashlib
+import re
+import typing as t
+
+from viur.core import db, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant import expiry
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+from viur.assistant.singleflight import make_key
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "TRANSLATION_MEMORY_KIND",
+    "context_key",
+    "lookup",
+    "find_similar",
+    "store",
+    "TRANSLATION_FIELD_KIND",
+    "segment_hash",
+    "get_field",
+    "set_field",
+    "purge_expired_translations",
+]
+
+TRANSLATION_MEMORY_KIND: t.Final[str] = "viur-assistant-translation-memory"
+"""The datastore kind of the translation memory"""
+
+TRANSLATION_FIELD_KIND: t.Final[str] = "viur-assistant-translation-field"
+"""The datastore kind of the segment hashes of translated fields"""
+
+_MAX_GRAMS: t.Final[int] = 8
+_WORD_PATTERN: t.Final[re.Pattern] = re.compile(r"\w+")
+
+
+def context_key(model: str, target: str) -> str:
+    """
+    Returns the key of the context of a translation.
+
+    :param model: The model, which translates.
+    :param target: The description of the translation target, including the rules of the characteristic.
+    """
+    return hashlib.sha256(f"{model}\0{target}".encode("utf-8")).hexdigest()[:16]
+
+
+def _get_key(text: str, language: str, context: str) -> db.Key:
+    return db.Key(TRANSLATION_MEMORY_KIND, make_key("translate", text, language, context))
+
+
+def _grams(text: str, language: str, context: str) -> list[str]:
+    """
+    Returns hashes of (up to :data:`_MAX_GRAMS`, evenly spread) word trigrams of a text,
+    prefixed by the language and context to query them with a single equality filter.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    grams = sorted({" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))})
+    if len(grams) > _MAX_GRAMS:
+        grams = grams[::len(grams) // _MAX_GRAMS][:_MAX_GRAMS]
+    return [
+        f"{language}:{context}:{hashlib.sha1(gram.encode("utf-8")).hexdigest()[:12]}"
+        for gram in grams
+    ]
+
+
+def lookup(texts: t.Sequence[str], language: str, context: str) -> list[str | None]:
+    """
+    Look up the stored translations of segments.
+
+    :param texts: The source segments.
+    :param language: The target language.
+    :param context: The context of the translation, see :func:`context_key`.
+    :return: The translations, or None for unknown segments, in the order of ``texts``.
+    """
+    keys = [_get_key(text, language, context) for text in texts]
+    translations = []
+    for chunk in range(0, len(keys), 300):  # db.Get handles at most 300 keys at once
+        translations.extend(
+            entity["target"] if entity else None
+            for entity in db.Get(keys[chunk:chunk + 300])
+        )
+    return translations
+
+
+def find_similar(text: str, language: str, context: str) -> tuple[str, str] | None:
+    """
+    Find the translation of the most similar stored segment in the same context.
+
+    :return: The source and the translation of the most similar segment with a similarity of at least
+        ``CONFIG.translation_memory_fuzzy_threshold``, or None.
+    """
+    if CONFIG.translation_memory_fuzzy_threshold is None:
+        return None
+
+    best = None
+    seen = set()
+    matcher = difflib.SequenceMatcher(b=text, autojunk=False)
+    for gram in _grams(text, language, context):
+        for entity in db.Query(TRANSLATION_MEMORY_KIND).filter("grams =", gram).run(20):
+            if entity.key in seen:
+                continue
+            seen.add(entity.key)
+
+            matcher.set_seq1(entity["source"])
+            if (
+                matcher.quick_ratio() >= CONFIG.translation_memory_fuzzy_threshold
+                and (ratio := matcher.ratio()) >= CONFIG.translation_memory_fuzzy_threshold
+                and (best is None or ratio > best[0])
+            ):
+                best = (ratio, entity["source"], entity["target"])
+
+    if best:
+        logger.debug(f"Found similar segment with ratio {best[0]:.2f}")
+        return best[1], best[2]
+    return None
+
+
+def store(
+    translations: t.Iterable[tuple[str, str]],
+    language: str,
+    context: str,
+) -> None:
+    """
+    Store translated segments.
+
+    :param translations: Pairs of the source segment and its translation.
+    :param language: The target language.
+    :param context: The context of the translation, see :func:`context_key`.
+    """
+    entities = []
+    for text, translation in translations:
+        entity = db.Entity(_get_key(text, language, context))
+        entity["source"] = text
+        entity["target"] = translation
+        entity["language"] = language
+        entity["context"] = context
+        entity["grams"] = _grams(text, language, context)
+        entity["changedate"] = utils.utcNow()
+        entity["expires"] = entity["changedate"] + CONFIG.translation_memory_ttl
+        entity.exclude_from_indexes = {"source", "target"}
+        entities.append(entity)
+
+    for chunk in range(0, len(entities), 300):  # db.Put handles at most 300 entities at once
+        db.Put(entities[chunk:chunk + 300])
+
+
+def segment_hash(text: str) -> str:
+    """Returns the hash of a source segment"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _get_field_key(field: str, language: str, characteristic: str | None) -> db.Key:
+    return db.Key(TRANSLATION_FIELD_KIND, make_key("translate_field", field, language, characteristic))
+
+
+def get_field(field: str, language: str, characteristic: str | None = None) -> tuple[list[str], list[str]] | None:
+    """
+    Returns the state of the last translation of a field.
+
+    :param field: Identifier of the field, like ``"module/key/bone"``.
+    :param language: The target language.
+    :param characteristic: The translation style.
+    :return: The hashes of the source segments and their translations, or None if the field is unknown.
+    """
+    if entity := db.Get(_get_field_key(field, language, characteristic)):
+        return entity["hashes"] or [], entity["translations"] or []
+    return None
+
+
+def set_field(
+    field: str,
+    hashes: list[str],
+    translations: list[str],
+    language: str,
+    characteristic: str | None = None,
+) -> None:
+    """
+    Store the state of the translation of a field.
+
+    :param field: Identifier of the field, like ``"module/key/bone"``.
+    :param hashes: The hashes of the source segments, see :func:`segment_hash`.
+    :param translations: The translations of the segments.
+    :param language: The target language.
+    :param characteristic: The translation style.
+    """
+    entity = db.Entity(_get_field_key(field, language, characteristic))
+    entity["field"] = field
+    entity["language"] = language
+    entity["characteristic"] = characteristic
+    entity["hashes"] = hashes
+    entity["translations"] = translations
+    entity["changedate"] = utils.utcNow()
+    entity["expires"] = entity["changedate"] + CONFIG.translation_memory_ttl
+    entity.exclude_from_indexes = {"hashes", "translations"}
+    db.Put(entity)
+
+
+@PeriodicTask(interval=datetime.timedelta(days=1))
+def purge_expired_translations() -> None:
+    """Delete all remembered segments and fields whose TTL has been exceeded"""
+    for kind in (TRANSLATION_MEMORY_KIND, TRANSLATION_FIELD_KIND):
+        if count := expiry.purge_expired(kind):
+            logger.info(f"Purged {count} expired entities of {kind=}")
@@ -0,0 +1,292 @@
+"""
+Usage
+
+Metering of the upstream usage (tokens, images and calls) per user, operation and day, and daily quotas on it.
+
+Every upstream call is recorded in-process first, attributed to the operation of the current context
+(see :func:`metered`). The aggregated usage of an instance is flushed at most every
+``CONFIG.usage_flush_interval`` seconds into counters of the kind ``viur-assistant-usage``.
+Each counter is sharded into ``CONFIG.usage_shards`` entities, and a flush increments a random shard,
+so concurrent writers (like backfills on many instances) rarely contend on the same entity.
+Besides the counter of the operation, the counter ``"*"`` of all operations of the user is incremented.
+
+Reads sum the shards of a counter with a single lookup and are cached per instance for
+``CONFIG.usage_read_ttl`` seconds, so they're cheap and eventually consistent.
+Quotas are checked before any upstream call. If the usage is within ``CONFIG.usage_quota_tolerance``
+of a quota, the pending usage is flushed and the counter is read again, so the quota is only exceeded
+by the usage of other instances, which is not flushed yet, and by calls already running.
+"""
+
+import asyncio
+import atexit
+import collections
+import contextlib
+import contextvars
+import datetime
+import random
+import threading
+import time
+import typing as t
+
+from viur.core import current, db, errors, utils
+from viur.core.tasks import PeriodicTask
+
+from viur.assistant import expiry
+from viur.assistant.config import ASSISTANT_LOGGER, CONFIG
+
+logger = ASSISTANT_LOGGER.getChild(__name__)
+
+__all__ = [
+    "USAGE_KIND",
+    "METRICS",
+    "current_operation",
+    "metered",
+    "count_images",
+    "record",
+    "flush",
+    "get_usage",
+    "query_usage",
+    "check_quota",
+    "flush_usage",
+    "purge_expired_usage",
+]
+
+USAGE_KIND: t.Final[str] = "viur-assistant-usage"
+"""The datastore kind of the counter shards"""
+
+METRICS: t.Final[tuple[str, ...]] = ("tokens", "input_tokens", "output_tokens", "images", "calls")
+"""The metrics of a counter, which can be limited by ``CONFIG.usage_quotas``"""
+
+_COUNTED: t.Final[tuple[str, ...]] = ("input_tokens", "output_tokens", "images", "calls")
+_ALL_OPERATIONS: t.Final[str] = "*"
+_ANONYMOUS: t.Final[str] = "-"
+
+current_operation: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "viur_assistant_operation",
+    default="other",
+)
+"""The operation, to which upstream calls in the current context are attributed"""
+
+_lock = threading.Lock()
+_pending: dict[tuple[db.Key | None, str, str], collections.Counter] = {}
+_last_flush = time.monotonic()
+_flush_future: asyncio.Future | None = None
+_reads: dict[tuple[db.Key | None, str, str], tuple[float, dict[str, int]]] = {}
+
+
+@contextlib.contextmanager
+def metered(operation: str, *, enforce: bool = True) -> t.Iterator[None]:
+    """
+    Attribute the upstream calls of the enclosed (synchronous) code to an operation.
+
+    .. code-block:: python
+
+        with usage.metered("translate"):
+            run_sync(...)
+
+    :param operation: The name of the operation, like the name of the exposed method.
+    :param enforce: Check the quotas of the current user for this operation first, see :func:`check_quota`.
+
+    :raises TooManyRequests: If a quota is exhausted.
+    """
+    if enforce:
+        check_quota(operation)
+    token = current_operation.set(operation)
+    try:
+        yield
+    finally:
+        current_operation.reset(token)
+
+
+def _get_user_key() -> db.Key | None:
+    return (user := current.user.get()) and user["key"]
+
+
+def _get_day() -> str:
+    return utils.utcNow().date().isoformat()
+
+
+def count_images(params: dict[str, t.Any]) -> int:
+    """Returns the number of images within the messages of a request"""
+    return sum(
+        1
+        for message in params.get("messages") or ()
+        if isinstance(message.get("content"), list)
+        for part in message["content"]
+        if part.get("type") in ("image_url", "image")
+    )
+
+
+def record(*, input_tokens: int = 0, output_tokens: int = 0, images: int = 0) -> None:
+    """
+    Record the usage of an upstream call for the current user and operation.
+
+    The usage is aggregated in-process, and flushed in the background once it's due.
+    """
+    counts = collections.Counter(input_tokens=input_tokens, output_tokens=output_tokens, images=images, calls=1)
+    user_key, day = _get_user_key(), _get_day()
+    with _lock:
+        for operation in (current_operation.get(), _ALL_OPERATIONS):
+            _pending.setdefault((user_key, operation, day), collections.Counter()).update(counts)
+        due = time.monotonic() - _last_flush >= CONFIG.usage_flush_interval
+
+    if due:
+        _schedule_flush()
+
+
+def _schedule_flush() -> None:
+    """Flush in a worker thread of the running event loop, or right away outside of it"""
+    global _flush_future
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush()
+        return
+
+    if _flush_future is None or _flush_future.done():
+        _flush_future = loop.run_in_executor(None, flush)
+
+
+def _shard_key(user_key: db.Key | None, operation: str, day: str, shard: int) -> db.Key:
+    user = user_key.id_or_name if user_key else _ANONYMOUS
+    return db.Key(USAGE_KIND, f"{user}/{operation}/{day}/{shard}")
+
+
+def _increment(key: db.Key, user_key: db.Key | None, operation: str, day: str, counts: t.Mapping[str, int]) -> None:
+    if not (entity := db.Get(key)):
+        entity = db.Entity(key)
+        entity["user"] = user_key
+        entity["operation"] = operation
+        entity["day"] = day
+        entity["expires"] = datetime.datetime.combine(
+            datetime.date.fromisoformat(day), datetime.time(), datetime.timezone.utc,
+        ) + CONFIG.usage_retention
+        for metric in _COUNTED:
+            entity[metric] = 0
+    for metric in _COUNTED:
+        entity[metric] += counts.get(metric, 0)
+    entity["changedate"] = utils.utcNow()
+    db.Put(entity)
+
+
+def flush() -> None:
+    """
+    Write the pending usage of this instance into a random shard of each counter.
+
+    Usage which can't be written is kept pending for the next flush.
+    """
+    global _last_flush
+
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+
+    for (user_key, operation, day), counts in pending.items():
+        key = _shard_key(user_key, operation, day, random.randrange(CONFIG.usage_shards))
+        try:
+            db.RunInTransaction(_increment, key, user_key, operation, day, counts)
+        except Exception as e:
+            logger.exception(f"Failed to flush usage of {operation=} {day=}: {e}")
+            with _lock:
+                _pending.setdefault((user_key, operation, day), collections.Counter()).update(counts)
+            continue
+        _reads.pop((user_key, operation, day), None)
+
+
+atexit.register(flush)
+
+
+def _with_total(counts: t.Mapping[str, int]) -> dict[str, int]:
+    data = {metric: counts.get(metric, 0) for metric in _COUNTED}
+    data["tokens"] = data["input_tokens"] + data["output_tokens"]
+    return data
+
+
+def get_usage(
+    user_key: db.Key | None,
+    operation: str = _ALL_OPERATIONS,
+    day: str | None = None,
+    *,
+    fresh: bool = False,
+) -> dict[str, int]:
+    """
+    Returns the usage of a user, including the pending usage of this instance.
+
+    :param user_key: The key of the user, or None for anonymous usage.
+    :param operation: The name of the operation, or ``"*"`` for all operations.
+    :param day: The (UTC) day in ISO format. Defaults to today.
+    :param fresh: Read the shards, even if a cached read is available.
+    :return: The value of each of the :data:`METRICS`.
+    """
+    counter = (user_key, operation, day or _get_day())
+    if fresh or (cached := _reads.get(counter)) is None or cached[0] < time.monotonic():
+        counts = collections.Counter()
+        for entity in db.Get([_shard_key(*counter, shard) for shard in range(CONFIG.usage_shards)]):
+            if entity:
+                counts.update({metric: entity[metric] or 0 for metric in _COUNTED})
+        cached = _reads[counter] = (time.monotonic() + CONFIG.usage_read_ttl, dict(counts))
+
+    with _lock:
+        pending = _pending.get(counter) or {}
+        return _with_total(collections.Counter(cached[1]) + collections.Counter(pending))
+
+
+def query_usage(user_key: db.Key | None, day: str | None = None) -> dict[str, dict[str, int]]:
+    """
+    Returns the flushed usage of a user per operation on a day, using an (eventually consistent) query.
+
+    :param user_key: The key of the user, or None for anonymous usage.
+    :param day: The (UTC) day in ISO format. Defaults to today.
+    :return: The usage by operation name, ``"*"`` contains the usage of all operations.
+    """
+    result = collections.defaultdict(collections.Counter)
+    query = db.Query(USAGE_KIND).filter("user =", user_key).filter("day =", day or _get_day())
+    for entity in query.iter():
+        result[entity["operation"]].update({metric: entity[metric] or 0 for metric in _COUNTED})
+    return {operation: _with_total(counts) for operation, counts in result.items()}
+
+
+def check_quota(operation: str) -> None:
+    """
+    Check the daily quotas of the current user for an operation and for all operations (``"*"``),
+    as configured by ``CONFIG.usage_quotas``.
+
+    :raises TooManyRequests: If a quota is exhausted. The ``Retry-After`` header is set to the next day.
+    """
+    user_key = _get_user_key()
+    for scope in dict.fromkeys((operation, _ALL_OPERATIONS)):
+        if not (quotas := CONFIG.usage_quotas.get(scope)):
+            continue
+
+        counts = get_usage(user_key, scope)
+        if any(limit - counts[metric] <= limit * CONFIG.usage_quota_tolerance for metric, limit in quotas.items()):
+            # close to a quota: don't rely on cached reads and pending usage of this instance
+            flush()
+            counts = get_usage(user_key, scope, fresh=True)
+
+        for metric, limit in quotas.items():
+            if counts[metric] >= limit:
+                now = utils.utcNow()
+                tomorrow = datetime.datetime.combine(now.date(), datetime.time(), now.tzinfo)
+                tomorrow += datetime.timedelta(days=1)
+                if request := current.request.get():
+                    request.response.headers["Retry-After"] = str(round((tomorrow - now).total_seconds()))
+                raise errors.TooManyRequests(
+                    f"Daily quota of {limit} {metric} for {scope if scope != _ALL_OPERATIONS else 'all operations'} "
+                    f"is exhausted"
+                )
+
+
+@PeriodicTask(interval=datetime.timedelta(minutes=5))
+def flush_usage() -> None:
+    """Flush the pending usage of the instance running this task, other instances flush on their next call"""
+    flush()
+
+
+@PeriodicTask(interval=datetime.timedelta(days=1))
+def purge_expired_usage() -> None:
+    """Delete all counter shards whose retention has been exceeded"""
+    if count := expiry.purge_expired(USAGE_KIND):
+        logger.info(f"Purged {count} expired usage counters")
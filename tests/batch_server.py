@@ -0,0 +1,134 @@
+"""
+Stand-in server for the OpenAI batch API, to test batch requests offline.
+
+It implements the endpoints used by ``viur.assistant.batches`` and completes each batch immediately.
+Segment translations are answered with their source texts, all other requests with a fixed answer.
+
+Run it with ``python tests/batch_server.py`` and configure the assistant accordingly:
+
+    CONFIG.batch_base_url = "http://localhost:8090/v1"
+"""
+
+import email.parser
+import email.policy
+import json
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORT = 8090
+
+files: dict[str, bytes] = {}
+batches: dict[str, dict] = {}
+
+
+def answer(body: dict) -> str:
+    """Returns the message content of the completion of a request body"""
+    schema = body.get("response_format", {}).get("json_schema", {}).get("name")
+    if schema == "viur-assistant-segments":
+        prompt = body["messages"][-1]["content"]
+        texts = json.loads(prompt[prompt.rindex("\n\n") + 2:])
+        return json.dumps({"answer": texts})
+    return json.dumps({"answer": "Stand-in answer"})
+
+
+def complete(batch: dict) -> None:
+    """Answer all requests of a batch and store the output file"""
+    lines = []
+    for line in files[batch["input_file_id"]].decode("utf-8").splitlines():
+        request = json.loads(line)
+        lines.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "object": "chat.completion",
+                    "model": request["body"]["model"],
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": answer(request["body"])},
+                        "finish_reason": "stop",
+                    }],
+                },
+            },
+            "error": None,
+        }))
+
+    output_file_id = f"file-{uuid.uuid4().hex}"
+    files[output_file_id] = "\n".join(lines).encode("utf-8")
+    batch.update(status="completed", output_file_id=output_file_id, completed_at=int(time.time()))
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send_json(self, data: dict, status: int = 200) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+
+        if self.path == "/v1/files":
+            message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                f"Content-Type: {self.headers["Content-Type"]}\r\n\r\n".encode("utf-8") + data
+            )
+            content = next(
+                part.get_payload(decode=True) for part in message.iter_parts()
+                if part.get_param("name", header="content-disposition") == "file"
+            )
+            file_id = f"file-{uuid.uuid4().hex}"
+            files[file_id] = content
+            return self.send_json({
+                "id": file_id,
+                "object": "file",
+                "bytes": len(content),
+                "created_at": int(time.time()),
+                "filename": "batch.jsonl",
+                "purpose": "batch",
+                "status": "processed",
+            })
+
+        if self.path == "/v1/batches":
+            params = json.loads(data)
+            batch_id = f"batch_{uuid.uuid4().hex}"
+            batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": params["endpoint"],
+                "input_file_id": params["input_file_id"],
+                "completion_window": params["completion_window"],
+                "status": "in_progress",
+                "created_at": int(time.time()),
+                "output_file_id": None,
+                "error_file_id": None,
+            }
+            return self.send_json(batches[batch_id])
+
+        self.send_json({"error": {"message": "Not found"}}, 404)
+
+    def do_GET(self):
+        if (match := re.fullmatch(r"/v1/batches/([\w-]+)", self.path)) and (batch := batches.get(match[1])):
+            if batch["status"] == "in_progress":
+                complete(batch)
+            return self.send_json(batch)
+
+        if (match := re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)) and match[1] in files:
+            body = files[match[1]]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_json({"error": {"message": "Not found"}}, 404)
+
+
+if __name__ == "__main__":
+    print(f"Batch stand-in server listening on http://localhost:{PORT}/v1")
+    ThreadingHTTPServer(("localhost", PORT), Handler).serve_forever()
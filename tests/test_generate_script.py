@@ -56,3 +56,25 @@ def test_generate_script_missing_prompt(session):
     response = session.post(BASE_URL, params=params)
     print_response_on_error(response)
     assert response.status_code == 406  # Not Acceptable
+
+
+def test_generate_script_cached(session):
+    params = {
+        "prompt": "Erstelle ein Skript, das alle Benutzer auflistet.",
+    }
+    response = session.post(BASE_URL, params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+
+    # the normalized prompt is served from the cache
+    params["prompt"] = "  Erstelle ein Skript,  das alle Benutzer auflistet. "
+    cached = session.post(BASE_URL, params=params)
+    print_response_on_error(cached)
+    assert cached.status_code == 200
+    assert cached.text == response.text
+
+    params["bypass_cache"] = True
+    bypassed = session.post(BASE_URL, params=params)
+    print_response_on_error(bypassed)
+    assert bypassed.status_code == 200
+    assert bypassed.text != response.text  # a new message with a new ID
@@ -0,0 +1,22 @@
+import pytest
+
+from viur.assistant.config import CONFIG
+from viur.assistant.imaging import choose_detail, estimate_image_tokens
+
+SIZES = [(100, 100), (512, 512), (800, 600), (2000, 300), (4000, 4000)]
+
+
+@pytest.mark.parametrize("model", ["gpt-4o-mini", "gpt-4o"])
+@pytest.mark.parametrize("image_complexity", [0.0, 0.5, 1.0])
+@pytest.mark.parametrize("width, height", SIZES)
+def test_default_detail_never_increases_estimate(width, height, image_complexity, model):
+    detail = choose_detail(width, height, image_complexity)
+    assert estimate_image_tokens(width, height, detail, model) <= estimate_image_tokens(width, height, "low", model)
+
+
+def test_high_detail_is_opt_in(monkeypatch):
+    assert choose_detail(2000, 2000, 1.0) == "low"
+    monkeypatch.setattr(CONFIG, "describe_image_high_detail_complexity", 0.6)
+    assert choose_detail(2000, 2000, 1.0) == "high"
+    assert choose_detail(2000, 2000, 0.5) == "low"
+    assert choose_detail(500, 500, 1.0) == "low"
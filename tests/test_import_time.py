@@ -0,0 +1,42 @@
+import re
+import subprocess
+import sys
+
+LAZY_MODULES = ("anthropic", "openai")
+"""Modules, which must not be imported by importing viur.assistant"""
+
+
+def import_times(statement: str) -> dict[str, int]:
+    """Run an import statement in a fresh interpreter and return the cumulative import time (µs) per module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if match := re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line):
+            times[match[2]] = int(match[1])
+    return times
+
+
+def test_provider_sdks_are_imported_lazily():
+    times = import_times("import viur.assistant")
+    assert "viur.assistant" in times
+    for module in LAZY_MODULES:
+        assert module not in times, f"{module} is imported at import time of viur.assistant"
+
+
+def test_import_time_saving():
+    # Import the SDKs after viur.assistant in the same interpreter, so only their additional cost is measured
+    times = import_times("; ".join(f"import {module}" for module in ("viur.assistant", *LAZY_MODULES)))
+    lazy = times["viur.assistant"]
+    for module in LAZY_MODULES:
+        assert module in times, f"{module} has already been imported by viur.assistant"
+    eager = lazy + sum(times[module] for module in LAZY_MODULES)
+    print(
+        f"\nimport viur.assistant: {lazy / 1000:.1f} ms, with the SDKs: {eager / 1000:.1f} ms,"
+        f" saved by lazy imports: {(eager - lazy) / 1000:.1f} ms ({(eager - lazy) / eager:.0%})"
+    )
+    assert lazy < eager
@@ -0,0 +1,57 @@
+import requests
+
+from utils import session
+
+BASE_URL = "http://localhost:8080/json/assistant"
+
+
+def print_response_on_error(response: requests.Response):
+    if response.status_code >= 400:
+        print(f"\n[HTTP ERROR] {response.status_code} {response.reason}")
+        print(f"Response body:\n{response.text}\n")
+
+
+def test_job_translate(session):
+    params = {
+        "operation": "translate",
+        "text": "Hallo Welt!",
+        "language": "en",
+    }
+    response = session.post(f"{BASE_URL}/job_submit", params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+    job = response.json()
+    assert job["key"]
+    assert job["status"] == "pending"
+
+    response = session.get(f"{BASE_URL}/job_result", params={"key": job["key"], "wait": 20})
+    print_response_on_error(response)
+    assert response.status_code == 200
+    assert response.json().strip()  # should contain translation
+
+    response = session.get(f"{BASE_URL}/job_status", params={"key": job["key"]})
+    print_response_on_error(response)
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+
+
+def test_job_unsupported_operation(session):
+    params = {
+        "operation": "render_text",
+        "text": "Hallo Welt!",
+    }
+    response = session.post(f"{BASE_URL}/job_submit", params=params)
+    print_response_on_error(response)
+    assert response.status_code == 406  # Not Acceptable
+
+
+def test_job_unknown_key(session):
+    response = session.get(f"{BASE_URL}/job_status", params={"key": "does-not-exist"})
+    print_response_on_error(response)
+    assert response.status_code == 404
+
+
+def test_translate_module_unknown_module(session):
+    response = session.post(f"{BASE_URL}/translate_module", params={"module": "does-not-exist"})
+    print_response_on_error(response)
+    assert response.status_code == 406  # Not Acceptable
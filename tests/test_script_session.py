@@ -0,0 +1,62 @@
+import requests
+
+from utils import session
+
+BASE_URL = "http://localhost:8080/json/assistant"
+
+
+def print_response_on_error(response: requests.Response):
+    if response.status_code >= 400:
+        print(f"\n[HTTP ERROR] {response.status_code} {response.reason}")
+        print(f"Response body:\n{response.text}\n")
+
+
+def test_script_session(session):
+    params = {
+        "prompt": "Erstelle ein Skript, das alle Benutzer auflistet.",
+        "modules_to_include": ["user"],
+    }
+    response = session.post(f"{BASE_URL}/script_session_turn", params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+    data = response.json()
+    key = data["session"]["key"]
+    assert data["session"]["turns"] == 1
+    assert data["session"]["modules"] == ["user"]
+    assert data["message"]["content"]
+
+    # only the new prompt and the session are sent
+    params = {
+        "prompt": "Gib zusätzlich die E-Mail-Adresse aus.",
+        "session": key,
+    }
+    response = session.post(f"{BASE_URL}/script_session_turn", params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["session"]["key"] == key
+    assert data["session"]["turns"] == 2
+    assert data["message"]["usage"]["cache_read_input_tokens"] is not None
+
+    response = session.get(f"{BASE_URL}/script_session_view", params={"key": key})
+    print_response_on_error(response)
+    assert response.status_code == 200
+    history = response.json()["history"]
+    assert [turn["prompt"] for turn in history][-1] == params["prompt"]
+
+    response = session.post(f"{BASE_URL}/script_session_delete", params={"key": key})
+    print_response_on_error(response)
+    assert response.status_code == 200
+
+    response = session.get(f"{BASE_URL}/script_session_view", params={"key": key})
+    assert response.status_code == 404
+
+
+def test_script_session_unknown(session):
+    params = {
+        "prompt": "Gib zusätzlich die E-Mail-Adresse aus.",
+        "session": "does-not-exist",
+    }
+    response = session.post(f"{BASE_URL}/script_session_turn", params=params)
+    print_response_on_error(response)
+    assert response.status_code == 404
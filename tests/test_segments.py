@@ -0,0 +1,20 @@
+import pytest
+
+from viur.assistant.segments import HtmlDocument, TextDocument
+
+
+@pytest.mark.parametrize("document_class, text", [
+    (HtmlDocument, '<p>Hallo <a href="/welt">Welt</a>!</p><img alt="Ein Bild" src="bild.jpg">'),
+    (HtmlDocument, "<p>Werte &lt;10&gt; sind ungültig</p>"),
+    (HtmlDocument, '<p>Drücken Sie &lt;1&gt; oder <b>Start</b> und <a href="/hilfe">Hilfe</a>.</p>'),
+    (TextDocument, "Drücken Sie <1> zum Starten.\n\nWerte <10/> sind ungültig."),
+])
+def test_round_trip(document_class, text):
+    document = document_class(text)
+    assert all(document.is_valid(index, segment) for index, segment in enumerate(document.segments))
+    assert document.render(document.segments) == text
+
+
+def test_literal_marker_is_kept_in_invalid_translation():
+    document = HtmlDocument("<p>Drücken Sie &lt;1&gt; oder <b>Start</b>.</p>")
+    assert document.render(["Press <1> or Start."]) == "<p>Press &lt;1&gt; or Start.</p>"
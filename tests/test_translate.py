@@ -1,3 +1,5 @@
+import uuid
+
 import requests
 
 BASE_URL = "http://localhost:8080/json/assistant/translate"
@@ -80,3 +82,56 @@ def test_translate_with_html(session):
     assert response.status_code == 200
     assert response.json().strip()
     assert "<strong>HTML</strong>" in response.json()
+
+
+def test_translate_with_html_attributes(session):
+    params = {
+        "text": '<p>Ein <a href="/hund">Hund</a> im Park.</p><img src="/hund.jpg" alt="Ein Hund">',
+        "language": "en",
+    }
+    response = session.post(BASE_URL, params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+    assert '<a href="/hund">' in response.json()
+    assert 'src="/hund.jpg"' in response.json()
+    assert 'alt="Ein Hund"' not in response.json()
+
+
+def test_translate_all(session):
+    params = {
+        "text": "Hallo Welt!",
+        "languages": ["en", "fr"],
+    }
+    response = session.post(BASE_URL.replace("/translate", "/translate_all"), params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+    assert set(response.json()) == {"en", "fr"}
+    assert all(translation.strip() for translation in response.json().values())
+
+
+def test_translate_dry_run(session):
+    params = {
+        # a unique text, which is not answered by the translation memory
+        "text": f"Hallo Welt! ({uuid.uuid4()})",
+        "language": "en",
+        "dry_run": True,
+    }
+    response = session.post(BASE_URL, params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["requests"]) == 1
+    assert data["input_tokens"] == data["requests"][0]["input_tokens"] > 0
+
+
+def test_translate_field_with_empty_current_translation(session):
+    params = {
+        "text": "Hallo Welt!",
+        "language": "en",
+        "field": f"test/{uuid.uuid4()}/name",
+        "current_translation": "",
+    }
+    response = session.post(BASE_URL, params=params)
+    print_response_on_error(response)
+    assert response.status_code == 200
+    assert response.json().strip()
@@ -0,0 +1,32 @@
+import datetime
+
+import requests
+
+from utils import session
+
+BASE_URL = "http://localhost:8080/json/assistant"
+
+
+def print_response_on_error(response: requests.Response):
+    if response.status_code >= 400:
+        print(f"\n[HTTP ERROR] {response.status_code} {response.reason}")
+        print(f"Response body:\n{response.text}\n")
+
+
+def test_usage_view(session):
+    response = session.get(f"{BASE_URL}/usage_view")
+    print_response_on_error(response)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["day"] == datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    assert isinstance(data["quotas"], dict)
+    for counts in data["usage"].values():
+        assert counts["tokens"] == counts["input_tokens"] + counts["output_tokens"]
+        assert counts["calls"] > 0
+
+
+def test_usage_view_other_day(session):
+    response = session.get(f"{BASE_URL}/usage_view", params={"day": "2000-01-01"})
+    print_response_on_error(response)
+    assert response.status_code == 200
+    assert response.json()["usage"] == {}